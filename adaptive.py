@@ -0,0 +1,76 @@
+"""Adaptive vocabulary sampling that stops evaluating a model once its accuracy is settled."""
+
+import random
+
+from tqdm import tqdm
+
+from cancellation import CancellationToken
+from evaluator import wilson_interval
+from run_status import RunMetrics
+from runner import evaluate_cell
+
+
+def evaluate_word(model: str, entry: dict, registry: dict[str, dict], options: dict | None = None,
+                  metrics: RunMetrics | None = None) -> dict[str, str]:
+    """Prompt and judge a single word with every registered prompt, returning judgments by prompt id"""
+    return {
+        prompt_id: evaluate_cell(model, entry, prompt_id, prompt, options, metrics=metrics)["judgment"]
+        for prompt_id, prompt in registry.items()
+    }
+
+
+def is_settled(model: str, intervals: dict[str, dict[str, tuple[float, float]]], target_width: float) -> bool:
+    """Check whether every prompt's interval is narrow enough or no longer overlaps any other model"""
+    for prompt_id, (low, high) in intervals[model].items():
+        if high - low < target_width:
+            continue
+        
+        others = [interval[prompt_id] for other, interval in intervals.items() if other != model]
+        if others and all(high < other_low or low > other_high for other_low, other_high in others):
+            continue
+        
+        return False
+    return True
+
+
+def run_adaptive_evaluation(models: list[str], vocabulary: list[dict], registry: dict[str, dict],
+                            target_width: float = 0.2, min_words: int = 10, seed: int | None = None,
+                            model_options: dict[str, dict] | None = None,
+                            cancel_token: CancellationToken | None = None,
+                            metrics: RunMetrics | None = None) -> dict[str, list[dict]]:
+    """Evaluate words in random order across models until each model's accuracy is settled
+    
+    Returns the vocabulary entries actually evaluated for each model. A
+    cancelled run stops after the current word.
+    """
+    model_options = model_options or {}
+    order = list(vocabulary)
+    random.Random(seed).shuffle(order)
+    
+    counts = {model: {prompt_id: [0, 0] for prompt_id in registry} for model in models}
+    words_used: dict[str, list[dict]] = {model: [] for model in models}
+    active = list(models)
+    
+    for entry in tqdm(order, desc="Adaptive evaluation"):
+        if not active or (cancel_token is not None and cancel_token.cancelled):
+            break
+        
+        for model in active:
+            judgments = evaluate_word(model, entry, registry, model_options.get(model), metrics)
+            words_used[model].append(entry)
+            
+            for prompt_id, judgment in judgments.items():
+                if judgment:
+                    counts[model][prompt_id][0] += judgment == "correct"
+                    counts[model][prompt_id][1] += 1
+        
+        intervals = {
+            model: {prompt_id: wilson_interval(*counts[model][prompt_id]) for prompt_id in registry}
+            for model in models
+        }
+        active = [
+            model for model in active
+            if len(words_used[model]) < min_words or not is_settled(model, intervals, target_width)
+        ]
+    
+    return words_used
@@ -0,0 +1,111 @@
+"""Per-model concurrency autotuning against the Ollama host."""
+
+import json
+import os
+import socket
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+from urllib.parse import urlparse
+
+import model_client
+from evaluator import percentile
+from model_client import prompt_model
+
+CONCURRENCY_PATH = "output/concurrency.json"
+DEFAULT_LEVELS = (1, 2, 4, 8, 16)
+
+# Levels measured past the best one before the search stops
+PATIENCE = 2
+
+
+def host_key() -> str:
+    """Name of the Ollama host the settings apply to; a local server is named after this machine"""
+    url = urlparse(model_client.OLLAMA_HOST)
+    if url.hostname in ("localhost", "127.0.0.1", "::1", "0.0.0.0"):
+        return socket.gethostname()
+    return url.netloc
+
+
+def measure_level(model: str, words: list[str], prompt_template: str, concurrency: int,
+                  options: dict | None = None) -> dict:
+    """Prompt a model at a fixed number of in-flight requests, returning throughput and p95 latency
+
+    At least two requests per slot are sent (cycling through the words) so
+    every slot is busy for most of the measurement.
+    """
+    requests = [words[index % len(words)] for index in range(max(len(words), 2 * concurrency))]
+    
+    def timed(word: str) -> float:
+        started = time.monotonic()
+        prompt_model(word, model, prompt_template, options)
+        return time.monotonic() - started
+    
+    started = time.monotonic()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        latencies = list(executor.map(timed, requests))
+    elapsed = time.monotonic() - started
+    return {
+        "concurrency": concurrency,
+        "throughput": len(requests) / elapsed,
+        "p95": percentile(latencies, 95),
+    }
+
+
+def _power(level: dict) -> float:
+    """Throughput over p95 latency; it peaks where more concurrency starts to only add queueing"""
+    return level["throughput"] / level["p95"] if level["p95"] > 0 else 0.0
+
+
+def find_knee(levels: list[dict]) -> int:
+    """Concurrency at the knee of the throughput/latency curve (highest power, lowest concurrency on ties)"""
+    return max(levels, key=lambda level: (_power(level), -level["concurrency"]))["concurrency"]
+
+
+def autotune_model(model: str, words: list[str], prompt_template: str, levels: tuple[int, ...] = DEFAULT_LEVELS,
+                   options: dict | None = None, on_level=None) -> dict:
+    """Measure increasing concurrency levels for a model and pick the knee
+
+    The search stops once PATIENCE levels in a row fall short of the best
+    one, since past saturation extra requests only queue. on_level is called
+    with each measured level. Returns {"concurrency", "levels"}.
+    """
+    measured = []
+    for concurrency in sorted(levels):
+        level = measure_level(model, words, prompt_template, concurrency, options)
+        measured.append(level)
+        if on_level is not None:
+            on_level(level)
+        best = find_knee(measured)
+        if sum(1 for other in measured if other["concurrency"] > best) >= PATIENCE:
+            break
+    return {"concurrency": find_knee(measured), "levels": measured}
+
+
+def _read_settings(path: str) -> dict:
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def save_concurrency(model: str, result: dict, path: str = CONCURRENCY_PATH):
+    """Persist a model's tuned concurrency for the current host"""
+    settings = _read_settings(path)
+    settings.setdefault(host_key(), {})[model] = {
+        "concurrency": result["concurrency"],
+        "levels": result["levels"],
+        "tuned": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+    }
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(settings, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+
+
+def load_concurrency(path: str = CONCURRENCY_PATH) -> dict[str, int]:
+    """Tuned concurrency per model for the current host ({} if none were tuned)"""
+    return {model: setting["concurrency"] for model, setting in _read_settings(path).get(host_key(), {}).items()}
@@ -0,0 +1,122 @@
+"""Token and cost budget for judge calls."""
+
+import threading
+
+# GPT-5 list prices, USD per million tokens
+JUDGE_INPUT_USD_PER_MILLION = 1.25
+JUDGE_OUTPUT_USD_PER_MILLION = 10.0
+
+# Output tokens assumed per judge call before its usage is known (includes reasoning tokens)
+EXPECTED_OUTPUT_TOKENS = 300
+
+
+class BudgetExceeded(Exception):
+    """Raised instead of making a judge call that could take the run past its budget"""
+
+
+class BudgetGovernor:
+    """Thread-safe token and dollar caps on judge calls
+
+    Each call reserves its estimated tokens before it is sent, so concurrent
+    calls cannot overshoot together, and is charged its actual usage once it
+    completes.
+    """
+    
+    def __init__(self, max_usd: float | None = None, max_tokens: int | None = None,
+                 input_usd_per_million: float = JUDGE_INPUT_USD_PER_MILLION,
+                 output_usd_per_million: float = JUDGE_OUTPUT_USD_PER_MILLION,
+                 expected_output_tokens: int = EXPECTED_OUTPUT_TOKENS):
+        self.max_usd = max_usd
+        self.max_tokens = max_tokens
+        self.input_usd_per_million = input_usd_per_million
+        self.output_usd_per_million = output_usd_per_million
+        self.expected_output_tokens = expected_output_tokens
+        self.calls = 0
+        self.input_tokens = 0
+        self.output_tokens = 0
+        self._reserved_input = 0
+        self._reserved_output = 0
+        self._lock = threading.Lock()
+    
+    def cost(self, input_tokens: int, output_tokens: int) -> float:
+        """Dollar cost of a number of input and output tokens"""
+        return (input_tokens * self.input_usd_per_million + output_tokens * self.output_usd_per_million) / 1_000_000
+    
+    def _exceeds(self, input_tokens: int, output_tokens: int) -> bool:
+        if self.max_tokens is not None and input_tokens + output_tokens > self.max_tokens:
+            return True
+        return self.max_usd is not None and self.cost(input_tokens, output_tokens) > self.max_usd
+    
+    def reserve(self, input_tokens: int) -> tuple[int, int]:
+        """Reserve an estimated call, raising BudgetExceeded if it could break a cap"""
+        reservation = (input_tokens, self.expected_output_tokens)
+        with self._lock:
+            if self._exceeds(self.input_tokens + self._reserved_input + reservation[0],
+                             self.output_tokens + self._reserved_output + reservation[1]):
+                raise BudgetExceeded(
+                    f"judge budget reached after {self.calls} calls "
+                    f"({self.input_tokens + self.output_tokens} tokens, ${self.spent_usd:.2f})"
+                )
+            self._reserved_input += reservation[0]
+            self._reserved_output += reservation[1]
+        return reservation
+    
+    def release(self, reservation: tuple[int, int]):
+        """Drop a reservation for a call that failed without usage"""
+        with self._lock:
+            self._reserved_input -= reservation[0]
+            self._reserved_output -= reservation[1]
+    
+    def record(self, reservation: tuple[int, int], usage=None):
+        """Charge a completed call its reported usage, or its reservation when usage is missing"""
+        input_tokens, output_tokens = reservation
+        prompt_tokens = getattr(usage, "prompt_tokens", None)
+        completion_tokens = getattr(usage, "completion_tokens", None)
+        if isinstance(prompt_tokens, int) and isinstance(completion_tokens, int):
+            input_tokens, output_tokens = prompt_tokens, completion_tokens
+        
+        with self._lock:
+            self._reserved_input -= reservation[0]
+            self._reserved_output -= reservation[1]
+            self.calls += 1
+            self.input_tokens += input_tokens
+            self.output_tokens += output_tokens
+    
+    @property
+    def spent_usd(self) -> float:
+        return self.cost(self.input_tokens, self.output_tokens)
+    
+    def usage(self) -> dict:
+        """Calls, tokens and dollars charged so far"""
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "input_tokens": self.input_tokens,
+                "output_tokens": self.output_tokens,
+                "cost_usd": self.spent_usd,
+            }
+    
+    def projection(self, calls: int, input_tokens: int) -> dict:
+        """Projected usage for a number of judge calls with known estimated input tokens"""
+        output_tokens = calls * self.expected_output_tokens
+        return {
+            "calls": calls,
+            "input_tokens": input_tokens,
+            "output_tokens": output_tokens,
+            "cost_usd": self.cost(input_tokens, output_tokens),
+            "within_budget": not self._exceeds(input_tokens, output_tokens),
+        }
+
+
+def format_projection(projection: dict, governor: BudgetGovernor) -> str:
+    """One-line projected judge cost, noting the configured caps"""
+    caps = [f"${governor.max_usd:.2f}" if governor.max_usd is not None else "",
+            f"{governor.max_tokens} tokens" if governor.max_tokens is not None else ""]
+    caps_text = " / ".join(cap for cap in caps if cap) or "no cap"
+    line = (
+        f"Projected judge cost: {projection['calls']} calls, ~{projection['input_tokens'] + projection['output_tokens']} tokens, "
+        f"~${projection['cost_usd']:.2f} (budget: {caps_text})"
+    )
+    if not projection["within_budget"]:
+        line += "; the run will stop when the budget is reached"
+    return line
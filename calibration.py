@@ -0,0 +1,57 @@
+"""Judge calibration: agreement and throughput of a candidate judge against the reference judge."""
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from evaluator import cohen_kappa
+from model_client import judge_response, judge_response_b
+from storage import load_prompt_result
+
+
+def stored_responses(models: list[str], vocabulary: list[dict], registry: dict[str, dict],
+                     limit: int | None = None) -> list[tuple[dict, dict, str]]:
+    """List (entry, prompt, response) for every stored response of the current template versions"""
+    items = []
+    for model in models:
+        for entry in vocabulary:
+            for prompt_id, prompt in registry.items():
+                response = load_prompt_result(model, entry["word"], prompt_id, prompt["version"]).get("response")
+                if response:
+                    items.append((entry, prompt, response))
+                if limit is not None and len(items) >= limit:
+                    return items
+    return items
+
+
+def _judge_all(items: list[tuple[dict, dict, str]], backend: dict | None, workers: int) -> tuple[list[str], float]:
+    """Judge every item with one backend, returning the verdicts and elapsed seconds"""
+    def judge(item: tuple[dict, dict, str]) -> str:
+        entry, prompt, response = item
+        judge_function = judge_response_b if prompt["judge"] == "usage" else judge_response
+        return judge_function(entry["word"], entry["answer"], response, backend)
+    
+    started = time.monotonic()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        verdicts = list(executor.map(judge, items))
+    return verdicts, time.monotonic() - started
+
+
+def calibrate_judges(models: list[str], vocabulary: list[dict], registry: dict[str, dict], candidate: dict,
+                     reference: dict | None = None, workers: int = 4, limit: int | None = None) -> dict:
+    """Judge the same stored responses with the reference and candidate judges and compare them
+
+    The reference defaults to the configured judge backend. Neither judge's
+    verdicts are saved. Returns agreement, Cohen's kappa and throughput.
+    """
+    items = stored_responses(models, vocabulary, registry, limit)
+    reference_verdicts, reference_seconds = _judge_all(items, reference, workers)
+    candidate_verdicts, candidate_seconds = _judge_all(items, candidate, workers)
+    
+    agreeing = sum(a == b for a, b in zip(reference_verdicts, candidate_verdicts))
+    return {
+        "items": len(items),
+        "agreement": agreeing / len(items) if items else 0.0,
+        "kappa": cohen_kappa(reference_verdicts, candidate_verdicts),
+        "reference_throughput": len(items) / reference_seconds if reference_seconds > 0 else 0.0,
+        "candidate_throughput": len(items) / candidate_seconds if candidate_seconds > 0 else 0.0,
+    }
@@ -0,0 +1,45 @@
+"""Cooperative cancellation for long evaluation runs."""
+
+import signal
+import threading
+from contextlib import contextmanager
+
+
+class CancellationToken:
+    """Flag checked by the run loops between work items"""
+    
+    def __init__(self):
+        self._event = threading.Event()
+    
+    def cancel(self):
+        """Request that no new work is started"""
+        self._event.set()
+    
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+
+@contextmanager
+def handle_interrupts(token: CancellationToken, on_cancel=None):
+    """Turn the first Ctrl-C into a cooperative cancel and let a second one abort immediately
+    
+    Only installs the handler on the main thread; elsewhere the token can still
+    be cancelled programmatically.
+    """
+    if threading.current_thread() is not threading.main_thread():
+        yield token
+        return
+    
+    def _handler(signum, frame):
+        if token.cancelled:
+            raise KeyboardInterrupt
+        token.cancel()
+        if on_cancel is not None:
+            on_cancel()
+    
+    previous = signal.signal(signal.SIGINT, _handler)
+    try:
+        yield token
+    finally:
+        signal.signal(signal.SIGINT, previous)
@@ -0,0 +1,101 @@
+"""Record/replay cassettes of model and judge traffic for offline, deterministic runs."""
+
+import hashlib
+import json
+import threading
+import time
+from collections.abc import Callable
+
+from response_cache import NON_SEMANTIC_OPTIONS
+
+CASSETTE_MODES = ("record", "replay")
+
+
+class CassetteMiss(LookupError):
+    """Raised in replay mode for a request the cassette holds no recording of"""
+
+
+def request_key(kind: str, model: str, messages: list[dict], options: dict | None = None) -> str:
+    """Hash a call's kind, model, messages and generation options into a cassette key"""
+    semantic_options = {key: value for key, value in (options or {}).items() if key not in NON_SEMANTIC_OPTIONS}
+    payload = json.dumps([kind, model, messages, semantic_options], ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class Cassette:
+    """JSON Lines recording of model and judge calls, indexed by request key
+
+    In record mode every completed call appends one line with its request,
+    response and latency; an existing cassette is extended, so an
+    interrupted recording can be resumed. In replay mode calls are served
+    from the cassette, instantly or after their recorded latency
+    (realtime=True). A request recorded several times is replayed in
+    recorded order, the last recording repeating once they are used up.
+    """
+    
+    def __init__(self, path: str, mode: str = "replay", realtime: bool = False):
+        if mode not in CASSETTE_MODES:
+            raise ValueError(f"cassette mode must be one of {CASSETTE_MODES}, not {mode!r}")
+        self.path = path
+        self.mode = mode
+        self.realtime = realtime
+        self.recorded = 0
+        self.replayed = 0
+        self._lock = threading.Lock()
+        self._index: dict[str, list[dict]] = {}
+        self._served: dict[str, int] = {}
+        self._file = None
+        if mode == "replay":
+            with open(path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    if line.strip():
+                        entry = json.loads(line)
+                        self._index.setdefault(entry["key"], []).append(entry)
+        else:
+            # Append mode: each line is a single write, so worker processes can share one cassette
+            self._file = open(path, 'a', encoding='utf-8')
+    
+    def __len__(self) -> int:
+        return sum(len(entries) for entries in self._index.values())
+    
+    def call(self, kind: str, model: str, messages: list[dict], options: dict | None, send: Callable[[], str]) -> str:
+        """Serve a call from the cassette (replay) or make it with send() and record it (record)"""
+        key = request_key(kind, model, messages, options)
+        if self.mode == "replay":
+            return self._replay(key, kind, model)
+        
+        started = time.monotonic()
+        response = send()
+        entry = {
+            "key": key, "kind": kind, "model": model, "messages": messages,
+            "response": response, "seconds": round(time.monotonic() - started, 6),
+        }
+        with self._lock:
+            self._file.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            self._file.flush()
+            self.recorded += 1
+        return response
+    
+    def _replay(self, key: str, kind: str, model: str) -> str:
+        with self._lock:
+            entries = self._index.get(key)
+            if not entries:
+                raise CassetteMiss(f"no recorded {kind} call to {model} for this request in {self.path}")
+            served = self._served.get(key, 0)
+            self._served[key] = served + 1
+            self.replayed += 1
+        entry = entries[min(served, len(entries) - 1)]
+        if self.realtime:
+            time.sleep(entry["seconds"])
+        return entry["response"]
+    
+    def stats(self) -> dict:
+        """Calls recorded or replayed by this process"""
+        with self._lock:
+            return {"mode": self.mode, "recorded": self.recorded, "replayed": self.replayed}
+    
+    def close(self):
+        """Close the cassette file of a recording"""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
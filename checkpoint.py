@@ -0,0 +1,77 @@
+"""Checkpointed run progress so resumed runs report true completion and ETA."""
+
+import json
+import os
+import time
+from pathlib import Path
+
+CHECKPOINT_PATH = "output/checkpoint.json"
+
+
+def load_checkpoint(path: str = CHECKPOINT_PATH) -> dict:
+    """Load the last checkpoint, or an empty one if no run has been recorded"""
+    if Path(path).exists():
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    return {}
+
+
+class RunCheckpoint:
+    """Progress of a run, persisted periodically and cumulative across restarts
+
+    Throughput is measured over every session that contributed to the run, so
+    a resumed run can estimate its ETA before completing any new cells.
+    """
+
+    def __init__(self, total_cells: int, completed_cells: int, path: str = CHECKPOINT_PATH, interval: float = 30.0):
+        previous = load_checkpoint(path)
+        self.path = path
+        self.interval = interval
+        self.total_cells = total_cells
+        self.completed_cells = completed_cells
+        self.processed_cells = 0
+        self._base_processed = previous.get("processed_cells", 0)
+        self._base_seconds = previous.get("elapsed_seconds", 0.0)
+        self._started = time.monotonic()
+        self._last_saved = self._started
+
+    @property
+    def throughput(self) -> float:
+        """Cells per second across all sessions"""
+        seconds = self._base_seconds + (time.monotonic() - self._started)
+        processed = self._base_processed + self.processed_cells
+        return processed / seconds if seconds > 0 else 0.0
+
+    def eta_seconds(self) -> float | None:
+        """Estimated seconds until every cell is complete, or None without throughput data"""
+        throughput = self.throughput
+        if throughput <= 0:
+            return None
+        return (self.total_cells - self.completed_cells) / throughput
+
+    def advance(self, cells: int = 1):
+        """Record finished cells, saving the checkpoint if the interval has elapsed"""
+        self.completed_cells += cells
+        self.processed_cells += cells
+        if time.monotonic() - self._last_saved >= self.interval:
+            self.save()
+
+    def save(self, cancelled: bool = False) -> dict:
+        """Write the checkpoint atomically and return it"""
+        checkpoint = {
+            "total_cells": self.total_cells,
+            "completed_cells": self.completed_cells,
+            "processed_cells": self._base_processed + self.processed_cells,
+            "elapsed_seconds": self._base_seconds + (time.monotonic() - self._started),
+            "throughput": self.throughput,
+            "cancelled": cancelled,
+            "updated": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        }
+
+        Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(checkpoint, f, indent=2)
+        os.replace(tmp_path, self.path)
+        self._last_saved = time.monotonic()
+        return checkpoint
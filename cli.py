@@ -0,0 +1,542 @@
+"""Command-line entry point for the Spanish lexicon evaluation.
+
+Subcommands import their dependencies lazily, so `summarize`, `status` and
+`export` never load the OpenAI/Ollama clients or tqdm.
+"""
+
+import argparse
+import sys
+
+
+def _add_run_arguments(parser: argparse.ArgumentParser):
+    """Arguments shared by the commands that call models"""
+    parser.add_argument("--workers", type=int, default=4, help="concurrent prompt × model × word cells")
+    parser.add_argument("--schedule", choices=("model", "interleaved"), default="model",
+                        help="finish each model in turn, or take word batches across all models (fair partial summaries)")
+    parser.add_argument("--batch-words", type=int, default=16, help="words per model turn in the interleaved schedule")
+    parser.add_argument("--seed", type=int, default=None, help="random seed for the word order (not with --stream)")
+    parser.add_argument("--stream", action="store_true", help="stream the vocabulary through bounded queues (memory-bounded mode)")
+    parser.add_argument("--queue-size", type=int, default=64, help="cells buffered between stages in streaming mode")
+    parser.add_argument("--memory-report", action="store_true", help="trace peak memory per stage in streaming mode (slower)")
+    parser.add_argument("--cache", default=None, help="SQLite file caching deterministic model responses")
+    parser.add_argument("--max-judge-usd", type=float, default=None, help="stop before judge calls could cost more than this")
+    parser.add_argument("--max-judge-tokens", type=int, default=None, help="stop before judge calls could use more tokens than this")
+    parser.add_argument("--judge-model", default=None, help="judge model (default: $JUDGE_MODEL or gpt-5)")
+    parser.add_argument("--judge-base-url", default=None, help="OpenAI-compatible judge endpoint, e.g. http://localhost:11434/v1")
+    parser.add_argument("--judge-free", action="store_true", help="never charge judge calls to the budget (default: only local endpoints)")
+    parser.add_argument("--replace-judgments", action="store_true", help="re-judge cells already judged by another judge model")
+    parser.add_argument("--similarity", action="store_true", help="auto-label prompt A responses by similarity to the reference")
+    parser.add_argument("--similarity-low", type=float, default=0.05, help="similarity at or below which a definition is incorrect")
+    parser.add_argument("--similarity-high", type=float, default=0.8, help="similarity at or above which a definition is correct")
+    parser.add_argument("--hedge", action="store_true", help="duplicate judge calls still running past the observed p95 latency")
+    parser.add_argument("--hedge-max-extra", type=float, default=0.05, help="cap on duplicate judge calls, as a fraction of all calls")
+    parser.add_argument("--hedge-percentile", type=float, default=95, help="latency percentile after which a judge call is hedged")
+    parser.add_argument("--compress", action="store_true", help="write response records dictionary-compressed (see `compress`)")
+    parser.add_argument("--clean-output", action="store_true", help="strip reasoning, markdown and preambles from model output")
+    parser.add_argument("--max-response-chars", type=int, default=2000, help="truncate cleaned responses to this many characters")
+    cassette = parser.add_mutually_exclusive_group()
+    cassette.add_argument("--record", default=None, metavar="CASSETTE", help="record every model and judge call to this file")
+    cassette.add_argument("--replay", default=None, metavar="CASSETTE", help="serve model and judge calls from a recorded cassette")
+    parser.add_argument("--replay-realtime", action="store_true", help="wait each replayed call's recorded latency")
+
+
+def _postprocess_settings(args: argparse.Namespace) -> dict | None:
+    """Response cleaning settings, or None to store raw model output"""
+    from postprocess import CLEANING_SETTINGS
+    return {**CLEANING_SETTINGS, "max_chars": args.max_response_chars} if args.clean_output else None
+
+
+def _cassette_arguments(args: argparse.Namespace) -> tuple[str, str, bool] | None:
+    """(path, mode, realtime) of the requested cassette, or None"""
+    if args.record:
+        return args.record, "record", False
+    if args.replay:
+        return args.replay, "replay", args.replay_realtime
+    return None
+
+
+def _load_suite(resolve_digests=None, stream: bool = False):
+    """Load models, prompt registry and vocabulary
+
+    Without resolve_digests, the aliases found by the last run that resolved
+    digests are left out of the models. stream returns the vocabulary as a
+    VocabularyStream rather than a list.
+    """
+    from data_loader import VocabularyStream, load_model_aliases, load_models, load_prompt_registry, load_vocabulary
+    if resolve_digests is not None:
+        models = load_models(resolve_digests)
+    else:
+        aliases = load_model_aliases()
+        models = [model for model in load_models() if model not in aliases]
+    return models, load_prompt_registry(), VocabularyStream() if stream else load_vocabulary()
+
+
+def cmd_run(args: argparse.Namespace) -> int:
+    """Prompt, judge and summarize"""
+    from main import main
+    if args.stream and (args.adaptive or args.queue):
+        print("--stream cannot be combined with --adaptive or --queue")
+        return 2
+    main(adaptive=args.adaptive, target_width=args.target_width, min_words=args.min_words, seed=args.seed,
+         workers=args.workers, cache_path=args.cache, queue_path=args.queue, processes=args.processes,
+         status=args.status, status_port=args.status_port, status_interval=args.status_interval,
+         max_judge_usd=args.max_judge_usd, max_judge_tokens=args.max_judge_tokens,
+         judge_model=args.judge_model, judge_base_url=args.judge_base_url, judge_free=args.judge_free,
+         replace_judgments=args.replace_judgments,
+         similarity=args.similarity, similarity_low=args.similarity_low, similarity_high=args.similarity_high,
+         cassette=_cassette_arguments(args),
+         hedge=(args.hedge_max_extra, args.hedge_percentile) if args.hedge else None,
+         postprocess=_postprocess_settings(args), compress=args.compress,
+         schedule=args.schedule, batch_words=args.batch_words,
+         stream=args.stream, queue_size=args.queue_size, memory_report=args.memory_report)
+    return 0
+
+
+def _run_phase(args: argparse.Namespace, phase: str) -> int:
+    """Run a single phase over the pending cells"""
+    from contextlib import nullcontext
+    from budget import BudgetExceeded, BudgetGovernor, format_projection
+    from cancellation import CancellationToken, handle_interrupts
+    from autotune import load_concurrency
+    from cassette import Cassette
+    from data_loader import load_model_options
+    from evaluator import postprocess_savings
+    from hedging import HedgePolicy
+    from postprocess import configure_postprocessing
+    from record_codec import current_codec
+    from storage import configure_compression
+    from model_client import (
+        configure_cassette, configure_judge_backend, configure_judge_budget, configure_judge_hedging,
+        configure_model_concurrency, configure_response_cache, resolve_model_digests
+    )
+    from response_cache import ResponseCache
+    from run_status import RunMetrics
+    from runner import pending_judge_tokens, run_matrix
+    from similarity import ReferenceIndex, configure_similarity
+    from streaming import StageMemory, run_streaming
+    
+    models, registry, vocabulary = _load_suite(resolve_model_digests, stream=args.stream)
+    metrics = RunMetrics()
+    similarity_index = ReferenceIndex(vocabulary) if args.similarity else None
+    configure_similarity(similarity_index, args.similarity_low, args.similarity_high)
+    judge_backend = configure_judge_backend(args.judge_model, args.judge_base_url, free=args.judge_free or None,
+                                           replace=args.replace_judgments)
+    cache = ResponseCache(args.cache) if args.cache else None
+    configure_response_cache(cache)
+    budget = BudgetGovernor(args.max_judge_usd, args.max_judge_tokens)
+    configure_judge_budget(budget)
+    cassette_arguments = _cassette_arguments(args)
+    cassette = Cassette(*cassette_arguments) if cassette_arguments else None
+    configure_cassette(cassette)
+    tuned = {model: limit for model, limit in load_concurrency().items() if model in models}
+    configure_model_concurrency(tuned)
+    workers = max(args.workers, *tuned.values()) if tuned else args.workers
+    hedging = HedgePolicy(args.hedge_max_extra, args.hedge_percentile) if args.hedge else None
+    configure_judge_hedging(hedging)
+    configure_postprocessing(_postprocess_settings(args))
+    if args.compress:
+        codec = current_codec()
+        if codec is None:
+            print("no compression dictionary yet (see `compress`); records are written as JSON")
+        configure_compression(codec)
+    if phase == "judge" and not judge_backend["free"] and not args.replay:
+        print(format_projection(budget.projection(*pending_judge_tokens(models, vocabulary, registry)), budget))
+    
+    try:
+        with handle_interrupts(CancellationToken()) as cancel_token:
+            if args.stream:
+                with StageMemory() if args.memory_report else nullcontext() as memory:
+                    processed = run_streaming(models, vocabulary, registry, max_workers=workers,
+                                              model_options=load_model_options(), cancel_token=cancel_token, phases=(phase,),
+                                              metrics=metrics, schedule=args.schedule, batch_words=args.batch_words,
+                                              queue_size=args.queue_size)
+            else:
+                processed = run_matrix(models, vocabulary, registry, max_workers=workers,
+                                       model_options=load_model_options(), cancel_token=cancel_token, phases=(phase,),
+                                       metrics=metrics, schedule=args.schedule, batch_words=args.batch_words, seed=args.seed)
+    except BudgetExceeded as error:
+        print(f"stopped: {error}; re-run with a higher cap to resume")
+        return 3
+    finally:
+        configure_judge_budget(None)
+        configure_judge_backend()
+        configure_similarity(None)
+        if similarity_index is not None:
+            similarity_index.close()
+        if cache is not None:
+            configure_response_cache(None)
+            cache.close()
+        if cassette is not None:
+            configure_cassette(None)
+            cassette.close()
+        configure_model_concurrency(None)
+        if hedging is not None:
+            configure_judge_hedging(None)
+            hedging.close()
+        configure_postprocessing()
+        configure_compression(None)
+    print(f"{phase}: processed {processed} cells")
+    if args.stream and args.memory_report:
+        print("peak memory: " + ", ".join(f"{stage} {size / 2 ** 20:.2f} MiB" for stage, size in memory.report().items()))
+    if phase == "prompt" and args.clean_output:
+        for model, savings in postprocess_savings(models, vocabulary, registry).items():
+            print(f"{model}: {savings['cleaned']}/{savings['responses']} responses cleaned, ~{savings['tokens_saved']} judge input tokens saved")
+    if cassette is not None:
+        stats = cassette.stats()
+        print(f"cassette {cassette.path}: {stats['recorded']} calls recorded, {stats['replayed']} replayed")
+    if phase == "judge":
+        usage = budget.usage()
+        print(f"judge usage: {usage['calls']} calls, {usage['input_tokens'] + usage['output_tokens']} tokens, ${usage['cost_usd']:.2f}")
+        print(f"pre-judge rules and similarity settled {metrics.snapshot()['prejudged']} cells without a judge call")
+        if hedging is not None:
+            stats = hedging.stats()
+            print(
+                f"hedging: {stats['hedged']} of {stats['calls']} judge calls duplicated ({stats['extra_fraction'] * 100:.1f}% extra), "
+                f"{stats['hedge_wins']} duplicates won, ~{stats['saved_seconds']:.1f}s of tail latency saved"
+            )
+    return 130 if cancel_token.cancelled else 0
+
+
+def cmd_prompt(args: argparse.Namespace) -> int:
+    """Prompt models for every pending cell without judging"""
+    return _run_phase(args, "prompt")
+
+
+def cmd_judge(args: argparse.Namespace) -> int:
+    """Judge every stored response that has no judgment yet"""
+    return _run_phase(args, "judge")
+
+
+def cmd_summarize(args: argparse.Namespace) -> int:
+    """Regenerate summary.json and word_analysis.json from stored judgments"""
+    from data_loader import load_model_aliases
+    from reporter import generate_summary, generate_word_analysis
+    
+    models, registry, vocabulary = _load_suite()
+    prompt_ids = tuple(registry)
+    prompt_versions = {prompt_id: prompt["version"] for prompt_id, prompt in registry.items()}
+    generate_summary(models, vocabulary, None, prompt_ids, prompt_versions, load_model_aliases(), partial=args.partial)
+    if args.words:
+        generate_word_analysis(models, vocabulary, prompt_ids=prompt_ids, prompt_versions=prompt_versions)
+    return 0
+
+
+def cmd_status(args: argparse.Namespace) -> int:
+    """Print completion and partial accuracy per model and prompt"""
+    import json
+    from pathlib import Path
+    from checkpoint import load_checkpoint
+    from data_loader import load_model_aliases
+    from evaluator import progress_counts
+    from run_status import STATUS_PATH
+    
+    models, registry, vocabulary = _load_suite()
+    counts = progress_counts(models, vocabulary, registry)
+    
+    print(f"{'model':<24} {'prompt':<12} {'responses':>11} {'judged':>11} {'accuracy':>9}")
+    for model, prompts in counts.items():
+        for prompt_id, cell_counts in prompts.items():
+            accuracy = cell_counts["correct"] / cell_counts["judged"] * 100 if cell_counts["judged"] else 0.0
+            print(
+                f"{model:<24} {prompt_id:<12} "
+                f"{cell_counts['responses']:>5}/{cell_counts['total']:<5} "
+                f"{cell_counts['judged']:>5}/{cell_counts['total']:<5} "
+                f"{accuracy:>8.1f}%"
+            )
+    for alias, model in load_model_aliases().items():
+        print(f"{alias:<24} alias of {model} (same weights, not evaluated separately)")
+    
+    checkpoint = load_checkpoint()
+    if checkpoint:
+        print(
+            f"last checkpoint {checkpoint['updated']}: {checkpoint['completed_cells']}/{checkpoint['total_cells']} cells, "
+            f"{checkpoint['throughput']:.2f} cells/s{' (cancelled)' if checkpoint['cancelled'] else ''}"
+        )
+    
+    if Path(STATUS_PATH).exists():
+        live = json.loads(Path(STATUS_PATH).read_text(encoding='utf-8'))
+        throughput = ", ".join(f"{phase} {rate:.2f}/s" for phase, rate in live["throughput"].items()) or "no completions yet"
+        print(
+            f"live status {live['updated']}: {live['in_flight']} in flight, {throughput}, "
+            f"{live['errors']} errors, {live['retries']} retries"
+        )
+    return 0
+
+
+def cmd_changes(args: argparse.Namespace) -> int:
+    """Report stored cells whose prompt, cleaning settings, reference answer, rubric or judge model changed since they were made"""
+    from model_client import configure_judge_backend
+    from runner import stale_cells
+    
+    models, registry, vocabulary = _load_suite()
+    configure_judge_backend(args.judge_model, args.judge_base_url, replace=args.replace_judgments)
+    try:
+        counts = stale_cells(models, vocabulary, registry)
+    finally:
+        configure_judge_backend()
+    
+    print(f"{'model':<24} {'prompt':<12} {'re-prompt':>10} {'re-judge':>10}")
+    for model, prompts in counts.items():
+        for prompt_id, cell_counts in prompts.items():
+            print(f"{model:<24} {prompt_id:<12} {cell_counts['prompt']:>10} {cell_counts['judge']:>10}")
+    cells = [cell_counts for prompts in counts.values() for cell_counts in prompts.values()]
+    print(f"{sum(c['prompt'] for c in cells)} cells to re-prompt, {sum(c['judge'] for c in cells)} to re-judge only")
+    return 0
+
+
+def cmd_export(args: argparse.Namespace) -> int:
+    """Export every stored cell as CSV"""
+    import csv
+    from storage import load_response
+    
+    models, registry, vocabulary = _load_suite()
+    output = open(args.output, 'w', encoding='utf-8', newline='') if args.output else sys.stdout
+    try:
+        writer = csv.writer(output)
+        writer.writerow(["model", "word", "prompt_id", "prompt_version", "response", "judgment"])
+        for model in models:
+            for entry in vocabulary:
+                response_data = load_response(model, entry["word"])
+                for prompt_id, versions in response_data.get("prompts", {}).items():
+                    for version, result in versions.items():
+                        writer.writerow([model, entry["word"], prompt_id, version, result.get("response", ""), result.get("judgment", "")])
+    finally:
+        if output is not sys.stdout:
+            output.close()
+    return 0
+
+
+def cmd_autotune(args: argparse.Namespace) -> int:
+    """Find and persist the concurrency at the knee of each model's throughput/latency curve"""
+    from autotune import autotune_model, host_key, save_concurrency
+    from data_loader import load_model_options
+    
+    models, registry, vocabulary = _load_suite()
+    model_options = load_model_options()
+    words = [entry["word"] for entry in vocabulary[:args.words]]
+    levels = tuple(int(level) for level in args.levels.split(","))
+    
+    for model in args.models or models:
+        print(f"{model} on {host_key()}:")
+        result = autotune_model(
+            model, words, registry[args.prompt]["template"], levels, model_options.get(model),
+            on_level=lambda level: print(f"  {level['concurrency']:>3} in flight: {level['throughput']:.2f} req/s, p95 {level['p95']:.2f}s")
+        )
+        save_concurrency(model, result)
+        print(f"  knee: {result['concurrency']} in flight")
+    return 0
+
+
+def cmd_compress(args: argparse.Namespace) -> int:
+    """Train a compression dictionary on the stored records and rewrite them compressed"""
+    from data_loader import load_models
+    from storage import configure_compression, recompress_records, storage_stats, train_compression
+    
+    # Every listed tag, aliases included, so records stored before a tag became an alias are compressed too
+    models = load_models()
+    before = sum(stats["bytes"] for stats in storage_stats(models).values())
+    codec = train_compression(models, args.dictionary_size, args.min_records)
+    if codec is None:
+        print(f"fewer than {args.min_records} stored records; not enough to train a dictionary, nothing compressed")
+        return 1
+    configure_compression(codec)
+    try:
+        rewritten = recompress_records(models)
+    finally:
+        configure_compression(None)
+    after = sum(stats["bytes"] for stats in storage_stats(models).values())
+    print(f"{codec.codec} dictionary {codec.id.hex()} ({len(codec.dictionary)} bytes); rewrote {rewritten} records")
+    print(f"on disk: {before} -> {after} bytes")
+    return 0
+
+
+def cmd_stats(args: argparse.Namespace) -> int:
+    """Report bytes on disk per model against the same records as pretty-printed JSON"""
+    from data_loader import load_models
+    from storage import storage_stats
+    
+    stats = storage_stats(load_models())
+    print(f"{'model':<24} {'records':>8} {'on disk':>12} {'as JSON':>12} {'saved':>7}")
+    for model, model_stats in stats.items():
+        saved = 1 - model_stats["bytes"] / model_stats["json_bytes"] if model_stats["json_bytes"] else 0.0
+        print(f"{model:<24} {model_stats['records']:>8} {model_stats['bytes']:>12} {model_stats['json_bytes']:>12} {saved * 100:>6.1f}%")
+    on_disk = sum(model_stats["bytes"] for model_stats in stats.values())
+    as_json = sum(model_stats["json_bytes"] for model_stats in stats.values())
+    if as_json:
+        print(f"{'total':<24} {sum(model_stats['records'] for model_stats in stats.values()):>8} {on_disk:>12} {as_json:>12} "
+              f"{(1 - on_disk / as_json) * 100:>6.1f}%")
+    return 0
+
+
+def cmd_compare(args: argparse.Namespace) -> int:
+    """Diff two recorded runs; exits 1 when a pipeline or accuracy regression is flagged"""
+    from run_registry import compare_runs, find_run, load_runs
+    
+    runs = load_runs()
+    if args.list or len(runs) < 2:
+        for run in runs:
+            print(f"{run['run_id']}  {run['started']}  {run['pipeline']['items']} items  code {run['suite']['code'] or '-'}"
+                  f"{'  (cancelled)' if run['cancelled'] else ''}")
+        if not args.list:
+            print(f"{len(runs)} runs recorded; compare needs two")
+        return 0 if args.list else 2
+    
+    try:
+        base, new = find_run(runs, args.base), find_run(runs, args.new)
+    except (KeyError, IndexError) as error:
+        print(f"no such run: {error}")
+        return 2
+    comparison = compare_runs(base, new)
+    
+    print(f"{base['run_id']} -> {new['run_id']}")
+    if comparison["suite_changes"]:
+        print(f"suite changed: {', '.join(comparison['suite_changes'])}")
+    for model, keys in comparison["accuracy"].items():
+        for key, values in keys.items():
+            print(f"  {model:<24} {key:<20} {values['base']:>6.1f}% -> {values['new']:>6.1f}% ({values['delta']:+.1f})")
+    for name, values in comparison["pipeline"].items():
+        change = f"{values['change'] * 100:+.0f}%" if values["change"] is not None else "n/a"
+        print(f"  {name:<45} {values['base']:>10.3f} -> {values['new']:>10.3f} ({change})")
+    for regression in comparison["regressions"]:
+        print(f"REGRESSION: {regression}")
+    return 1 if comparison["regressions"] else 0
+
+
+def cmd_measure_judge(args: argparse.Namespace) -> int:
+    """Report judge input tokens per call before and after the system-prefix layout"""
+    from data_loader import load_vocabulary
+    from judge_tokens import measure_judge_tokens
+    
+    measurement = measure_judge_tokens(load_vocabulary())
+    print(f"judge calls measured: {measurement['calls']} (estimated tokens, local mock server)")
+    print(f"before: {measurement['before']:.1f} input tokens per call")
+    print(f"after:  {measurement['after']:.1f} input tokens per call ({measurement['reduction'] * 100:.1f}% fewer)")
+    print(f"        {measurement['prefix']:.1f} in the shared system prefix, {measurement['per_item']:.1f} per item")
+    return 0
+
+
+def cmd_benchmark_memory(args: argparse.Namespace) -> int:
+    """Report peak traced memory of the matrix and streaming runners as the synthetic vocabulary grows"""
+    from memory_benchmark import run_memory_benchmark
+    
+    sizes = tuple(int(size) for size in args.sizes.split(","))
+    results = run_memory_benchmark(sizes, tuple(args.modes.split(",")), args.workers, args.queue_size)
+    print(f"{'mode':<10} {'words':>8} {'cells':>8} {'peak MiB':>9}  peak per stage (MiB)")
+    for result in results:
+        stages = ", ".join(f"{stage} {size / 2 ** 20:.2f}" for stage, size in result["stages"].items() if size)
+        print(f"{result['mode']:<10} {result['words']:>8} {result['cells']:>8} {result['peak'] / 2 ** 20:>9.2f}  {stages}")
+    for mode in dict.fromkeys(result["mode"] for result in results):
+        peaks = [result["peak"] for result in results if result["mode"] == mode]
+        print(f"{mode}: peak x{peaks[-1] / peaks[0]:.2f} from {sizes[0]} to {sizes[-1]} words")
+    return 0
+
+
+def cmd_calibrate(args: argparse.Namespace) -> int:
+    """Compare a candidate judge with the reference judge on stored responses"""
+    from calibration import calibrate_judges
+    from model_client import OLLAMA_HOST, configure_judge_backend
+    
+    models, registry, vocabulary = _load_suite()
+    configure_judge_backend(args.judge_model, args.judge_base_url)
+    candidate = {"model": args.candidate_model, "base_url": args.candidate_base_url or f"{OLLAMA_HOST}/v1", "api_key": None}
+    
+    result = calibrate_judges(models, vocabulary, registry, candidate, workers=args.workers, limit=args.limit)
+    print(f"responses judged by both: {result['items']}")
+    print(f"agreement: {result['agreement'] * 100:.1f}%  Cohen's kappa: {result['kappa']:.3f}")
+    print(f"throughput: reference {result['reference_throughput']:.2f}/s, candidate {result['candidate_throughput']:.2f}/s")
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """Build the argument parser with one subparser per command"""
+    parser = argparse.ArgumentParser(description="Spanish lexicon evaluation")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    
+    run = subparsers.add_parser("run", help="prompt, judge and summarize")
+    _add_run_arguments(run)
+    run.add_argument("--adaptive", action="store_true", help="stop evaluating a model once its accuracy is settled")
+    run.add_argument("--target-width", type=float, default=0.2, help="confidence interval width at which a model is settled")
+    run.add_argument("--min-words", type=int, default=10, help="minimum words per model before stopping early")
+    run.add_argument("--queue", default=None, help="SQLite work queue shared by distributed worker processes")
+    run.add_argument("--processes", type=int, default=2, help="worker processes to start in distributed mode")
+    run.add_argument("--status", action="store_true", help="periodically rewrite output/status.json with live progress")
+    run.add_argument("--status-port", type=int, default=None, help="serve live progress on http://127.0.0.1:PORT/status")
+    run.add_argument("--status-interval", type=float, default=10.0, help="seconds between status file rewrites")
+    run.set_defaults(handler=cmd_run)
+    
+    prompt = subparsers.add_parser("prompt", help="prompt models without judging")
+    _add_run_arguments(prompt)
+    prompt.set_defaults(handler=cmd_prompt)
+    
+    judge = subparsers.add_parser("judge", help="judge stored responses")
+    _add_run_arguments(judge)
+    judge.set_defaults(handler=cmd_judge)
+    
+    summarize = subparsers.add_parser("summarize", help="regenerate summary.json from stored judgments")
+    summarize.add_argument("--words", action="store_true", help="also regenerate word_analysis.json")
+    summarize.add_argument("--partial", action="store_true", help="score every model on only the words all models have judged")
+    summarize.set_defaults(handler=cmd_summarize)
+    
+    status = subparsers.add_parser("status", help="show progress and partial accuracy")
+    status.set_defaults(handler=cmd_status)
+    
+    changes = subparsers.add_parser("changes", help="count cells the next run redoes because their inputs changed")
+    changes.add_argument("--judge-model", default=None, help="judge model the next run will use (default: $JUDGE_MODEL or gpt-5)")
+    changes.add_argument("--judge-base-url", default=None, help="judge endpoint the next run will use (default: OpenAI API)")
+    changes.add_argument("--replace-judgments", action="store_true", help="count cells judged by another judge model as re-judged")
+    changes.set_defaults(handler=cmd_changes)
+    
+    export = subparsers.add_parser("export", help="export stored cells as CSV")
+    export.add_argument("--output", default=None, help="CSV file to write (default: stdout)")
+    export.set_defaults(handler=cmd_export)
+    
+    calibrate = subparsers.add_parser("calibrate", help="compare a candidate (e.g. local) judge with the reference judge")
+    calibrate.add_argument("candidate_model", help="candidate judge model, e.g. an Ollama tag")
+    calibrate.add_argument("--candidate-base-url", default=None, help="candidate endpoint (default: Ollama's /v1 at $OLLAMA_HOST)")
+    calibrate.add_argument("--judge-model", default=None, help="reference judge model (default: $JUDGE_MODEL or gpt-5)")
+    calibrate.add_argument("--judge-base-url", default=None, help="reference judge endpoint (default: OpenAI API)")
+    calibrate.add_argument("--limit", type=int, default=None, help="judge at most this many stored responses")
+    calibrate.add_argument("--workers", type=int, default=4, help="concurrent judge requests per judge")
+    calibrate.set_defaults(handler=cmd_calibrate)
+    
+    compress = subparsers.add_parser("compress", help="train a dictionary on stored records and rewrite them compressed")
+    compress.add_argument("--dictionary-size", type=int, default=16 * 1024, help="dictionary size in bytes")
+    compress.add_argument("--min-records", type=int, default=100, help="stored records needed to train a dictionary")
+    compress.set_defaults(handler=cmd_compress)
+    
+    stats = subparsers.add_parser("stats", help="bytes on disk per model, compressed vs pretty-printed JSON")
+    stats.set_defaults(handler=cmd_stats)
+    
+    compare = subparsers.add_parser("compare", help="diff two recorded runs and flag pipeline or accuracy regressions")
+    compare.add_argument("base", nargs="?", default="-2", help="run id, id prefix or negative index (default: the run before the latest)")
+    compare.add_argument("new", nargs="?", default="-1", help="run id, id prefix or negative index (default: the latest run)")
+    compare.add_argument("--list", action="store_true", help="list recorded runs instead")
+    compare.set_defaults(handler=cmd_compare)
+    
+    autotune = subparsers.add_parser("autotune", help="measure and persist each model's best concurrency on this host")
+    autotune.add_argument("models", nargs="*", help="models to tune (default: every model in models_list.txt)")
+    autotune.add_argument("--levels", default="1,2,4,8,16", help="comma-separated concurrency levels to measure")
+    autotune.add_argument("--words", type=int, default=16, help="vocabulary words prompted at each level")
+    autotune.add_argument("--prompt", default="prompt_a", help="prompt id whose template is used")
+    autotune.set_defaults(handler=cmd_autotune)
+    
+    measure_judge = subparsers.add_parser("measure-judge", help="estimate judge input tokens per call on the vocabulary")
+    measure_judge.set_defaults(handler=cmd_measure_judge)
+    
+    benchmark_memory = subparsers.add_parser("benchmark-memory", help="peak memory of the matrix and streaming runners on growing vocabularies")
+    benchmark_memory.add_argument("--sizes", default="1000,3000,9000", help="comma-separated synthetic vocabulary sizes")
+    benchmark_memory.add_argument("--modes", default="matrix,streaming", help="comma-separated runners to measure")
+    benchmark_memory.add_argument("--workers", type=int, default=4, help="concurrent cells per stage")
+    benchmark_memory.add_argument("--queue-size", type=int, default=64, help="cells buffered between stages in streaming mode")
+    benchmark_memory.set_defaults(handler=cmd_benchmark_memory)
+    
+    return parser
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = build_parser().parse_args(argv)
+    return args.handler(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,17 +1,119 @@
 """Data loading utilities for Spanish lexicon evaluation."""
 
+import hashlib
 import json
+import os
+import re
+import unicodedata
+from collections.abc import Callable, Iterator
+from pathlib import Path
 
+VOCABULARY_PATH = "suite/vocabulary_short.json"
+VOCABULARY_INDEX_DIR = "output/index"
+ALIASES_PATH = "output/model_aliases.json"
 
-def load_models() -> list[str]:
-    """Load active models from models_list.txt (excluding # commented lines)"""
+_ARRAY_START = re.compile(r"\s*\[")
+_SEPARATOR = re.compile(r"[\s,]*")
+
+
+def load_models(resolve_digests: Callable[[list[str]], dict[str, str]] | None = None) -> list[str]:
+    """Load active models from models_list.txt (excluding # commented lines)
+    
+    With resolve_digests (tags -> {tag: weights digest}, e.g.
+    model_client.resolve_model_digests), tags naming the same weights with
+    the same options as an earlier tag are left out and recorded in
+    ALIASES_PATH (see load_model_aliases), so each set of weights is
+    evaluated once. When no digest resolves (Ollama unreachable) the
+    recorded aliases are kept and still applied to tags listed with their
+    model.
+    """
     models = []
     with open('suite/models_list.txt', 'r', encoding='utf-8') as f:
         for line in f:
             line = line.strip()
             if line and not line.startswith('#'):
-                models.append(line)
-    return models
+                # Anything after the model name is a key=value generation option
+                models.append(line.split()[0])
+    if resolve_digests is None:
+        return models
+    
+    digests = resolve_digests(models)
+    if not digests:
+        aliases = {alias: model for alias, model in load_model_aliases().items() if alias in models and model in models}
+        return [model for model in models if model not in aliases]
+    
+    aliases = model_aliases(models, digests, load_model_options())
+    Path(ALIASES_PATH).parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = f"{ALIASES_PATH}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(aliases, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, ALIASES_PATH)
+    return [model for model in models if model not in aliases]
+
+
+def model_aliases(models: list[str], digests: dict[str, str], options: dict[str, dict] | None = None) -> dict[str, str]:
+    """Map each tag whose digest and options match an earlier tag's to that earlier tag
+    
+    Tags without a digest are kept apart, and so are tags of the same weights
+    run with different options (see load_model_options).
+    """
+    options = options or {}
+    first_by_weights = {}
+    aliases = {}
+    for model in models:
+        digest = digests.get(model)
+        if digest is None:
+            continue
+        weights = (digest, json.dumps(options.get(model, {}), sort_keys=True))
+        if weights in first_by_weights and first_by_weights[weights] != model:
+            aliases[model] = first_by_weights[weights]
+        else:
+            first_by_weights.setdefault(weights, model)
+    return aliases
+
+
+def load_model_aliases() -> dict[str, str]:
+    """Aliases found by the last load_models call that resolved digests ({} if none did)"""
+    try:
+        with open(ALIASES_PATH, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def _parse_option_value(value: str) -> int | float | str:
+    """Convert a key=value option from models_list.txt to a number where possible"""
+    for cast in (int, float):
+        try:
+            return cast(value)
+        except ValueError:
+            pass
+    return value
+
+
+def load_model_options() -> dict[str, dict]:
+    """Load per-model backend and generation options
+    
+    Options come from the optional suite/model_options.json sidecar
+    ({"model": {"backend": "ollama", "num_predict": 256}}) and from key=value
+    pairs after the model name in models_list.txt, which take precedence.
+    """
+    options: dict[str, dict] = {}
+    sidecar = Path('suite/model_options.json')
+    if sidecar.exists():
+        with open(sidecar, 'r', encoding='utf-8') as f:
+            options = {model: dict(model_options) for model, model_options in json.load(f).items()}
+    
+    with open('suite/models_list.txt', 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            model, *pairs = line.split()
+            for pair in pairs:
+                key, _, value = pair.partition('=')
+                options.setdefault(model, {})[key] = _parse_option_value(value)
+    return options
 
 
 def load_prompts() -> dict:
@@ -20,7 +122,140 @@ def load_prompts() -> dict:
         return json.load(f)
 
 
+def prompt_version(template: str) -> str:
+    """Content hash identifying a prompt template version"""
+    return hashlib.sha256(template.encode('utf-8')).hexdigest()[:12]
+
+
+def load_prompt_registry() -> dict[str, dict]:
+    """Load prompts.json as a registry of prompt_id -> {"template", "judge", "version"}
+    
+    Entries are either a template string or an object with "template" and an
+    optional "judge" ("definition" or "usage"). prompt_b defaults to the usage
+    judge and every other prompt to the definition judge.
+    """
+    registry = {}
+    for prompt_id, entry in load_prompts().items():
+        if isinstance(entry, str):
+            entry = {"template": entry}
+        template = entry["template"]
+        registry[prompt_id] = {
+            "template": template,
+            "judge": entry.get("judge", "usage" if prompt_id == "prompt_b" else "definition"),
+            "version": prompt_version(template),
+        }
+    return registry
+
+
+def vocabulary_key(word: str) -> str:
+    """Normalised lookup key for a word: NFC, casefolded and trimmed (accents are kept, "año" is not "ano")"""
+    return unicodedata.normalize("NFC", word).strip().casefold()
+
+
+def word_id(word: str) -> int:
+    """Stable integer id of a word, derived from its normalised key so it survives vocabulary edits"""
+    return int.from_bytes(hashlib.sha256(vocabulary_key(word).encode('utf-8')).digest()[:6], 'big')
+
+
+def compile_vocabulary(vocabulary: list[dict]) -> dict:
+    """Compile vocabulary entries into {"keys": {key: id}, "entries": {id: entry}}
+    
+    Entries whose words share a normalised key (e.g. NFC and NFD spellings)
+    are duplicates and only the first is kept. Distinct keys hashing to the
+    same id raise ValueError rather than sharing a record.
+    """
+    keys: dict[str, int] = {}
+    entries: dict[int, dict] = {}
+    for entry in vocabulary:
+        key = vocabulary_key(entry["word"])
+        if key in keys:
+            continue
+        entry_id = word_id(entry["word"])
+        if entry_id in entries:
+            raise ValueError(f"vocabulary id collision between {entries[entry_id]['word']!r} and {entry['word']!r}")
+        keys[key] = entry_id
+        entries[entry_id] = entry
+    return {"keys": keys, "entries": entries}
+
+
+def load_vocabulary_index(path: str = VOCABULARY_PATH, index_dir: str = VOCABULARY_INDEX_DIR) -> dict:
+    """Load the compiled vocabulary index, rebuilding it only when the source file changes
+    
+    The index is cached as JSON named after the source file's content hash,
+    so an edited vocabulary never reads a stale index. JSON rather than a
+    pickle, since output/ may be shared and loading a pickle can run code.
+    """
+    with open(path, 'rb') as f:
+        source = f.read()
+    index_path = Path(index_dir) / f"vocabulary-{hashlib.sha256(source).hexdigest()[:16]}.json"
+    try:
+        with open(index_path, 'r', encoding='utf-8') as f:
+            cached = json.load(f)
+        # JSON object keys are strings, so entries are stored as [id, entry] pairs
+        return {"keys": cached["keys"], "entries": {entry_id: entry for entry_id, entry in cached["entries"]}}
+    except (FileNotFoundError, ValueError, KeyError, TypeError):
+        pass
+    
+    index = compile_vocabulary(json.loads(source.decode('utf-8')))
+    index_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = index_path.with_name(f".{index_path.name}.{os.getpid()}.tmp")
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({"keys": index["keys"], "entries": list(index["entries"].items())}, f, ensure_ascii=False)
+    os.replace(tmp_path, index_path)
+    return index
+
+
 def load_vocabulary() -> list[dict]:
-    """Load vocabulary from vocabulary_short.json"""
-    with open('suite/vocabulary_short.json', 'r', encoding='utf-8') as f:
-        return json.load(f)
\ No newline at end of file
+    """Load vocabulary from vocabulary_short.json, without duplicate words"""
+    return list(load_vocabulary_index()["entries"].values())
+
+
+def iter_vocabulary(path: str = VOCABULARY_PATH, chunk_size: int = 1 << 14) -> Iterator[dict]:
+    """Yield the entries of a vocabulary file one at a time, reading it in chunks rather than whole
+    
+    Duplicate words are not removed; a repeated word maps to the same
+    record as its first occurrence, so its cells are found already stored.
+    """
+    decoder = json.JSONDecoder()
+    with open(path, 'r', encoding='utf-8') as f:
+        buffer = f.read(chunk_size)
+        start = _ARRAY_START.match(buffer)
+        if start is None:
+            raise ValueError(f"{path} does not hold a JSON array")
+        position = start.end()
+        while True:
+            position = _SEPARATOR.match(buffer, position).end()
+            if buffer.startswith("]", position):
+                return
+            try:
+                entry, position = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                # The next entry runs past the buffer: keep its start and read on
+                chunk = f.read(chunk_size)
+                if not chunk:
+                    raise
+                buffer, position = buffer[position:] + chunk, 0
+                continue
+            yield entry
+
+
+class VocabularyStream:
+    """Re-iterable view of a vocabulary file that streams its entries on every pass
+    
+    Stands in for the vocabulary list where memory must not grow with the
+    vocabulary; len() counts the entries in one pass and remembers it.
+    """
+    
+    __slots__ = ("path", "_length")
+    
+    def __init__(self, path: str = VOCABULARY_PATH):
+        self.path = path
+        self._length = None
+    
+    def __iter__(self) -> Iterator[dict]:
+        return iter_vocabulary(self.path)
+    
+    def __len__(self) -> int:
+        if self._length is None:
+            self._length = sum(1 for _ in self)
+        return self._length
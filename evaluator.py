@@ -1,24 +1,211 @@
 """Evaluation utilities for calculating accuracy metrics."""
 
-from storage import load_response
+import math
 
+from storage import LEGACY_PROMPT_SUFFIXES, get_prompt_result, load_response, raw_response
+from token_estimate import estimate_tokens
 
-def calculate_accuracy(model: str, vocabulary: list[dict], prompt_type: str = "a") -> float:
-    """Calculate accuracy percentage for a model for a specific prompt type"""
+
+def prompt_id_for(prompt_type: str) -> str:
+    """Map the short "a"/"b" prompt types onto registry prompt ids"""
+    return f"prompt_{prompt_type}" if prompt_type in LEGACY_PROMPT_SUFFIXES.values() else prompt_type
+
+
+def calculate_accuracy(model: str, vocabulary: list[dict], prompt_type: str = "a", prompt_version: str | None = None) -> float:
+    """Calculate accuracy percentage for a model for a specific prompt type or prompt id"""
+    prompt_id = prompt_id_for(prompt_type)
     correct_count = 0
     total_count = len(vocabulary)
     
     for entry in vocabulary:
         word = entry["word"]
         response_data = load_response(model, word)
+        judgment_field = get_prompt_result(response_data, prompt_id, prompt_version).get("judgment")
         
-        # Check for judgment based on prompt type
-        if prompt_type == "a":
-            judgment_field = response_data.get("judgment_a")
-        else:  # prompt_type == "b"
-            judgment_field = response_data.get("judgment_b")
-            
         if judgment_field == "correct":
             correct_count += 1
     
-    return (correct_count / total_count) * 100 if total_count > 0 else 0
\ No newline at end of file
+    return (correct_count / total_count) * 100 if total_count > 0 else 0
+
+
+def progress_counts(models: list[str], vocabulary: list[dict], registry: dict[str, dict]) -> dict[str, dict[str, dict[str, int]]]:
+    """Count stored responses, judgments and correct judgments per model and prompt for the current template versions"""
+    counts = {
+        model: {prompt_id: {"total": len(vocabulary), "responses": 0, "judged": 0, "correct": 0} for prompt_id in registry}
+        for model in models
+    }
+    
+    for model in models:
+        for entry in vocabulary:
+            response_data = load_response(model, entry["word"])
+            for prompt_id, prompt in registry.items():
+                result = get_prompt_result(response_data, prompt_id, prompt["version"])
+                cell_counts = counts[model][prompt_id]
+                cell_counts["responses"] += bool(result.get("response"))
+                cell_counts["judged"] += bool(result.get("judgment"))
+                cell_counts["correct"] += result.get("judgment") == "correct"
+    
+    return counts
+
+
+def covered_words(models: list[str], vocabulary: list[dict], prompt_ids: tuple[str, ...],
+                  prompt_versions: dict[str, str] | None = None) -> list[dict]:
+    """Vocabulary entries judged for every prompt by every model, the common ground of a partial comparison"""
+    prompt_versions = prompt_versions or {}
+    return [
+        entry for entry in vocabulary
+        if all(
+            get_prompt_result(response_data, prompt_id, prompt_versions.get(prompt_id)).get("judgment")
+            for response_data in (load_response(model, entry["word"]) for model in models)
+            for prompt_id in prompt_ids
+        )
+    ]
+
+
+def postprocess_savings(models: list[str], vocabulary: list[dict], registry: dict[str, dict]) -> dict[str, dict[str, int]]:
+    """Count cleaned responses and the judge input tokens cleaning saved, per model, for the current template versions"""
+    savings = {model: {"responses": 0, "cleaned": 0, "tokens_saved": 0} for model in models}
+    for model in models:
+        for entry in vocabulary:
+            response_data = load_response(model, entry["word"])
+            for prompt_id, prompt in registry.items():
+                result = get_prompt_result(response_data, prompt_id, prompt["version"])
+                if not result.get("response"):
+                    continue
+                savings[model]["responses"] += 1
+                if "raw_response_z" in result:
+                    # The judge collapses whitespace itself, so only removed words and symbols count
+                    raw_tokens = estimate_tokens(" ".join(raw_response(result).split()))
+                    savings[model]["cleaned"] += 1
+                    savings[model]["tokens_saved"] += raw_tokens - estimate_tokens(" ".join(result["response"].split()))
+    return savings
+
+
+def wilson_interval(correct: int, total: int, z: float = 1.96) -> tuple[float, float]:
+    """Wilson score confidence interval for an accuracy proportion, as fractions in [0, 1]"""
+    if total == 0:
+        return 0.0, 1.0
+    
+    proportion = correct / total
+    denominator = 1 + z ** 2 / total
+    centre = (proportion + z ** 2 / (2 * total)) / denominator
+    margin = z * math.sqrt(proportion * (1 - proportion) / total + z ** 2 / (4 * total ** 2)) / denominator
+    return max(0.0, centre - margin), min(1.0, centre + margin)
+
+
+def cohen_kappa(labels_a: list[str], labels_b: list[str]) -> float:
+    """Cohen's kappa for agreement between two raters' labels on the same items"""
+    total = len(labels_a)
+    if total == 0:
+        return 0.0
+    
+    observed = sum(a == b for a, b in zip(labels_a, labels_b)) / total
+    expected = sum(
+        (labels_a.count(label) / total) * (labels_b.count(label) / total)
+        for label in set(labels_a) | set(labels_b)
+    )
+    if expected == 1:
+        return 1.0
+    return (observed - expected) / (1 - expected)
+
+
+def percentile(values: list[float], percent: float) -> float:
+    """Nearest-rank percentile"""
+    ordered = sorted(values)
+    return ordered[max(math.ceil(percent / 100 * len(ordered)) - 1, 0)]
+
+
+def build_correctness_matrix(models: list[str], vocabulary: list[dict], prompt_ids: tuple[str, ...] = ("prompt_a", "prompt_b"), prompt_versions: dict[str, str] | None = None) -> dict[str, dict[str, list[int]]]:
+    """Build a word × model correctness matrix in a single pass over stored responses
+
+    Each row is an integer bitmask over models (bit i set for models[i]), kept
+    separately for judged and correct cells so set operations over whole rows
+    replace per-cell loops in the analysis.
+    """
+    prompt_versions = prompt_versions or {}
+    matrix = {
+        prompt_id: {"judged": [0] * len(vocabulary), "correct": [0] * len(vocabulary)}
+        for prompt_id in prompt_ids
+    }
+    
+    for model_index, model in enumerate(models):
+        bit = 1 << model_index
+        for word_index, entry in enumerate(vocabulary):
+            response_data = load_response(model, entry["word"])
+            for prompt_id in prompt_ids:
+                judgment = get_prompt_result(response_data, prompt_id, prompt_versions.get(prompt_id)).get("judgment")
+                if judgment:
+                    matrix[prompt_id]["judged"][word_index] |= bit
+                    if judgment == "correct":
+                        matrix[prompt_id]["correct"][word_index] |= bit
+    
+    return matrix
+
+
+def word_features(entry: dict) -> dict[str, str]:
+    """Bucket a vocabulary entry by the features used to cluster failures"""
+    word = entry["word"]
+    word_length = len(word)
+    definition_length = len(entry["answer"].split())
+    
+    return {
+        "word_length": "short (≤5)" if word_length <= 5 else "medium (6-9)" if word_length <= 9 else "long (≥10)",
+        "diacritics": "ñ" if "ñ" in word.lower() else "ü" if "ü" in word.lower() else "accent" if any(c in "áéíóú" for c in word.lower()) else "none",
+        "definition_length": "short (≤10 words)" if definition_length <= 10 else "medium (11-20 words)" if definition_length <= 20 else "long (>20 words)",
+    }
+
+
+def analyze_word_difficulty(models: list[str], vocabulary: list[dict], prompt_ids: tuple[str, ...] = ("prompt_a", "prompt_b"), prompt_versions: dict[str, str] | None = None) -> dict:
+    """Rank words by model failures, find cross-prompt disagreements and cluster failures by feature"""
+    matrix = build_correctness_matrix(models, vocabulary, prompt_ids, prompt_versions)
+    
+    words = []
+    clusters: dict[str, dict[str, dict[str, int]]] = {}
+    for index, entry in enumerate(vocabulary):
+        failed = {
+            prompt_id: matrix[prompt_id]["judged"][index] & ~matrix[prompt_id]["correct"][index]
+            for prompt_id in prompt_ids
+        }
+        # A model disagrees with itself when it passes one prompt and fails another
+        passed_any = 0
+        failed_any = 0
+        for prompt_id in prompt_ids:
+            passed_any |= matrix[prompt_id]["correct"][index]
+            failed_any |= failed[prompt_id]
+        disagree = passed_any & failed_any
+        judged_cells = sum(matrix[prompt_id]["judged"][index].bit_count() for prompt_id in prompt_ids)
+        failed_cells = sum(mask.bit_count() for mask in failed.values())
+        
+        features = word_features(entry)
+        words.append({
+            "word": entry["word"],
+            "failures": {prompt_id: mask.bit_count() for prompt_id, mask in failed.items()},
+            "failure_rate": failed_cells / judged_cells if judged_cells else 0.0,
+            # A word every model passes (or fails) does not separate models
+            "discriminating": 0 < failed_cells < judged_cells,
+            "failed_models": {
+                prompt_id: [model for i, model in enumerate(models) if mask >> i & 1]
+                for prompt_id, mask in failed.items()
+            },
+            "disagreeing_models": [model for i, model in enumerate(models) if disagree >> i & 1],
+            "features": features,
+        })
+        
+        for feature, value in features.items():
+            bucket = clusters.setdefault(feature, {}).setdefault(value, {"judged": 0, "failed": 0})
+            bucket["judged"] += judged_cells
+            bucket["failed"] += failed_cells
+    
+    for buckets in clusters.values():
+        for bucket in buckets.values():
+            bucket["failure_rate"] = bucket["failed"] / bucket["judged"] if bucket["judged"] else 0.0
+    
+    words.sort(key=lambda w: (w["failure_rate"], sum(w["failures"].values())), reverse=True)
+    
+    return {
+        "models": models,
+        "prompt_ids": list(prompt_ids),
+        "words": words,
+        "disagreements": [w["word"] for w in words if w["disagreeing_models"]],
+        "feature_clusters": clusters,
+    }
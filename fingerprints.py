@@ -0,0 +1,45 @@
+"""Input fingerprints of stored cells, so a suite edit re-runs only the cells it affects."""
+
+import hashlib
+import json
+
+# Inputs behind a response, behind how the stored raw output was cleaned, and behind the judgment of that response
+PROMPT_INPUTS = ("prompt",)
+CLEANING_INPUTS = ("postprocess",)
+JUDGE_INPUTS = ("reference", "rubric", "judge_model")
+
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()[:12]
+
+
+def cell_inputs(template: str, word: str, correct_definition: str, rubric: str, judge_model: str,
+                postprocess: dict | None = None) -> dict:
+    """Fingerprints of the rendered prompt, response cleaning settings, reference answer and judge rubric, plus the judge model name"""
+    return {
+        "prompt": content_hash(template.format(word=word)),
+        "postprocess": content_hash(json.dumps(postprocess, sort_keys=True)) if postprocess else "raw",
+        "reference": content_hash(correct_definition),
+        "rubric": content_hash(rubric),
+        "judge_model": judge_model,
+    }
+
+
+def changed_inputs(stored: dict, current: dict) -> set[str]:
+    """Names of the inputs whose fingerprint differs; inputs missing from stored are not compared"""
+    return {name for name, fingerprint in stored.items() if name in current and current[name] != fingerprint}
+
+
+def invalidated_phases(changed: set[str]) -> tuple[str, ...]:
+    """Phases to redo for a cell: a new prompt needs a new response and judgment, other inputs only a new judgment
+    
+    New cleaning settings add "clean": the stored raw output is cleaned
+    again, without a model call, before the new judgment.
+    """
+    if changed & set(PROMPT_INPUTS):
+        return ("prompt", "judge")
+    if changed & set(CLEANING_INPUTS):
+        return ("clean", "judge")
+    if changed & set(JUDGE_INPUTS):
+        return ("judge",)
+    return ()
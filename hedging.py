@@ -0,0 +1,127 @@
+"""Hedged requests: duplicate a slow call once it passes the observed tail latency."""
+
+import threading
+import time
+from collections import deque
+from collections.abc import Callable
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from evaluator import percentile
+
+# Latencies observed before hedging starts, so the threshold is not set by a handful of calls
+MIN_SAMPLES = 20
+
+
+class HedgePolicy:
+    """Issue a duplicate of a call still running past the observed latency percentile; the first response wins
+
+    Duplicates are capped at max_extra of all calls. The threshold comes from
+    the latencies of the most recent window of unhedged attempts. Time saved
+    by a winning duplicate is estimated from those latencies as the expected
+    remaining time of an attempt that has already run as long as the call
+    took.
+    """
+    
+    def __init__(self, max_extra: float = 0.05, percent: float = 95, window: int = 500, max_workers: int = 64):
+        self.max_extra = max_extra
+        self.percent = percent
+        self.calls = 0
+        self.hedged = 0
+        self.hedge_wins = 0
+        self.saved_seconds = 0.0
+        self._latencies: deque[float] = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="hedge")
+    
+    def threshold(self) -> float | None:
+        """Latency after which a call is hedged, or None until enough calls were observed"""
+        with self._lock:
+            if len(self._latencies) < MIN_SAMPLES:
+                return None
+            return percentile(list(self._latencies), self.percent)
+    
+    def _observe(self, seconds: float):
+        with self._lock:
+            self._latencies.append(seconds)
+    
+    def _claim_hedge(self) -> bool:
+        """Count a duplicate if it keeps extra calls within max_extra"""
+        with self._lock:
+            if self.hedged + 1 > self.max_extra * self.calls:
+                return False
+            self.hedged += 1
+            return True
+    
+    def _expected_remaining(self, elapsed: float) -> float:
+        """Expected further time of an attempt already running for elapsed seconds (0 without data)"""
+        with self._lock:
+            longer = [seconds for seconds in self._latencies if seconds > elapsed]
+        return sum(longer) / len(longer) - elapsed if longer else 0.0
+    
+    def call(self, start: Callable[[], tuple[Callable[[], str], Callable[[], None]]]) -> str:
+        """Run an attempt from start() -> (run, cancel), hedging it with a second attempt when it is slow
+
+        The loser's cancel() is called once one attempt succeeds. If an attempt
+        fails, the other one is still awaited; the first error is raised only
+        when both fail.
+        """
+        with self._lock:
+            self.calls += 1
+        started = time.monotonic()
+        primary_run, primary_cancel = start()
+        primary = self._executor.submit(self._timed, primary_run)
+        
+        delay = self.threshold()
+        done, _ = wait([primary], timeout=delay)
+        if done or not self._claim_hedge():
+            seconds, result = primary.result()
+            self._observe(seconds)
+            return result
+        
+        hedge_run, hedge_cancel = start()
+        hedge = self._executor.submit(self._timed, hedge_run)
+        attempts = {primary: primary_cancel, hedge: hedge_cancel}
+        pending = set(attempts)
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for winner in done:
+                if winner.exception() is not None:
+                    error = error or winner.exception()
+                    continue
+                for loser in pending:
+                    attempts[loser]()
+                seconds, result = winner.result()
+                if winner is primary:
+                    self._observe(seconds)
+                else:
+                    # The cancelled primary ran at least this long; keeping it in the window keeps the tail visible
+                    elapsed = time.monotonic() - started
+                    saved = self._expected_remaining(elapsed)
+                    self._observe(elapsed)
+                    with self._lock:
+                        self.hedge_wins += 1
+                        self.saved_seconds += saved
+                return result
+        raise error
+    
+    @staticmethod
+    def _timed(run: Callable[[], str]) -> tuple[float, str]:
+        started = time.monotonic()
+        result = run()
+        return time.monotonic() - started, result
+    
+    def stats(self) -> dict:
+        """Calls, duplicates issued and won, and the estimated tail latency saved"""
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "hedged": self.hedged,
+                "extra_fraction": self.hedged / self.calls if self.calls else 0.0,
+                "hedge_wins": self.hedge_wins,
+                "saved_seconds": self.saved_seconds,
+            }
+    
+    def close(self):
+        """Stop the attempt threads once in-flight attempts finish"""
+        self._executor.shutdown(wait=False)
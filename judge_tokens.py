@@ -0,0 +1,66 @@
+"""Judge request token measurement against the local mock server."""
+
+import textwrap
+
+from openai import OpenAI
+
+from mock_server import MockServer
+from model_client import JUDGE_DEFINITION_RUBRIC, JUDGE_USAGE_RUBRIC, judge_response, judge_response_b
+from token_estimate import estimate_message_tokens
+
+JUDGES = (
+    (judge_response, JUDGE_DEFINITION_RUBRIC, "Definición del modelo"),
+    (judge_response_b, JUDGE_USAGE_RUBRIC, "Respuesta del modelo"),
+)
+
+
+def legacy_judge_messages(rubric: str, word: str, correct_definition: str, model_response: str,
+                          response_label: str = "Definición del modelo") -> list[dict]:
+    """Rebuild the former layout: rubric and item inlined in one indented f-string user message"""
+    body = f"{rubric}\n\nPalabra: {word}\nDefinición de referencia: {correct_definition}\n{response_label}: {model_response}\n\nRespuesta:"
+    return [{"role": "user", "content": "\n" + textwrap.indent(body, "    ") + "\n    "}]
+
+
+def measure_judge_tokens(vocabulary: list[dict]) -> dict:
+    """Estimate judge input tokens per call before and after the system-prefix layout
+
+    Every word is judged with both judges, using its reference definition as
+    the model response, against a mock server that estimates prompt tokens.
+    The current layout goes through judge_response/judge_response_b
+    themselves, with an explicit backend so a configured judge endpoint is
+    never called.
+    """
+    with MockServer() as server:
+        legacy_client = OpenAI(base_url=server.base_url, api_key="mock")
+        for entry in vocabulary:
+            for _, rubric, label in JUDGES:
+                legacy_client.chat.completions.create(
+                    model="gpt-5",
+                    messages=legacy_judge_messages(rubric, entry["word"], entry["answer"], entry["answer"], label)
+                )
+        legacy_calls = len(server.requests)
+        
+        backend = {"model": "gpt-5", "base_url": server.base_url, "api_key": "mock", "free": True}
+        for entry in vocabulary:
+            for judge, _, _ in JUDGES:
+                judge(entry["word"], entry["answer"], entry["answer"], backend)
+        
+        before = [request["prompt_tokens"] for request in server.requests[:legacy_calls]]
+        after = server.requests[legacy_calls:]
+    
+    calls = len(before)
+    if not calls:
+        return {"calls": 0, "before": 0.0, "after": 0.0, "prefix": 0.0, "per_item": 0.0, "reduction": 0.0}
+    
+    prefix = [estimate_message_tokens(request["messages"][:1]) for request in after]
+    after_tokens = [request["prompt_tokens"] for request in after]
+    before_mean = sum(before) / calls
+    after_mean = sum(after_tokens) / calls
+    return {
+        "calls": calls,
+        "before": before_mean,
+        "after": after_mean,
+        "prefix": sum(prefix) / calls,
+        "per_item": (sum(after_tokens) - sum(prefix)) / calls,
+        "reduction": 1 - after_mean / before_mean,
+    }
@@ -1,79 +1,223 @@
-
 """Spanish lexicon evaluation orchestration."""
 
-from tqdm import tqdm
+import sys
+from contextlib import nullcontext
+from datetime import datetime, timezone
+
 from rich.console import Console
 
-from data_loader import load_models, load_prompts, load_vocabulary
-from model_client import prompt_model, judge_response, judge_response_b
-from storage import save_response, load_response, update_response_judgment
-from reporter import generate_summary
+from data_loader import VocabularyStream, load_model_aliases, load_model_options, load_models, load_prompt_registry, load_vocabulary
+from reporter import (
+    display_cache_stats, display_hedge_stats, display_postprocess_savings, display_stage_memory, generate_summary, generate_word_analysis
+)
+from adaptive import run_adaptive_evaluation
+from runner import DEFAULT_BATCH_WORDS, pending_judge_tokens, run_distributed, run_matrix
+from streaming import DEFAULT_QUEUE_SIZE, StageMemory, run_streaming
+from model_client import (
+    configure_cassette, configure_judge_backend, configure_judge_budget, configure_judge_hedging, configure_model_concurrency,
+    configure_response_cache, resolve_model_digests
+)
+from hedging import HedgePolicy
+from postprocess import configure_postprocessing
+from evaluator import postprocess_savings
+from record_codec import current_codec
+from storage import configure_compression
+from autotune import load_concurrency
+from budget import BudgetExceeded, BudgetGovernor, format_projection
+from similarity import DEFAULT_HIGH, DEFAULT_LOW, ReferenceIndex, configure_similarity
+from response_cache import ResponseCache
+from cassette import Cassette
+from cancellation import CancellationToken, handle_interrupts
+from run_status import STATUS_PATH, publish_status
+from run_registry import append_run, build_run_record, new_run_id, suite_hashes
 
 
-def main():
-    # Load data
-    models = load_models()
-    prompts = load_prompts()
-    vocabulary = load_vocabulary()
+def main(adaptive: bool = False, target_width: float = 0.2, min_words: int = 10, seed: int | None = None, workers: int = 4,
+         cache_path: str | None = None, queue_path: str | None = None, processes: int = 2,
+         status: bool = False, status_port: int | None = None, status_interval: float = 10.0,
+         max_judge_usd: float | None = None, max_judge_tokens: int | None = None,
+         judge_model: str | None = None, judge_base_url: str | None = None, judge_free: bool = False,
+         replace_judgments: bool = False,
+         similarity: bool = False, similarity_low: float = DEFAULT_LOW, similarity_high: float = DEFAULT_HIGH,
+         cassette: tuple[str, str, bool] | None = None, hedge: tuple[float, float] | None = None,
+         postprocess: dict | None = None, compress: bool = False,
+         schedule: str = "model", batch_words: int = DEFAULT_BATCH_WORDS,
+         stream: bool = False, queue_size: int = DEFAULT_QUEUE_SIZE, memory_report: bool = False):
+    # Load data; tags resolving to the same weights (llama3.1:latest, llama3.1:8b) are evaluated once
+    models = load_models(resolve_model_digests)
+    aliases = load_model_aliases()
+    model_options = load_model_options()
+    registry = load_prompt_registry()
+    # A streamed vocabulary is read from disk on every pass instead of being held in memory
+    vocabulary = VocabularyStream() if stream else load_vocabulary()
     
-    prompt_template_a = prompts["prompt_a"]
-    prompt_template_b = prompts["prompt_b"]
+    prompt_ids = tuple(registry)
+    prompt_versions = {prompt_id: prompt["version"] for prompt_id, prompt in registry.items()}
     
     console = Console()
-    console.print(f"[bold green]Starting evaluation with {len(models)} models and {len(vocabulary)} words[/bold green]")
+    cache = None
+    if cache_path:
+        # Deterministic (temperature 0) responses are reused across runs and machines
+        cache = ResponseCache(cache_path)
+        configure_response_cache(cache)
+    
+    # A custom judge endpoint (e.g. a local Ollama model) keeps judging on the machine; judgments stored by
+    # another judge model are only redone when replacing them is asked for
+    judge_backend = configure_judge_backend(judge_model, judge_base_url, free=judge_free or None,
+                                            replace=replace_judgments)
+    
+    # Judge calls are charged against the caps; without caps the governor only tracks usage
+    budget = BudgetGovernor(max_judge_usd, max_judge_tokens)
+    configure_judge_budget(budget)
+    
+    # Prompt A responses far above or below the similarity thresholds skip the judge
+    similarity_index = ReferenceIndex(vocabulary) if similarity else None
+    configure_similarity(similarity_index, similarity_low, similarity_high)
+    similarity_thresholds = (similarity_low, similarity_high) if similarity else None
+    
+    # (path, mode, realtime): record all model and judge traffic, or replay it offline
+    recording = Cassette(*cassette) if cassette else None
+    configure_cassette(recording)
+    replaying = recording is not None and recording.mode == "replay"
+    
+    # (max extra fraction, percentile): duplicate straggling judge calls, first response wins
+    hedging = HedgePolicy(*hedge) if hedge else None
+    configure_judge_hedging(hedging)
+    
+    # Reasoning blocks, markdown and preambles are stripped from responses before storage and judging
+    configure_postprocessing(postprocess)
+    
+    # Records are written dictionary-compressed once `cli.py compress` has trained a dictionary; reads handle both formats
+    if compress:
+        codec = current_codec()
+        if codec is None:
+            console.print("[bold yellow]No compression dictionary yet (see `cli.py compress`); records are written as JSON[/bold yellow]")
+        configure_compression(codec)
     
-    # Step 2: Prompt models with both prompts
-    for model in models:
-        console.print(f"[bold blue]Processing model: {model}[/bold blue]")
+    # Models tuned with `cli.py autotune` on this host get their measured number of in-flight requests
+    tuned = {model: limit for model, limit in load_concurrency().items() if model in models}
+    if tuned:
+        configure_model_concurrency(tuned)
+        workers = max(workers, *tuned.values())
+        console.print(f"[bold yellow]Autotuned concurrency: {', '.join(f'{model}={limit}' for model, limit in tuned.items())}[/bold yellow]")
+    
+    if aliases:
+        console.print(f"[bold yellow]Aliases sharing weights with a listed model: {', '.join(f'{alias}={model}' for alias, model in aliases.items())}[/bold yellow]")
+    console.print(f"[bold green]Starting evaluation with {len(models)} models, {len(registry)} prompts and {len(vocabulary)} words[/bold green]")
+    
+    # Adaptive runs judge an unknown subset of the vocabulary, and free (e.g. local) judges cost nothing
+    if not adaptive and not judge_backend["free"] and not replaying:
+        projection = budget.projection(*pending_judge_tokens(models, vocabulary, registry))
+        console.print(f"[bold yellow]{format_projection(projection, budget)}[/bold yellow]")
+    
+    words_used = None
+    processed = 0
+    run_id = new_run_id()
+    started = datetime.now(timezone.utc)
+    
+    def record_run(summary: dict, metrics, cancelled: bool):
+        # Accuracy, throughput, latency and judge spend are kept per run for `cli.py compare`
+        append_run(build_run_record(
+            run_id, started, datetime.now(timezone.utc), suite_hashes(models, registry, vocabulary), summary, processed,
+            metrics.latency_percentiles(), budget.usage(), metrics.snapshot()["prejudged"], cancelled
+        ))
+        console.print(f"[bold blue]Run {run_id} added to the run registry[/bold blue]")
+    
+    def on_cancel():
+        console.print("[bold red]Cancelling: finishing in-flight requests (Ctrl-C again to abort)[/bold red]")
+    
+    try:
+        # Per-phase counts, in-flight requests and partial accuracy for watching a long run
+        status_path = STATUS_PATH if status else None
+        with handle_interrupts(CancellationToken(), on_cancel) as cancel_token, \
+                publish_status(models, vocabulary, registry, status_path, status_interval, status_port) as metrics:
+            if adaptive:
+                # Sample words until each model's accuracy interval is settled
+                console.print(f"[bold yellow]Adaptive mode: target interval width {target_width:.2f}[/bold yellow]")
+                words_used = run_adaptive_evaluation(
+                    models, vocabulary, registry,
+                    target_width=target_width, min_words=min_words, seed=seed,
+                    model_options=model_options, cancel_token=cancel_token, metrics=metrics
+                )
+                processed = sum(len(words) for words in words_used.values()) * len(registry)
+            elif queue_path:
+                # Worker processes claim cells from a shared queue, so several runs can share one evaluation
+                processed = run_distributed(models, vocabulary, registry, queue_path, processes=processes,
+                                            model_options=model_options, cache_path=cache_path,
+                                            max_judge_usd=max_judge_usd, max_judge_tokens=max_judge_tokens,
+                                            judge_backend=judge_backend, similarity_thresholds=similarity_thresholds,
+                                            cassette=cassette, hedge=hedge, postprocess=postprocess, compress=compress,
+                                            schedule=schedule, batch_words=batch_words, seed=seed)
+                console.print(f"[bold blue]Processed {processed} cells from {queue_path}[/bold blue]")
+            elif stream:
+                # Bounded queues between scan, prompt and judge keep memory flat however large the vocabulary
+                memory = StageMemory() if memory_report else nullcontext()
+                with memory:
+                    processed = run_streaming(models, vocabulary, registry, max_workers=workers,
+                                              model_options=model_options, cancel_token=cancel_token, metrics=metrics,
+                                              schedule=schedule, batch_words=batch_words, queue_size=queue_size)
+                console.print(f"[bold blue]Processed {processed} pending cells[/bold blue]")
+                if memory_report:
+                    display_stage_memory(memory.report())
+            else:
+                # Prompt and judge every prompt × model × word cell whose template version has no result yet;
+                # the interleaved schedule keeps models level so a stopped run still compares them fairly
+                processed = run_matrix(models, vocabulary, registry, max_workers=workers,
+                                       model_options=model_options, cancel_token=cancel_token, metrics=metrics,
+                                       schedule=schedule, batch_words=batch_words, seed=seed)
+                console.print(f"[bold blue]Processed {processed} pending cells[/bold blue]")
         
-        for entry in tqdm(vocabulary, desc=f"Prompting {model}"):
-            word = entry["word"]
-            correct_definition = entry["answer"]
-            
-            response_data = load_response(model, word)
-            
-            # Process prompt A
-            if not response_data.get("model_response_a"):
-                model_response_a = prompt_model(word, model, prompt_template_a)
-                save_response(model, word, correct_definition, model_response_a=model_response_a)
-            
-            # Process prompt B
-            if not response_data.get("model_response_b"):
-                model_response_b = prompt_model(word, model, prompt_template_b)
-                save_response(model, word, correct_definition, model_response_b=model_response_b)
-    
-    # Step 3: Judge responses for both prompts
-    console.print("[bold yellow]Starting judgment phase...[/bold yellow]")
-    
-    for model in models:
-        console.print(f"[bold blue]Judging responses for: {model}[/bold blue]")
+        # Distributed workers track their own usage in their processes
+        if not queue_path:
+            usage = budget.usage()
+            console.print(f"[bold blue]Judge usage: {usage['calls']} calls, {usage['input_tokens'] + usage['output_tokens']} tokens, ${usage['cost_usd']:.2f}[/bold blue]")
+            console.print(f"[bold blue]Pre-judge rules and similarity settled {metrics.snapshot()['prejudged']} cells without a judge call[/bold blue]")
+            if hedging is not None:
+                display_hedge_stats(hedging.stats())
         
-        for entry in tqdm(vocabulary, desc=f"Judging {model}"):
-            word = entry["word"]
-            correct_definition = entry["answer"]
-            
-            response_data = load_response(model, word)
-            if not response_data:
-                continue
-            
-            # Judge prompt A response
-            if not response_data.get("judgment_a"):
-                model_response_a = response_data.get("model_response_a")
-                if model_response_a:
-                    judgment_a = judge_response(word, correct_definition, model_response_a)
-                    update_response_judgment(model, word, judgment_a=judgment_a)
-            
-            # Judge prompt B response
-            if not response_data.get("judgment_b"):
-                model_response_b = response_data.get("model_response_b")
-                if model_response_b:
-                    judgment_b = judge_response_b(word, correct_definition, model_response_b)
-                    update_response_judgment(model, word, judgment_b=judgment_b)
-    
-    # Step 4: Generate summary
-    console.print("[bold green]Generating summary...[/bold green]")
-    generate_summary(models, vocabulary)
-
+        if cancel_token.cancelled:
+            console.print("[bold red]Run cancelled; progress is saved and the next run resumes from here[/bold red]")
+            # Models are compared on the words all of them finished
+            summary = generate_summary(models, vocabulary, None, prompt_ids, prompt_versions, aliases, partial=True)
+            record_run(summary, metrics, cancelled=True)
+            return
+        
+        # Generate summary
+        console.print("[bold green]Generating summary...[/bold green]")
+        summary = generate_summary(models, vocabulary, words_used, prompt_ids, prompt_versions, aliases)
+        # The word analysis holds a word × model matrix, so memory-bounded runs leave it to `cli.py summarize --words`
+        if not stream:
+            generate_word_analysis(models, vocabulary, prompt_ids=prompt_ids, prompt_versions=prompt_versions)
+        if postprocess:
+            display_postprocess_savings(postprocess_savings(models, vocabulary, registry))
+        record_run(summary, metrics, cancelled=False)
+        
+        if cache is not None:
+            display_cache_stats(cache.stats())
+        if recording is not None and not queue_path:
+            stats = recording.stats()
+            console.print(f"[bold blue]Cassette {recording.path}: {stats['recorded']} calls recorded, {stats['replayed']} replayed[/bold blue]")
+    except BudgetExceeded as error:
+        console.print(f"[bold red]Stopped: {error}. Judged cells are saved; re-run with a higher cap to resume[/bold red]")
+    finally:
+        configure_judge_budget(None)
+        configure_judge_backend()
+        configure_similarity(None)
+        if similarity_index is not None:
+            similarity_index.close()
+        if cache is not None:
+            configure_response_cache(None)
+            cache.close()
+        if recording is not None:
+            configure_cassette(None)
+            recording.close()
+        configure_model_concurrency(None)
+        configure_postprocessing()
+        configure_compression(None)
+        if hedging is not None:
+            configure_judge_hedging(None)
+            hedging.close()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    from cli import main as cli_main
+    sys.exit(cli_main(["run", *sys.argv[1:]]))
\ No newline at end of file
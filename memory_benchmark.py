@@ -0,0 +1,78 @@
+"""Peak memory of the matrix and streaming runners as the vocabulary grows, without calling real models."""
+
+import json
+import os
+import tempfile
+from pathlib import Path
+
+from data_loader import VOCABULARY_PATH, VocabularyStream, load_vocabulary
+from model_client import configure_cassette
+from run_status import RunMetrics
+from runner import run_matrix
+from streaming import StageMemory, run_streaming
+
+DEFAULT_SIZES = (1000, 3000, 9000)
+MODES = ("matrix", "streaming")
+
+BENCHMARK_MODELS = ["bench:1b"]
+BENCHMARK_REGISTRY = {
+    "prompt_a": {"template": "Define la palabra {word} en español", "judge": "definition", "version": "bench"},
+}
+
+
+class CannedResponder:
+    """Installed in place of a cassette: answers every model call with a fixed definition and every judge call "correct"
+    
+    Only the pipeline's own memory is measured, with no HTTP clients or
+    network latency in the way.
+    """
+    
+    def call(self, kind: str, model: str, messages: list[dict], options: dict | None, send) -> str:
+        return "correct" if kind == "judge" else "Definición sintética de prueba."
+
+
+def write_synthetic_vocabulary(size: int, path: str = VOCABULARY_PATH):
+    """Write size distinct entries as a JSON array, one at a time"""
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write("[\n")
+        for index in range(size):
+            entry = {"word": f"palabra{index:06d}", "answer": f"Definición de referencia número {index} del banco sintético."}
+            f.write(("," if index else "") + json.dumps(entry, ensure_ascii=False) + "\n")
+        f.write("]\n")
+
+
+def measure_memory(mode: str, size: int, workers: int = 4, queue_size: int = 64) -> dict:
+    """Evaluate a fresh synthetic vocabulary of size words in a temporary directory and report peak traced memory
+    
+    "matrix" loads the vocabulary list and runs run_matrix, "streaming"
+    streams it through run_streaming. Both record RunMetrics as a real run
+    does. Everything the run allocates, including loading the vocabulary
+    and the metrics, is traced.
+    """
+    if mode not in MODES:
+        raise ValueError(f"mode must be one of {MODES}, not {mode!r}")
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as directory:
+        os.chdir(directory)
+        configure_cassette(CannedResponder())
+        try:
+            write_synthetic_vocabulary(size)
+            with StageMemory() as memory:
+                metrics = RunMetrics()
+                if mode == "matrix":
+                    processed = run_matrix(BENCHMARK_MODELS, load_vocabulary(), BENCHMARK_REGISTRY, max_workers=workers,
+                                           metrics=metrics)
+                else:
+                    processed = run_streaming(BENCHMARK_MODELS, VocabularyStream(), BENCHMARK_REGISTRY, max_workers=workers,
+                                              metrics=metrics, queue_size=queue_size)
+        finally:
+            configure_cassette(None)
+            os.chdir(cwd)
+    return {"mode": mode, "words": size, "cells": processed, "stages": memory.peaks, "peak": memory.peak}
+
+
+def run_memory_benchmark(sizes: tuple[int, ...] = DEFAULT_SIZES, modes: tuple[str, ...] = MODES, workers: int = 4,
+                         queue_size: int = 64) -> list[dict]:
+    """measure_memory for every mode at every size"""
+    return [measure_memory(mode, size, workers, queue_size) for mode in modes for size in sizes]
@@ -0,0 +1,109 @@
+"""Local OpenAI-compatible mock server for measuring requests without calling real models."""
+
+import json
+import threading
+import time
+from contextlib import nullcontext
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from token_estimate import estimate_message_tokens, estimate_tokens
+
+
+class MockServer:
+    """Threaded /v1/chat/completions server answering every request with a fixed reply
+
+    Each request's messages and estimated prompt tokens are recorded in
+    .requests. latency adds a delay per request to simulate a slow backend,
+    and parallel caps how many requests are served at once (like Ollama's
+    OLLAMA_NUM_PARALLEL); further requests queue. digests ({tag: digest})
+    are listed on Ollama's /api/tags, standing in for the local models.
+    """
+    
+    def __init__(self, reply: str = "correct", latency: float = 0.0, parallel: int | None = None,
+                 digests: dict[str, str] | None = None):
+        self.reply = reply
+        self.digests = digests or {}
+        self.latency = latency
+        self._slots = threading.BoundedSemaphore(parallel) if parallel else None
+        self.requests: list[dict] = []
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+    
+    @property
+    def host(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+    
+    @property
+    def base_url(self) -> str:
+        return f"{self.host}/v1"
+    
+    def _handler(self):
+        server = self
+        
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.rstrip("/") != "/api/tags":
+                    self.send_error(404)
+                    return
+                body = json.dumps({"models": [
+                    {"name": tag, "model": tag, "digest": digest, "size": 0, "modified_at": "2024-01-01T00:00:00Z"}
+                    for tag, digest in server.digests.items()
+                ]}).encode('utf-8')
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+            
+            def do_POST(self):
+                if self.path.rstrip("/") != "/v1/chat/completions":
+                    self.send_error(404)
+                    return
+                request = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                prompt_tokens = estimate_message_tokens(request["messages"])
+                with server._lock:
+                    server.requests.append({"model": request["model"], "messages": request["messages"], "prompt_tokens": prompt_tokens})
+                if server.latency:
+                    with server._slots or nullcontext():
+                        time.sleep(server.latency)
+                
+                completion_tokens = estimate_tokens(server.reply)
+                body = json.dumps({
+                    "id": f"mock-{len(server.requests)}",
+                    "object": "chat.completion",
+                    "created": int(time.time()),
+                    "model": request["model"],
+                    "choices": [{"index": 0, "message": {"role": "assistant", "content": server.reply}, "finish_reason": "stop"}],
+                    "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                              "total_tokens": prompt_tokens + completion_tokens},
+                }).encode('utf-8')
+                try:
+                    self.send_response(200)
+                    self.send_header("Content-Type", "application/json")
+                    self.send_header("Content-Length", str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+                except (BrokenPipeError, ConnectionResetError):
+                    pass  # The client cancelled the request (e.g. a losing hedged attempt)
+            
+            def log_message(self, format, *args):
+                pass
+        
+        return Handler
+    
+    def start(self) -> "MockServer":
+        self._thread.start()
+        return self
+    
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+        self._thread.join()
+    
+    def __enter__(self) -> "MockServer":
+        return self.start()
+    
+    def __exit__(self, *exc_info):
+        self.stop()
@@ -1,93 +1,375 @@
 """Client for interacting with AI models."""
 
+import functools
+import os
+import threading
+from contextlib import nullcontext
+from urllib.parse import urlsplit
+
+from ollama import Client as OllamaClient
 from openai import OpenAI
 
+from budget import BudgetGovernor
+from cassette import Cassette
+from hedging import HedgePolicy
+from response_cache import ResponseCache, cache_key
+from token_estimate import estimate_message_tokens
+
+OLLAMA_DEFAULT_PORT = 11434
+
+
+def normalize_ollama_host(host: str) -> str:
+    """Base URL for an OLLAMA_HOST value, accepting the forms Ollama itself does
+    
+    Without a scheme, http:// is assumed and a missing host or port is
+    filled in ("gpu-box" -> "http://gpu-box:11434"). A trailing "/" is
+    dropped so paths such as /v1 can be appended.
+    """
+    host = host.strip().rstrip("/")
+    if "://" in host:
+        return host
+    parts = urlsplit(f"//{host}")
+    netloc = parts.netloc if parts.hostname else f"localhost{parts.netloc}"
+    return f"http://{netloc}" if parts.port is not None else f"http://{netloc}:{OLLAMA_DEFAULT_PORT}"
+
+
+OLLAMA_HOST = normalize_ollama_host(os.environ.get("OLLAMA_HOST") or f"http://localhost:{OLLAMA_DEFAULT_PORT}")
+
+# Judge backend: GPT-5 on the OpenAI API unless an OpenAI-compatible endpoint (e.g. Ollama's /v1) is configured;
+# "free" backends are not charged to the judge budget (None: free only when the endpoint is local), and only a
+# "replace" backend re-judges cells another judge model has judged
+DEFAULT_JUDGE_BACKEND = {
+    "model": os.environ.get("JUDGE_MODEL", "gpt-5"),
+    "base_url": os.environ.get("JUDGE_BASE_URL"),
+    "api_key": os.environ.get("JUDGE_API_KEY"),
+    "free": os.environ.get("JUDGE_FREE", "").lower() in ("1", "true", "yes") or None,
+    "replace": False,
+}
+
+LOCAL_HOSTS = ("localhost", "127.0.0.1", "::1")
+
+# Options forwarded to Ollama's native API as generation parameters
+OLLAMA_GENERATION_OPTIONS = ("num_predict", "num_ctx", "num_thread", "temperature", "top_p", "top_k", "seed")
+
+_response_cache: ResponseCache | None = None
+_judge_budget: BudgetGovernor | None = None
+_judge_backend: dict = DEFAULT_JUDGE_BACKEND
+_cassette: Cassette | None = None
+_model_slots: dict[str, threading.BoundedSemaphore] = {}
+_hedge_policy: HedgePolicy | None = None
+
+
+def configure_response_cache(cache: ResponseCache | None):
+    """Enable (or with None, disable) the shared response cache used by prompt_model"""
+    global _response_cache
+    _response_cache = cache
+
+
+def configure_judge_backend(model: str | None = None, base_url: str | None = None, api_key: str | None = None,
+                            free: bool | None = None, replace: bool = False) -> dict:
+    """Select the judge model and endpoint; unset values keep the defaults from JUDGE_* environment variables
+    
+    With replace, judgments stored by another judge model are redone by this
+    one; otherwise they are kept.
+    """
+    global _judge_backend
+    backend = {
+        "model": model or DEFAULT_JUDGE_BACKEND["model"],
+        "base_url": base_url or DEFAULT_JUDGE_BACKEND["base_url"],
+        "api_key": api_key or DEFAULT_JUDGE_BACKEND["api_key"],
+        "free": free if free is not None else DEFAULT_JUDGE_BACKEND["free"],
+        "replace": replace,
+    }
+    _judge_backend = {**backend, "free": judge_is_free(backend)}
+    return _judge_backend
+
+
+def _is_local_endpoint(base_url: str | None) -> bool:
+    """Whether an endpoint is on this machine or the Ollama host, where calls cost nothing"""
+    if not base_url:
+        return False
+    host = urlsplit(base_url).hostname
+    return host in LOCAL_HOSTS or host == urlsplit(OLLAMA_HOST).hostname
+
+
+def judge_is_free(backend: dict) -> bool:
+    """Whether judge calls to a backend are left out of the budget: an explicit "free" flag, else a local endpoint"""
+    if backend.get("free") is not None:
+        return backend["free"]
+    return _is_local_endpoint(backend.get("base_url"))
+
+
+def configure_judge_budget(budget: BudgetGovernor | None):
+    """Enable (or with None, disable) the budget governor charged by every judge call"""
+    global _judge_budget
+    _judge_budget = budget
+
+
+def configure_cassette(cassette: Cassette | None):
+    """Record every model and judge call to a cassette, or serve them from one (None: call the backends)"""
+    global _cassette
+    _cassette = cassette
+
+
+def configure_model_concurrency(limits: dict[str, int] | None):
+    """Cap in-flight requests per model (e.g. autotuned settings); None or {} removes the caps"""
+    global _model_slots
+    _model_slots = {model: threading.BoundedSemaphore(limit) for model, limit in (limits or {}).items()}
+
+
+def configure_judge_hedging(policy: HedgePolicy | None):
+    """Hedge slow judge calls with a duplicate request (None: send each judge call once)"""
+    global _hedge_policy
+    _hedge_policy = policy
+
+
+def _listed_digest(model: str, listed_models: list) -> str | None:
+    """Digest of a tag in Ollama's model list; a tag without a version means its :latest tag"""
+    names = {model, model if ":" in model else f"{model}:latest"}
+    for listed in listed_models:
+        if names & {listed.get("model"), listed.get("name")}:
+            return listed["digest"]
+    return None
+
+
+@functools.cache
+def get_model_digest(model: str) -> str:
+    """Resolve a model tag to the digest of its weights via the local Ollama API
+
+    Falls back to the tag itself when the model is not listed.
+    """
+    response = OllamaClient(host=OLLAMA_HOST).list()
+    return _listed_digest(model, response["models"]) or model
+
+
+def resolve_model_digests(models: list[str]) -> dict[str, str]:
+    """Digest of each listed tag's weights via the local Ollama API, for data_loader.load_models
+    
+    Tags Ollama does not list are left out, and so is everything when
+    Ollama cannot be reached, so no tags are merged by guesswork.
+    """
+    try:
+        listed_models = OllamaClient(host=OLLAMA_HOST).list()["models"]
+    except ConnectionError:
+        return {}
+    digests = {model: _listed_digest(model, listed_models) for model in models}
+    return {model: digest for model, digest in digests.items() if digest is not None}
+
+
+def _prompt_ollama_native(prompt: str, model: str, options: dict) -> str:
+    """Prompt a model through Ollama's native chat API with keep_alive and generation options"""
+    client = OllamaClient(host=OLLAMA_HOST)
+    response = client.chat(
+        model=model,
+        messages=[{"role": "user", "content": prompt}],
+        options={key: options[key] for key in OLLAMA_GENERATION_OPTIONS if key in options},
+        keep_alive=options.get("keep_alive"),
+    )
+    return response["message"]["content"] or ""
 
-def prompt_model(word: str, model: str, prompt_template: str) -> str:
-    """Prompt a model via OLAMA using OpenAI client"""
+
+def _prompt_openai_compatible(prompt: str, model: str, options: dict) -> str:
+    """Prompt a model through Ollama's OpenAI-compatible /v1 endpoint"""
     client = OpenAI(
-        base_url='http://localhost:11434/v1/',
+        base_url=f'{OLLAMA_HOST}/v1/',
         api_key='ollama',
     )
     
-    prompt = prompt_template.format(word=word)
+    sampling = {"temperature": options["temperature"]} if "temperature" in options else {}
     response = client.chat.completions.create(
         model=model,
-        messages=[{"role": "user", "content": prompt}]
+        messages=[{"role": "user", "content": prompt}],
+        **sampling
     )
     return response.choices[0].message.content or ""
 
 
-def judge_response(word: str, correct_definition: str, model_response: str) -> str:
-    """Use GPT-5 to judge if the model response is correct or incorrect"""
-    client = OpenAI()  # Uses standard OpenAI API
+def prompt_model(word: str, model: str, prompt_template: str, options: dict | None = None) -> str:
+    """Prompt a model via OLAMA using OpenAI client, or the native API when options select backend=ollama
     
-    judge_prompt = f"""
-    Evalúa si la definición propuesta es suficientemente correcta (no necesita ser literal) para la palabra indicada.
-
-    Criterios para marcar correct:
-    - Captura el núcleo semántico esencial aunque use sinónimos o parafrasee.
-    - Coincide la categoría gramatical y el sentido principal válido en uso general.
-    - Puede omitir detalles secundarios siempre que no distorsione el significado central.
-    - Si la palabra tiene varios sentidos, acepta uno legítimo y común salvo que la definición de referencia delimite claramente otro sentido específico.
-
-    Marca incorrect si:
-    - Cambia el significado central o selecciona un sentido no pertinente frente a uno claramente indicado.
-    - Es tan vaga o general que podría aplicarse a muchos otros términos sin identificar este.
-    - Es demasiado estrecha o añade rasgos críticos que no forman parte del significado.
-    - Omite un componente indispensable que altera el concepto.
-    - Introduce información falsa, confusa, o mezcla con otro término.
-    - Es circular (solo repite la palabra) o no define realmente.
-
-    Devuelve únicamente: correct o incorrect (en minúsculas, sin explicación).
-
-    Palabra: {word}
-    Definición de referencia: {correct_definition}
-    Definición del modelo: {model_response}
-
-    Respuesta:
+    When a response cache is configured, deterministic requests (temperature 0)
+    are served from it and cached responses are keyed on the model digest.
+    When a cassette is configured, the call is recorded to or replayed from it.
     """
+    options = options or {}
+    prompt = prompt_template.format(word=word)
+    if _cassette is not None:
+        # Replay never reaches the cache, which would need Ollama for the model digest
+        messages = [{"role": "user", "content": prompt}]
+        return _cassette.call("prompt", model, messages, options, lambda: _prompt(prompt, model, options))
+    return _prompt(prompt, model, options)
+
+
+def _prompt(prompt: str, model: str, options: dict) -> str:
+    """Serve a rendered prompt from the response cache or the model backend"""
+    key = None
+    if _response_cache is not None and options.get("temperature") == 0:
+        key = cache_key(get_model_digest(model), prompt, options)
+        cached = _response_cache.get(key)
+        if cached is not None:
+            return cached
     
-    response = client.chat.completions.create(
-        model="gpt-5",
-        messages=[{"role": "user", "content": judge_prompt}]
+    with _model_slots.get(model) or nullcontext():
+        if options.get("backend") == "ollama":
+            content = _prompt_ollama_native(prompt, model, options)
+        else:
+            content = _prompt_openai_compatible(prompt, model, options)
+    
+    if key is not None and content:
+        _response_cache.put(key, content)
+    return content
+
+
+# Rubrics are sent verbatim as the system message so every judge call shares an identical, cacheable prefix
+JUDGE_DEFINITION_RUBRIC = """Evalúa si la definición propuesta es suficientemente correcta (no necesita ser literal) para la palabra indicada.
+
+Criterios para marcar correct:
+- Captura el núcleo semántico esencial aunque use sinónimos o parafrasee.
+- Coincide la categoría gramatical y el sentido principal válido en uso general.
+- Puede omitir detalles secundarios siempre que no distorsione el significado central.
+- Si la palabra tiene varios sentidos, acepta uno legítimo y común salvo que la definición de referencia delimite claramente otro sentido específico.
+
+Marca incorrect si:
+- Cambia el significado central o selecciona un sentido no pertinente frente a uno claramente indicado.
+- Es tan vaga o general que podría aplicarse a muchos otros términos sin identificar este.
+- Es demasiado estrecha o añade rasgos críticos que no forman parte del significado.
+- Omite un componente indispensable que altera el concepto.
+- Introduce información falsa, confusa, o mezcla con otro término.
+- Es circular (solo repite la palabra) o no define realmente.
+
+Devuelve únicamente: correct o incorrect (en minúsculas, sin explicación)."""
+
+JUDGE_USAGE_RUBRIC = """Evalúa si las dos frases proporcionadas demuestran una comprensión correcta de la palabra indicada.
+
+Criterios para marcar correct:
+- La primera frase usa la palabra indicada de manera apropiada y coherente con su definición.
+- La segunda frase está relacionada con la primera y complementa el significado sin usar la palabra.
+- Ambas frases juntas revelan comprensión del significado de la palabra.
+- El uso contextual de la palabra es correcto según su definición de referencia.
+
+Marca incorrect si:
+- La palabra se usa incorrectamente en la primera frase.
+- Las frases no están relacionadas o no complementan el significado.
+- La segunda frase usa la palabra cuando no debería.
+- Las frases no demuestran comprensión real del significado de la palabra.
+- El contexto de uso contradice la definición de referencia.
+
+Devuelve únicamente: correct o incorrect (en minúsculas, sin explicación)."""
+
+
+# Rubric and response label for each registry judge kind
+JUDGE_KINDS = {
+    "definition": (JUDGE_DEFINITION_RUBRIC, "Definición del modelo"),
+    "usage": (JUDGE_USAGE_RUBRIC, "Respuesta del modelo"),
+}
+
+
+def _normalize_whitespace(text: str) -> str:
+    """Collapse runs of whitespace so per-item content adds no padding tokens"""
+    return " ".join(text.split())
+
+
+def judge_messages(rubric: str, word: str, correct_definition: str, model_response: str,
+                   response_label: str = "Definición del modelo") -> list[dict]:
+    """Build judge messages: the rubric as a stable system prefix and a minimal per-item user message"""
+    item = (
+        f"Palabra: {_normalize_whitespace(word)}\n"
+        f"Definición de referencia: {_normalize_whitespace(correct_definition)}\n"
+        f"{response_label}: {_normalize_whitespace(model_response)}"
     )
-    content = response.choices[0].message.content
-    return content.strip().lower() if content else "incorrect"
+    return [
+        {"role": "system", "content": rubric},
+        {"role": "user", "content": item},
+    ]
 
 
-def judge_response_b(word: str, correct_definition: str, model_response: str) -> str:
-    """Use GPT-5 to judge if the model response for prompt B demonstrates understanding of the word"""
-    client = OpenAI()  # Uses standard OpenAI API
-    
-    judge_prompt = f"""
-    Evalúa si las dos frases proporcionadas demuestran una comprensión correcta de la palabra indicada.
+def estimate_judge_tokens(judge: str, word: str, correct_definition: str, model_response: str) -> int:
+    """Estimate input tokens of the judge call for a registry judge kind"""
+    rubric, label = JUDGE_KINDS[judge]
+    return estimate_message_tokens(judge_messages(rubric, word, correct_definition, model_response, label))
+
+
+def judge_inputs(judge: str) -> tuple[str, str]:
+    """Rubric and model the configured judge backend uses for a registry judge kind"""
+    return JUDGE_KINDS[judge][0], _judge_backend["model"]
+
 
-    Criterios para marcar correct:
-    - La primera frase usa la palabra '{word}' de manera apropiada y coherente con su definición.
-    - La segunda frase está relacionada con la primera y complementa el significado sin usar la palabra.
-    - Ambas frases juntas revelan comprensión del significado de la palabra.
-    - El uso contextual de la palabra es correcto según su definición de referencia.
+def judge_replaces_other_models() -> bool:
+    """Whether the configured judge redoes judgments stored by a different judge model"""
+    return _judge_backend.get("replace", False)
 
-    Marca incorrect si:
-    - La palabra se usa incorrectamente en la primera frase.
-    - Las frases no están relacionadas o no complementan el significado.
-    - La segunda frase usa la palabra cuando no debería.
-    - Las frases no demuestran comprensión real del significado de la palabra.
-    - El contexto de uso contradice la definición de referencia.
 
-    Devuelve únicamente: correct o incorrect (en minúsculas, sin explicación).
+def _judge_client(backend: dict) -> OpenAI:
+    """OpenAI client for a judge backend; local endpoints need no real API key"""
+    if backend.get("base_url"):
+        return OpenAI(base_url=backend["base_url"], api_key=backend.get("api_key") or "ollama")
+    return OpenAI()  # Uses standard OpenAI API
 
-    Palabra: {word}
-    Definición de referencia: {correct_definition}
-    Respuesta del modelo: {model_response}
 
-    Respuesta:
+def _judge(messages: list[dict], backend: dict | None = None) -> str:
+    """Send judge messages to the judge backend and normalise the verdict
+    
+    Calls are charged to the budget when one is configured, including calls
+    to paid OpenAI-compatible endpoints; free backends (a local endpoint
+    such as an Ollama judge, or one flagged "free") are not, nor are calls
+    replayed from a cassette.
     """
+    backend = backend or _judge_backend
+    if _cassette is not None:
+        return _cassette.call("judge", backend["model"], messages, None, lambda: _send_judge(messages, backend))
+    return _send_judge(messages, backend)
+
+
+def _send_judge(messages: list[dict], backend: dict) -> str:
+    """Make a judge call, hedged with a duplicate when a hedging policy is configured"""
+    if _hedge_policy is None:
+        return _judge_attempt(messages, backend, _judge_client(backend))
     
-    response = client.chat.completions.create(
-        model="gpt-5",
-        messages=[{"role": "user", "content": judge_prompt}]
-    )
+    def start():
+        # Each attempt gets its own client, closed when it loses; closing does not stop a request already sent
+        client = _judge_client(backend)
+        abandoned = threading.Event()
+        
+        def cancel():
+            abandoned.set()
+            client.close()
+        return (lambda: _judge_attempt(messages, backend, client, abandoned)), cancel
+    return _hedge_policy.call(start)
+
+
+def _judge_attempt(messages: list[dict], backend: dict, client: OpenAI, abandoned: threading.Event | None = None) -> str:
+    """Send one judge request, charging the budget, and normalise the verdict
+    
+    A request that fails after its hedged duplicate won (abandoned is set) may
+    still have been served and billed, so its estimate is charged instead of
+    released.
+    """
+    budget = _judge_budget if not judge_is_free(backend) else None
+    reservation = budget.reserve(estimate_message_tokens(messages)) if budget is not None else None
+    
+    try:
+        response = client.chat.completions.create(
+            model=backend["model"],
+            messages=messages
+        )
+    except Exception:
+        if budget is not None:
+            if abandoned is not None and abandoned.is_set():
+                budget.record(reservation)
+            else:
+                budget.release(reservation)
+        raise
+    if budget is not None:
+        budget.record(reservation, response.usage)
     content = response.choices[0].message.content
-    return content.strip().lower() if content else "incorrect"
\ No newline at end of file
+    return content.strip().lower() if content else "incorrect"
+
+
+def judge_response(word: str, correct_definition: str, model_response: str, backend: dict | None = None) -> str:
+    """Judge if the model response is correct or incorrect (GPT-5 unless another judge backend is given or configured)"""
+    return _judge(judge_messages(JUDGE_DEFINITION_RUBRIC, word, correct_definition, model_response), backend)
+
+
+def judge_response_b(word: str, correct_definition: str, model_response: str, backend: dict | None = None) -> str:
+    """Judge if the model response for prompt B demonstrates understanding of the word"""
+    return _judge(judge_messages(JUDGE_USAGE_RUBRIC, word, correct_definition, model_response, "Respuesta del modelo"), backend)
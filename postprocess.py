@@ -0,0 +1,77 @@
+"""Clean model output before it is stored and judged."""
+
+import re
+
+# Reasoning sections some models emit before the answer; an unclosed block runs to the end of the text
+_REASONING_BLOCK = re.compile(r"<(think|thinking|reasoning)>.*?(?:</\1>|\Z)", re.IGNORECASE | re.DOTALL)
+_MARKDOWN_HEADER = re.compile(r"^[ \t]*#{1,6}[ \t]*", re.MULTILINE)
+_MARKDOWN_EMPHASIS = re.compile(r"(\*\*|__)(.+?)\1")
+# A short first line that only announces the answer ("¡Claro! Aquí tienes la definición:"); whole words only,
+# so "there is" or "measure" do not count
+_PREAMBLE = re.compile(
+    r"\A[^\n]{0,120}?\b(?:claro|por supuesto|aquí tienes|aquí está|con gusto|sure|here is|here's)\b[^\n]{0,120}?:[ \t]*\n",
+    re.IGNORECASE
+)
+
+# Every cleaning step, as enabled by --clean-output
+CLEANING_SETTINGS = {
+    "strip_reasoning": True,
+    "strip_markdown": True,
+    "strip_preamble": True,
+    "max_chars": 2000,
+}
+
+# Cleaning is opt-in: unless configured, model output is stored as returned
+_settings: dict | None = None
+
+
+def configure_postprocessing(settings: dict | None = None):
+    """Select the cleaning steps (see CLEANING_SETTINGS); None stores model output unchanged"""
+    global _settings
+    _settings = settings
+
+
+def current_settings() -> dict | None:
+    """The configured cleaning steps, or None when output is stored unchanged"""
+    return _settings
+
+
+def normalize_whitespace(text: str) -> str:
+    """Collapse spaces within lines and blank-line runs, keeping line breaks between sentences"""
+    lines = (" ".join(line.split()) for line in text.splitlines())
+    return "\n".join(line for line in lines if line)
+
+
+def _truncate(text: str, max_chars: int) -> str:
+    """Cut text to max_chars at a word boundary"""
+    if len(text) <= max_chars:
+        return text
+    cut = text[:max_chars]
+    return cut.rsplit(None, 1)[0] if " " in cut or "\n" in cut else cut
+
+
+def clean_response(text: str, settings: dict | None = None) -> str:
+    """Apply the configured cleaning steps to a model response
+
+    If cleaning would leave nothing (e.g. a reply cut off inside its
+    reasoning block), the whitespace-normalised original is kept, so a
+    non-empty reply is never stored as empty.
+    """
+    settings = _settings if settings is None else settings
+    if not settings:
+        return text
+    
+    cleaned = text
+    if settings.get("strip_reasoning"):
+        cleaned = _REASONING_BLOCK.sub("", cleaned)
+    if settings.get("strip_markdown"):
+        cleaned = _MARKDOWN_EMPHASIS.sub(r"\2", _MARKDOWN_HEADER.sub("", cleaned))
+    cleaned = normalize_whitespace(cleaned)
+    if settings.get("strip_preamble"):
+        stripped = _PREAMBLE.sub("", cleaned + "\n").strip()
+        cleaned = stripped or cleaned
+    if not cleaned:
+        cleaned = normalize_whitespace(text)
+    if settings.get("max_chars"):
+        cleaned = _truncate(cleaned, settings["max_chars"])
+    return cleaned
@@ -0,0 +1,95 @@
+"""Rule-based pre-judge that settles obvious verdicts without an LLM judge call."""
+
+import re
+import unicodedata
+
+_WORD_PATTERN = re.compile(r"\w+")
+_SENTENCE_BREAK = re.compile(r"(?<=[.!?])\s+|\n+")
+_PARENTHETICAL = re.compile(r"\([^)]*\)")
+
+# A refusal is the whole response, so a phrase merely mentioned (or followed by an answer) does not count: an optional
+# apology, a refusal, then at most a pointer to the word ("esa palabra", "what that word means")
+REFUSAL_PATTERN = re.compile(
+    r"(?:(?:lo siento|disculpa|perdon|sorry|i m sorry) )?(?:pero )?"
+    r"(?:no (?:se (?:que significa|lo que significa|el significado de|que es)"
+    r"|conozco|reconozco|tengo informacion (?:sobre|de)"
+    r"|estoy seguro(?: de (?:que significa|lo que significa))?"
+    r"|puedo (?:definir|responder|ayudar con|dar una definicion de))"
+    r"|i (?:don t know|do not know|cannot define|can t define)(?: what)?)"
+    r"(?: (?:esa|esta|la|el|eso|esto|that|this|the))?(?: (?:palabra|termino|word))?(?: \w+)?(?: means)?"
+)
+
+# Function words and definition framing ignored when checking for circular definitions
+STOPWORDS = {
+    "el", "la", "los", "las", "un", "una", "unos", "unas", "lo", "de", "del", "al", "a", "en", "y", "o", "que",
+    "es", "son", "se", "su", "sus", "por", "para", "con", "como", "palabra", "significa", "significado",
+    "definicion", "termino", "refiere", "hace", "referencia", "algo", "alguien", "persona", "cosa",
+}
+
+
+def normalize(text: str) -> str:
+    """Casefold and strip accents so "Árbol" and "arbol" compare equal (ñ becomes n)"""
+    decomposed = unicodedata.normalize("NFKD", text.casefold())
+    return "".join(char for char in decomposed if not unicodedata.combining(char))
+
+
+def tokenize(text: str) -> list[str]:
+    """Accent-insensitive word tokens"""
+    return _WORD_PATTERN.findall(normalize(text))
+
+
+def inflections(word: str) -> set[str]:
+    """Normalized forms of a word: itself and its plurals ("luz" -> "luces"); other words never match"""
+    word = normalize(word)
+    forms = {word, word + "s", word + "es"}
+    if word.endswith("z"):
+        forms.add(word[:-1] + "ces")
+    return forms
+
+
+def matches_word(token: str, word: str) -> bool:
+    """Whether a normalized token is the target word or one of its plurals
+
+    Tokens are compared exactly against the inflection list, so lemmas that
+    differ only in an ending ("cuento", "cuenta") stay apart.
+    """
+    return token in inflections(word)
+
+
+def _contains_word(tokens: list[str], word: str) -> bool:
+    """Whether any token matches the target word"""
+    return any(matches_word(token, word) for token in tokens)
+
+
+def _sentences(text: str) -> list[str]:
+    """Split a response into sentences, dropping list markers and parenthetical notes"""
+    text = _PARENTHETICAL.sub(" ", text)
+    return [sentence for sentence in _SENTENCE_BREAK.split(text) if re.search(r"[^\W\d_]{2,}", sentence)]
+
+
+def prejudge(judge: str, word: str, response: str) -> tuple[str, str] | None:
+    """Return (judgment, rule) when a rule settles the response, or None if it needs the judge
+
+    Rules only ever mark responses incorrect: empty responses, refusals,
+    circular definitions (nothing but the word itself) and, for the usage
+    judge, a sentence after the one using the word that also contains it.
+    """
+    tokens = tokenize(response)
+    if not tokens:
+        return "incorrect", "empty"
+    
+    if REFUSAL_PATTERN.fullmatch(" ".join(tokens)):
+        return "incorrect", "refusal"
+    
+    if judge == "usage":
+        # The first sentence using the word may follow a preamble; the one after it must not use the word
+        sentences = [tokenize(sentence) for sentence in _sentences(response)]
+        first = next((index for index, sentence in enumerate(sentences) if _contains_word(sentence, word)), None)
+        if first is not None and first + 1 < len(sentences) and _contains_word(sentences[first + 1], word):
+            return "incorrect", "word_in_second_sentence"
+    else:
+        content = [token for token in tokens if token not in STOPWORDS]
+        if content and all(matches_word(token, word) for token in content):
+            return "incorrect", "circular"
+    
+    return None
@@ -0,0 +1,160 @@
+"""Dictionary compression of response records: zstd when installed, zlib with a preset dictionary otherwise."""
+
+import functools
+import hashlib
+import os
+import re
+import threading
+import zlib
+from collections import Counter
+from pathlib import Path
+
+try:
+    import zstandard
+except ImportError:  # zlib with a preset dictionary is used instead
+    zstandard = None
+
+DICTIONARY_DIR = "output/dictionaries"
+
+# Compressed records start with a tag naming the codec, then the id of the dictionary they need
+ZSTD_MAGIC = b"LXs1"
+ZLIB_MAGIC = b"LXz1"
+DICTIONARY_ID_BYTES = 8
+
+# zlib can only look back 32 KiB, so a larger preset dictionary would be wasted
+DICTIONARY_SIZE = 16 * 1024
+ZSTD_LEVEL = 19
+
+# Records a dictionary is trained on at the least; one learned from a handful would be kept as current for good
+MIN_TRAINING_RECORDS = 100
+
+_TOKEN = re.compile(rb"[^\s\"]+[\s\"]*")
+
+# Per thread, as zstd decompressors must not be shared: (codec tag, directory, dictionary id) -> ready decompressor
+_decompressors = threading.local()
+
+
+def available_codec() -> str:
+    """The best codec installed: "zstd" with the zstandard package, else "zlib\""""
+    return "zstd" if zstandard is not None else "zlib"
+
+
+def _content_dictionary(samples: list[bytes], size: int) -> bytes:
+    """Concatenate the substrings repeated most across samples, most valuable last (closest to the data)"""
+    counts = Counter(token for sample in samples for token in set(_TOKEN.findall(sample)))
+    ranked = sorted(((count * len(token), token) for token, count in counts.items() if count > 1), reverse=True)
+    chosen, total = [], 0
+    for _, token in ranked:
+        if total + len(token) > size:
+            continue
+        chosen.append(token)
+        total += len(token)
+    return b"".join(reversed(chosen))
+
+
+def train_dictionary(samples: list[bytes], codec: str | None = None, size: int = DICTIONARY_SIZE) -> bytes:
+    """Build a compression dictionary from sample records
+
+    zstd's trainer needs a reasonable number of samples; with too few it
+    falls back to the same content dictionary that zlib uses.
+    """
+    if (codec or available_codec()) == "zstd" and samples:
+        try:
+            return zstandard.train_dictionary(size, samples).as_bytes()
+        except zstandard.ZstdError:
+            pass
+    return _content_dictionary(samples, size)
+
+
+def dictionary_id(dictionary: bytes) -> bytes:
+    return hashlib.sha256(dictionary).digest()[:DICTIONARY_ID_BYTES]
+
+
+def save_dictionary(dictionary: bytes, directory: str = DICTIONARY_DIR, make_current: bool = True) -> str:
+    """Store a dictionary under its id, by default making it the current one; returns the file path"""
+    path = Path(directory) / f"{dictionary_id(dictionary).hex()}.dict"
+    if not path.exists():
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(dictionary)
+    if not make_current:
+        return str(path)
+    tmp_path = Path(directory) / f".current.{os.getpid()}.tmp"
+    tmp_path.write_text(path.name, encoding='utf-8')
+    os.replace(tmp_path, Path(directory) / "current")
+    return str(path)
+
+
+@functools.lru_cache(maxsize=16)
+def _load_dictionary(path: str) -> bytes:
+    return Path(path).read_bytes()
+
+
+def load_dictionary(identifier: bytes, directory: str = DICTIONARY_DIR) -> bytes:
+    """Read a stored dictionary by id (cached, since every compressed read needs it)"""
+    return _load_dictionary(str(Path(directory).resolve() / f"{identifier.hex()}.dict"))
+
+
+class RecordCodec:
+    """Compress records with one dictionary; every record names the codec and dictionary it was written with"""
+    
+    def __init__(self, dictionary: bytes, codec: str | None = None):
+        self.codec = codec or available_codec()
+        if self.codec == "zstd" and zstandard is None:
+            raise RuntimeError("the zstd codec needs the zstandard package")
+        self.dictionary = dictionary
+        self.id = dictionary_id(dictionary)
+        self._zstd_dictionary = zstandard.ZstdCompressionDict(dictionary) if self.codec == "zstd" and dictionary else None
+    
+    def encode(self, data: bytes) -> bytes:
+        if self.codec == "zstd":
+            compressor = zstandard.ZstdCompressor(level=ZSTD_LEVEL, dict_data=self._zstd_dictionary, write_checksum=False,
+                                                  write_content_size=True, write_dict_id=False)
+            return ZSTD_MAGIC + self.id + compressor.compress(data)
+        # Raw deflate (negative wbits): no zlib header or checksum on small records
+        compressor = zlib.compressobj(9, zlib.DEFLATED, -15, zdict=self.dictionary)
+        return ZLIB_MAGIC + self.id + compressor.compress(data) + compressor.flush()
+
+
+def current_codec(directory: str = DICTIONARY_DIR) -> RecordCodec | None:
+    """Codec for the current dictionary in directory, or None if none was trained"""
+    try:
+        name = (Path(directory) / "current").read_text(encoding='utf-8').strip()
+    except FileNotFoundError:
+        return None
+    dictionary = load_dictionary(bytes.fromhex(name.removesuffix(".dict")), directory)
+    return RecordCodec(dictionary)
+
+
+def is_compressed(blob: bytes) -> bool:
+    return blob[:len(ZLIB_MAGIC)] in (ZLIB_MAGIC, ZSTD_MAGIC)
+
+
+def _decompressor(magic: bytes, identifier: bytes, directory: str):
+    """Decompressor for one dictionary, built on first use in this thread (a zlib one is a template to copy)"""
+    cache = _decompressors.__dict__.setdefault("cache", {})
+    key = (magic, os.path.abspath(directory), identifier)
+    if key not in cache:
+        dictionary = load_dictionary(identifier, directory)
+        if magic == ZSTD_MAGIC:
+            if zstandard is None:
+                raise RuntimeError("this record is zstd-compressed; install the zstandard package to read it")
+            cache[key] = zstandard.ZstdDecompressor(dict_data=zstandard.ZstdCompressionDict(dictionary) if dictionary else None)
+        else:
+            cache[key] = zlib.decompressobj(-15, zdict=dictionary)
+    return cache[key]
+
+
+def decode(blob: bytes, directory: str = DICTIONARY_DIR) -> bytes:
+    """Decompress a record written by RecordCodec.encode with the dictionary it names
+    
+    Decompressors are kept per dictionary, so only the first record read
+    with a dictionary pays for loading and setting it up.
+    """
+    magic, rest = blob[:len(ZLIB_MAGIC)], blob[len(ZLIB_MAGIC):]
+    identifier, payload = rest[:DICTIONARY_ID_BYTES], rest[DICTIONARY_ID_BYTES:]
+    decompressor = _decompressor(magic, identifier, directory)
+    if magic == ZSTD_MAGIC:
+        return decompressor.decompress(payload)
+    # A copy carries the preset dictionary, so the template is never consumed
+    decompressor = decompressor.copy()
+    return decompressor.decompress(payload) + decompressor.flush()
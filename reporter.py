@@ -4,21 +4,47 @@ import json
 from rich.console import Console
 from rich.table import Table
 
-from evaluator import calculate_accuracy
-from storage import load_response
+from evaluator import analyze_word_difficulty, calculate_accuracy, covered_words
+from storage import get_prompt_result, load_response
 
 
-def generate_summary(models: list[str], vocabulary: list[dict]):
-    """Generate summary.json and display results table"""
+def _prompt_label(prompt_id: str) -> str:
+    """Human-readable column label for a prompt id ("prompt_a" -> "Prompt A")"""
+    return prompt_id.replace("_", " ").title()
+
+
+def generate_summary(models: list[str], vocabulary: list[dict], words_used: dict[str, list[dict]] | None = None,
+                     prompt_ids: tuple[str, ...] = ("prompt_a", "prompt_b"), prompt_versions: dict[str, str] | None = None,
+                     aliases: dict[str, str] | None = None, partial: bool = False) -> dict:
+    """Generate summary.json, display the results table and return the summary
+
+    When words_used is given (adaptive runs), each model is scored only on the
+    words it was actually evaluated on. With prompt_versions, only results for
+    those template versions count. aliases ({tag: evaluated tag}, see
+    data_loader.load_models) are reported with the results of the tag they
+    share weights with, marked "alias_of". partial scores every model on
+    only the words judged for all prompts by all models, so a run stopped
+    midway still compares models on the same words; words_evaluated is then
+    the covered-word count.
+    """
+    prompt_versions = prompt_versions or {}
     summary = {}
+    if partial:
+        words_used = dict.fromkeys(models, covered_words(models, vocabulary, prompt_ids, prompt_versions))
+    model_vocabularies = {
+        model: words_used.get(model, vocabulary) if words_used is not None else vocabulary
+        for model in models
+    }
     
     for model in models:
-        accuracy_a = calculate_accuracy(model, vocabulary, "a")
-        accuracy_b = calculate_accuracy(model, vocabulary, "b")
         summary[model] = {
-            "prompt_a_accuracy": accuracy_a,
-            "prompt_b_accuracy": accuracy_b
+            f"{prompt_id}_accuracy": calculate_accuracy(model, model_vocabularies[model], prompt_id, prompt_versions.get(prompt_id))
+            for prompt_id in prompt_ids
         }
+        summary[model]["words_evaluated"] = len(model_vocabularies[model])
+    for alias, model in (aliases or {}).items():
+        if model in summary:
+            summary[alias] = {**summary[model], "alias_of": model}
     
     # Save summary.json
     with open('summary.json', 'w', encoding='utf-8') as f:
@@ -26,42 +52,142 @@ def generate_summary(models: list[str], vocabulary: list[dict]):
     
     # Display results table
     console = Console()
-    table = Table(title="Model Performance Summary")
+    title = "Model Performance Summary"
+    if partial:
+        covered = len(next(iter(model_vocabularies.values()), []))
+        title += f" (partial: {covered}/{len(vocabulary)} words covered by every model)"
+    table = Table(title=title)
     table.add_column("Model", style="cyan", no_wrap=True)
-    table.add_column("Prompt A Accuracy (%)", style="magenta", justify="right")
-    table.add_column("Prompt A Correct", style="green", justify="right")
-    table.add_column("Prompt B Accuracy (%)", style="blue", justify="right")
-    table.add_column("Prompt B Correct", style="yellow", justify="right")
-
-    # Compute number of correct definitions per model for both prompts
-    correct_counts_a: dict[str, int] = {}
-    correct_counts_b: dict[str, int] = {}
+    styles = [("magenta", "green"), ("blue", "yellow")]
+    for index, prompt_id in enumerate(prompt_ids):
+        accuracy_style, correct_style = styles[index % len(styles)]
+        table.add_column(f"{_prompt_label(prompt_id)} Accuracy (%)", style=accuracy_style, justify="right")
+        table.add_column(f"{_prompt_label(prompt_id)} Correct", style=correct_style, justify="right")
+    table.add_column("Words", justify="right")
+    
+    # Compute number of correct responses per model for every prompt
+    correct_counts: dict[str, dict[str, int]] = {}
     
-    for model in summary.keys():
-        correct_a = 0
-        correct_b = 0
-        for entry in vocabulary:
+    for model in models:
+        correct_counts[model] = {prompt_id: 0 for prompt_id in prompt_ids}
+        for entry in model_vocabularies[model]:
             word = entry["word"]
             response_data = load_response(model, word)
             
-            # Check prompt A judgment
-            if response_data.get("judgment_a") == "correct":
-                correct_a += 1
-            
-            # Check prompt B judgment
-            if response_data.get("judgment_b") == "correct":
-                correct_b += 1
-                
-        correct_counts_a[model] = correct_a
-        correct_counts_b[model] = correct_b
+            for prompt_id in prompt_ids:
+                if get_prompt_result(response_data, prompt_id, prompt_versions.get(prompt_id)).get("judgment") == "correct":
+                    correct_counts[model][prompt_id] += 1
     
     for model, accuracies in summary.items():
+        row = [f"{model} (alias of {accuracies['alias_of']})" if "alias_of" in accuracies else model]
+        for prompt_id in prompt_ids:
+            row.append(f"{accuracies[f'{prompt_id}_accuracy']:.1f}%")
+            row.append(str(correct_counts[accuracies.get("alias_of", model)][prompt_id]))
+        row.append(str(accuracies["words_evaluated"]))
+        table.add_row(*row)
+    
+    console.print(table)
+    return summary
+
+
+def generate_word_analysis(models: list[str], vocabulary: list[dict], top_n: int = 10,
+                           prompt_ids: tuple[str, ...] = ("prompt_a", "prompt_b"), prompt_versions: dict[str, str] | None = None):
+    """Generate word_analysis.json and display the hardest and most disputed words"""
+    analysis = analyze_word_difficulty(models, vocabulary, prompt_ids, prompt_versions)
+    
+    with open('word_analysis.json', 'w', encoding='utf-8') as f:
+        json.dump(analysis, f, ensure_ascii=False, indent=2)
+    
+    console = Console()
+    table = Table(title="Hardest Words")
+    table.add_column("Word", style="cyan", no_wrap=True)
+    for prompt_id in prompt_ids:
+        table.add_column(f"{_prompt_label(prompt_id)} Failures", style="magenta", justify="right")
+    table.add_column("Prompt Disagreements", style="yellow", justify="right")
+    table.add_column("Discriminating", style="green")
+    
+    for word in analysis["words"][:top_n]:
         table.add_row(
-            model, 
-            f"{accuracies['prompt_a_accuracy']:.1f}%",
-            str(correct_counts_a.get(model, "-")),
-            f"{accuracies['prompt_b_accuracy']:.1f}%",
-            str(correct_counts_b.get(model, "-"))
+            word["word"],
+            *[str(word["failures"][prompt_id]) for prompt_id in prompt_ids],
+            str(len(word["disagreeing_models"])),
+            "yes" if word["discriminating"] else "no"
         )
     
-    console.print(table)
\ No newline at end of file
+    clusters = Table(title="Failure Rate by Feature")
+    clusters.add_column("Feature", style="cyan")
+    clusters.add_column("Value", style="magenta")
+    clusters.add_column("Failed / Judged", justify="right")
+    clusters.add_column("Failure Rate (%)", style="yellow", justify="right")
+    
+    for feature, buckets in analysis["feature_clusters"].items():
+        for value, bucket in sorted(buckets.items()):
+            clusters.add_row(
+                feature,
+                value,
+                f"{bucket['failed']}/{bucket['judged']}",
+                f"{bucket['failure_rate'] * 100:.1f}%"
+            )
+    
+    console.print(table)
+    console.print(clusters)
+
+
+def display_cache_stats(stats: dict):
+    """Display response cache hit rate for the run"""
+    console = Console()
+    table = Table(title="Response Cache")
+    table.add_column("Hits", style="green", justify="right")
+    table.add_column("Misses", style="yellow", justify="right")
+    table.add_column("Hit Rate (%)", style="magenta", justify="right")
+    table.add_column("Entries", justify="right")
+    table.add_row(
+        str(stats["hits"]),
+        str(stats["misses"]),
+        f"{stats['hit_rate'] * 100:.1f}%",
+        str(stats["entries"])
+    )
+    console.print(table)
+
+
+def display_postprocess_savings(savings: dict[str, dict[str, int]]):
+    """Display per model how many responses cleaning changed and the judge input tokens it saved"""
+    console = Console()
+    table = Table(title="Response Cleaning")
+    table.add_column("Model", style="cyan")
+    table.add_column("Responses", justify="right")
+    table.add_column("Cleaned", style="yellow", justify="right")
+    table.add_column("Judge Tokens Saved", style="green", justify="right")
+    for model, counts in savings.items():
+        table.add_row(model, str(counts["responses"]), str(counts["cleaned"]), str(counts["tokens_saved"]))
+    console.print(table)
+
+
+def display_stage_memory(report: dict[str, int]):
+    """Display the peak memory traced per pipeline stage and overall (see streaming.StageMemory)"""
+    console = Console()
+    table = Table(title="Peak Memory by Stage")
+    table.add_column("Stage", style="cyan")
+    table.add_column("Peak (MiB)", style="magenta", justify="right")
+    for stage, size in report.items():
+        table.add_row(stage, f"{size / 2 ** 20:.2f}")
+    console.print(table)
+
+
+def display_hedge_stats(stats: dict):
+    """Display judge calls hedged, duplicates that won and the estimated tail latency saved"""
+    console = Console()
+    table = Table(title="Hedged Judge Calls")
+    table.add_column("Calls", justify="right")
+    table.add_column("Hedged", style="yellow", justify="right")
+    table.add_column("Extra Calls (%)", style="magenta", justify="right")
+    table.add_column("Hedges Won", style="green", justify="right")
+    table.add_column("Tail Latency Saved (s)", style="green", justify="right")
+    table.add_row(
+        str(stats["calls"]),
+        str(stats["hedged"]),
+        f"{stats['extra_fraction'] * 100:.1f}%",
+        str(stats["hedge_wins"]),
+        f"~{stats['saved_seconds']:.1f}"
+    )
+    console.print(table)
@@ -0,0 +1,78 @@
+"""Deterministic model response cache shared across runs and machines."""
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+
+# Options that change how a request is served but not what the model generates
+NON_SEMANTIC_OPTIONS = ("backend", "keep_alive", "num_thread")
+
+
+def cache_key(model_digest: str, prompt: str, options: dict) -> str:
+    """Hash the model weights digest, rendered prompt and generation options into a cache key"""
+    semantic_options = {key: value for key, value in options.items() if key not in NON_SEMANTIC_OPTIONS}
+    payload = json.dumps([model_digest, prompt, semantic_options], ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class ResponseCache:
+    """SQLite-backed response cache with least-recently-used eviction"""
+    
+    def __init__(self, path: str, max_entries: int = 100_000):
+        self.path = path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, response TEXT NOT NULL, last_used REAL NOT NULL)"
+        )
+        self._connection.execute("CREATE INDEX IF NOT EXISTS responses_last_used ON responses (last_used)")
+        self._connection.commit()
+    
+    def get(self, key: str) -> str | None:
+        """Return the cached response for a key, or None on a miss"""
+        with self._lock:
+            row = self._connection.execute("SELECT response FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._connection.execute("UPDATE responses SET last_used = ? WHERE key = ?", (time.time(), key))
+            self._connection.commit()
+            return row[0]
+    
+    def put(self, key: str, response: str):
+        """Store a response, evicting the least recently used entries beyond max_entries"""
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO responses (key, response, last_used) VALUES (?, ?, ?)",
+                (key, response, time.time())
+            )
+            (count,) = self._connection.execute("SELECT COUNT(*) FROM responses").fetchone()
+            if count > self.max_entries:
+                self._connection.execute(
+                    "DELETE FROM responses WHERE key IN (SELECT key FROM responses ORDER BY last_used ASC LIMIT ?)",
+                    (count - self.max_entries,)
+                )
+            self._connection.commit()
+    
+    def stats(self) -> dict:
+        """Hit/miss counts for this process and the number of stored entries"""
+        with self._lock:
+            (entries,) = self._connection.execute("SELECT COUNT(*) FROM responses").fetchone()
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": entries,
+        }
+    
+    def close(self):
+        """Close the underlying database connection"""
+        with self._lock:
+            self._connection.close()
@@ -0,0 +1,171 @@
+"""Append-only registry of runs, for comparing model accuracy and pipeline performance across runs."""
+
+import hashlib
+import json
+import secrets
+import subprocess
+from collections.abc import Iterable
+from datetime import datetime, timezone
+from pathlib import Path
+
+RUNS_PATH = "output/runs.jsonl"
+
+# Relative worsening of a pipeline metric flagged as a regression
+PIPELINE_TOLERANCES = {
+    "items_per_second": 0.10,
+    "p95_seconds": 0.20,
+    "tokens_per_call": 0.10,
+}
+# Accuracy drop, in percentage points, flagged when both runs used the same suite
+ACCURACY_TOLERANCE = 5.0
+
+
+def _hash(value) -> str:
+    return hashlib.sha256(json.dumps(value, ensure_ascii=False, sort_keys=True).encode('utf-8')).hexdigest()[:12]
+
+
+def code_version() -> str | None:
+    """Commit of the working tree, marked "+dirty" with uncommitted changes (None outside a git checkout)"""
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], capture_output=True, text=True,
+                               check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return f"{commit}+dirty" if dirty else commit
+
+
+def _hash_entries(entries: Iterable[dict]) -> str:
+    """Hash of a sequence of entries, equal to _hash of their list but computed one entry at a time"""
+    digest = hashlib.sha256(b"[")
+    for index, entry in enumerate(entries):
+        digest.update((", " if index else "").encode('utf-8'))
+        digest.update(json.dumps(entry, ensure_ascii=False, sort_keys=True).encode('utf-8'))
+    digest.update(b"]")
+    return digest.hexdigest()[:12]
+
+
+def suite_hashes(models: list[str], registry: dict[str, dict], vocabulary: Iterable[dict]) -> dict:
+    """Content hashes of the evaluated models, prompt versions and vocabulary, plus the code version
+    
+    The vocabulary is hashed entry by entry, so a streamed vocabulary is
+    never held in memory.
+    """
+    return {
+        "models": _hash(models),
+        "prompts": _hash({prompt_id: prompt["version"] for prompt_id, prompt in registry.items()}),
+        "vocabulary": _hash_entries(vocabulary),
+        "code": code_version(),
+    }
+
+
+def new_run_id() -> str:
+    """Sortable, unique id: UTC start time and a random suffix"""
+    return f"{datetime.now(timezone.utc):%Y%m%dT%H%M%S}-{secrets.token_hex(3)}"
+
+
+def build_run_record(run_id: str, started: datetime, finished: datetime, suite: dict, summary: dict, processed: int,
+                     latencies: dict[str, dict[str, float]], usage: dict, prejudged: int = 0, cancelled: bool = False) -> dict:
+    """Compact record of a run: suite, accuracy per model, items/sec, latency percentiles and judge spend"""
+    seconds = (finished - started).total_seconds()
+    return {
+        "run_id": run_id,
+        "started": started.isoformat(timespec="seconds"),
+        "finished": finished.isoformat(timespec="seconds"),
+        "cancelled": cancelled,
+        "suite": suite,
+        "accuracy": {
+            model: {key: round(value, 2) if isinstance(value, float) else value for key, value in entry.items()}
+            for model, entry in summary.items()
+        },
+        "pipeline": {
+            "items": processed,
+            "seconds": round(seconds, 3),
+            "items_per_second": round(processed / seconds, 4) if seconds > 0 else 0.0,
+            "latency": {phase: {key: round(value, 4) for key, value in values.items()} for phase, values in latencies.items()},
+            "prejudged": prejudged,
+        },
+        "judge": {
+            **usage,
+            "cost_usd": round(usage.get("cost_usd", 0.0), 6),
+            "tokens_per_call": round((usage.get("input_tokens", 0) + usage.get("output_tokens", 0)) / usage["calls"], 1)
+            if usage.get("calls") else 0.0,
+        },
+    }
+
+
+def append_run(record: dict, path: str = RUNS_PATH):
+    """Append a run record as one JSON line (a single write, so concurrent runs never interleave lines)"""
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write(json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n")
+
+
+def load_runs(path: str = RUNS_PATH) -> list[dict]:
+    """Every recorded run, oldest first ([] if none were recorded)"""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return [json.loads(line) for line in f if line.strip()]
+    except FileNotFoundError:
+        return []
+
+
+def find_run(runs: list[dict], reference: str) -> dict:
+    """Run by id, unique id prefix, or negative index ("-1" is the latest)"""
+    if reference.startswith("-") and reference[1:].isdigit():
+        return runs[int(reference)]
+    matches = [run for run in runs if run["run_id"].startswith(reference)]
+    if len(matches) != 1:
+        raise KeyError(f"{reference!r} matches {len(matches)} runs")
+    return matches[0]
+
+
+def _change(base: float, new: float) -> float | None:
+    return (new - base) / base if base else None
+
+
+def compare_runs(base: dict, new: dict) -> dict:
+    """Differences between two runs, with regressions flagged
+
+    Pipeline regressions are a drop in items/sec, a rise in any phase's p95
+    latency or in judge tokens per call beyond PIPELINE_TOLERANCES. Accuracy
+    drops beyond ACCURACY_TOLERANCE are flagged only when both runs used the
+    same prompts and vocabulary, since changing either is expected to move
+    accuracy.
+    """
+    suite_changes = sorted(key for key in base["suite"] if base["suite"][key] != new["suite"].get(key))
+    comparable = not {"prompts", "vocabulary"} & set(suite_changes)
+    regressions = []
+    
+    accuracy = {}
+    for model in sorted(base["accuracy"].keys() & new["accuracy"].keys()):
+        if "alias_of" in new["accuracy"][model]:
+            continue
+        for key, value in new["accuracy"][model].items():
+            if not key.endswith("_accuracy") or key not in base["accuracy"][model]:
+                continue
+            delta = value - base["accuracy"][model][key]
+            accuracy.setdefault(model, {})[key] = {"base": base["accuracy"][model][key], "new": value, "delta": delta}
+            if comparable and delta < -ACCURACY_TOLERANCE:
+                regressions.append(f"{model} {key} fell {-delta:.1f} points")
+    
+    pipeline = {}
+    
+    def compare_metric(name: str, base_value: float, new_value: float, tolerance: float, higher_is_better: bool):
+        change = _change(base_value, new_value)
+        pipeline[name] = {"base": base_value, "new": new_value, "change": change}
+        if change is not None and (-change if higher_is_better else change) > tolerance:
+            regressions.append(f"{name} {'fell' if higher_is_better else 'rose'} {abs(change) * 100:.0f}%")
+    
+    # A run that found nothing pending (fully resumed) has no throughput to compare
+    if base["pipeline"]["items"] and new["pipeline"]["items"]:
+        compare_metric("items_per_second", base["pipeline"]["items_per_second"], new["pipeline"]["items_per_second"],
+                       PIPELINE_TOLERANCES["items_per_second"], True)
+    for phase in sorted(base["pipeline"]["latency"].keys() & new["pipeline"]["latency"].keys()):
+        compare_metric(f"{phase}_p95_seconds", base["pipeline"]["latency"][phase]["p95"], new["pipeline"]["latency"][phase]["p95"],
+                       PIPELINE_TOLERANCES["p95_seconds"], False)
+    if base["judge"]["calls"] and new["judge"]["calls"]:
+        compare_metric("tokens_per_call", base["judge"]["tokens_per_call"], new["judge"]["tokens_per_call"],
+                       PIPELINE_TOLERANCES["tokens_per_call"], False)
+    
+    return {"suite_changes": suite_changes, "accuracy": accuracy, "pipeline": pipeline, "regressions": regressions}
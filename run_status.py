@@ -0,0 +1,258 @@
+"""Live run metrics published as a status file and an optional local HTTP endpoint."""
+
+import json
+import math
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+from evaluator import progress_counts
+
+STATUS_PATH = "output/status.json"
+
+# Latency histogram: bucket i holds requests of up to LATENCY_MIN_SECONDS * LATENCY_GROWTH ** i seconds, the last one
+# everything longer, so percentiles are within ~5% of the exact ones with the same memory however long the run
+LATENCY_MIN_SECONDS = 0.001
+LATENCY_GROWTH = 1.1
+LATENCY_BUCKETS = 160
+
+
+class LatencyHistogram:
+    """Request latencies counted in fixed log-spaced buckets"""
+    
+    __slots__ = ("counts", "total")
+    
+    def __init__(self):
+        self.counts = [0] * LATENCY_BUCKETS
+        self.total = 0
+    
+    def add(self, seconds: float):
+        index = math.ceil(math.log(seconds / LATENCY_MIN_SECONDS, LATENCY_GROWTH)) if seconds > LATENCY_MIN_SECONDS else 0
+        self.counts[min(index, LATENCY_BUCKETS - 1)] += 1
+        self.total += 1
+    
+    def percentile(self, percent: float) -> float:
+        """Nearest-rank percentile, as the geometric middle of the bucket it falls in"""
+        rank = max(math.ceil(percent / 100 * self.total), 1)
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                return LATENCY_MIN_SECONDS * LATENCY_GROWTH ** max(index - 0.5, 0)
+        return 0.0
+
+
+class RunMetrics:
+    """Thread-safe per-model, per-phase counters for an in-progress run"""
+    
+    def __init__(self, window_seconds: float = 300.0):
+        self.window_seconds = window_seconds
+        self.started = time.time()
+        self._lock = threading.Lock()
+        self._models: dict[str, dict[str, dict[str, int]]] = {}
+        # Per phase: [second, completions] for each second of the throughput window that had any
+        self._recent: dict[str, deque] = {}
+        self._latencies: dict[str, LatencyHistogram] = {}
+        self._judgments: dict[str, dict[str, dict[str, int]]] = {}
+        self.retries = 0
+        self.prejudged = 0
+    
+    def _phase(self, model: str, phase: str) -> dict[str, int]:
+        return self._models.setdefault(model, {}).setdefault(phase, {"completed": 0, "in_flight": 0, "errors": 0})
+    
+    def _trim(self, completions: deque, now: float):
+        while completions and completions[0][0] < now - self.window_seconds:
+            completions.popleft()
+    
+    @contextmanager
+    def track(self, model: str, phase: str):
+        """Count a request as in flight while the block runs, then as completed or failed"""
+        with self._lock:
+            self._phase(model, phase)["in_flight"] += 1
+        started = time.monotonic()
+        try:
+            yield
+        except Exception:
+            with self._lock:
+                self._phase(model, phase)["errors"] += 1
+            raise
+        else:
+            finished = time.monotonic()
+            with self._lock:
+                self._phase(model, phase)["completed"] += 1
+                completions = self._recent.setdefault(phase, deque())
+                second = int(finished)
+                if completions and completions[-1][0] == second:
+                    completions[-1][1] += 1
+                else:
+                    completions.append([second, 1])
+                # Trimmed as it grows so a run nobody reads the status of still holds one window of seconds at most
+                self._trim(completions, finished)
+                self._latencies.setdefault(phase, LatencyHistogram()).add(finished - started)
+        finally:
+            with self._lock:
+                self._phase(model, phase)["in_flight"] -= 1
+    
+    def record_retry(self):
+        """Count a failed cell being attempted again"""
+        with self._lock:
+            self.retries += 1
+    
+    def record_prejudged(self, model: str):
+        """Count a judgment settled by a pre-judge rule or the similarity fast path instead of a judge call"""
+        with self._lock:
+            self.prejudged += 1
+    
+    def record_judgment(self, model: str, prompt_id: str, judgment: str, replaced: str = ""):
+        """Count a cell's stored judgment changing from replaced to judgment ("" for none)"""
+        with self._lock:
+            counts = self._judgments.setdefault(model, {}).setdefault(prompt_id, {"judged": 0, "correct": 0})
+            counts["judged"] += bool(judgment) - bool(replaced)
+            counts["correct"] += (judgment == "correct") - (replaced == "correct")
+    
+    def judgment_counts(self) -> dict[str, dict[str, dict[str, int]]]:
+        """Judged and correct cells added per model and prompt since the run started (negative when judgments were dropped)"""
+        with self._lock:
+            return {model: {prompt_id: dict(counts) for prompt_id, counts in prompts.items()} for model, prompts in self._judgments.items()}
+    
+    def latency_percentiles(self) -> dict[str, dict[str, float]]:
+        """p50/p95/p99 request latency in seconds per phase, over the run's completed requests"""
+        with self._lock:
+            return {
+                phase: {f"p{percent}": histogram.percentile(percent) for percent in (50, 95, 99)}
+                for phase, histogram in self._latencies.items() if histogram.total
+            }
+    
+    def snapshot(self) -> dict:
+        """Counters, in-flight requests and rolling throughput (per second, per phase)"""
+        now = time.monotonic()
+        with self._lock:
+            models = {model: {phase: dict(counts) for phase, counts in phases.items()} for model, phases in self._models.items()}
+            throughput = {}
+            for phase, completions in self._recent.items():
+                self._trim(completions, now)
+                window = min(self.window_seconds, time.time() - self.started) or 1.0
+                throughput[phase] = sum(count for _, count in completions) / window
+            retries = self.retries
+            prejudged = self.prejudged
+        
+        return {
+            "started": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(self.started)),
+            "updated": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "models": models,
+            "in_flight": sum(counts["in_flight"] for phases in models.values() for counts in phases.values()),
+            "errors": sum(counts["errors"] for phases in models.values() for counts in phases.values()),
+            "retries": retries,
+            "prejudged": prejudged,
+            "throughput": throughput,
+        }
+
+
+def build_status(metrics: RunMetrics, models: list[str], vocabulary: list[dict], registry: dict[str, dict],
+                 initial: dict[str, dict[str, dict[str, int]]] | None = None) -> dict:
+    """Metrics snapshot plus partial accuracy from the judgments stored so far
+    
+    initial is evaluator.progress_counts taken when the run started; the
+    judgments recorded in metrics since are added to it. Without it the
+    records are counted now, which reads every one of them.
+    """
+    status = metrics.snapshot()
+    counts = initial if initial is not None else progress_counts(models, vocabulary, registry)
+    recorded = metrics.judgment_counts()
+    accuracy = {}
+    for model, prompts in counts.items():
+        accuracy[model] = {}
+        for prompt_id, cell_counts in prompts.items():
+            delta = recorded.get(model, {}).get(prompt_id, {"judged": 0, "correct": 0})
+            judged = cell_counts["judged"] + delta["judged"]
+            correct = cell_counts["correct"] + delta["correct"]
+            accuracy[model][prompt_id] = {
+                "judged": judged,
+                "total": cell_counts["total"],
+                "accuracy": correct / judged * 100 if judged else 0.0,
+            }
+    status["accuracy"] = accuracy
+    return status
+
+
+def write_status(status: dict, path: str = STATUS_PATH):
+    """Write the status document atomically so readers never see a partial file"""
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(status, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+
+
+def _status_handler(get_status):
+    """Request handler class serving the current status as JSON on GET /status"""
+    
+    class StatusHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path not in ("/", "/status"):
+                self.send_error(404)
+                return
+            body = json.dumps(get_status(), ensure_ascii=False).encode('utf-8')
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        
+        def log_message(self, format, *args):
+            pass
+    
+    return StatusHandler
+
+
+@contextmanager
+def publish_status(models: list[str], vocabulary: list[dict], registry: dict[str, dict], path: str | None = STATUS_PATH,
+                   interval: float = 10.0, port: int | None = None):
+    """Yield RunMetrics for a run while publishing its status
+
+    The status file at path is rewritten every interval seconds and once more
+    on exit. With a port, the same document is served on
+    http://127.0.0.1:{port}/status, computed fresh for each request. The
+    stored records are counted once up front; partial accuracy then follows
+    the judgments recorded in the yielded metrics. With neither a path nor a
+    port nothing is published, so the records are not read at all.
+    """
+    metrics = RunMetrics()
+    if not path and port is None:
+        yield metrics
+        return
+    initial = progress_counts(models, vocabulary, registry)
+    stopped = threading.Event()
+    
+    def get_status():
+        return build_status(metrics, models, vocabulary, registry, initial)
+    
+    def write_periodically():
+        while not stopped.wait(interval):
+            write_status(get_status(), path)
+    
+    threads = []
+    server = None
+    if path:
+        threads.append(threading.Thread(target=write_periodically, daemon=True))
+    if port is not None:
+        server = ThreadingHTTPServer(("127.0.0.1", port), _status_handler(get_status))
+        threads.append(threading.Thread(target=server.serve_forever, daemon=True))
+    for thread in threads:
+        thread.start()
+    
+    try:
+        yield metrics
+    finally:
+        stopped.set()
+        if server is not None:
+            server.shutdown()
+            server.server_close()
+        for thread in threads:
+            thread.join()
+        if path:
+            write_status(get_status(), path)
@@ -0,0 +1,418 @@
+"""Concurrent prompt × model × word matrix runner."""
+
+import os
+import random
+import socket
+import time
+from contextlib import nullcontext
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+
+from tqdm import tqdm
+
+from budget import BudgetExceeded, BudgetGovernor
+from cancellation import CancellationToken, handle_interrupts
+from cassette import Cassette
+from checkpoint import CHECKPOINT_PATH, RunCheckpoint
+from hedging import HedgePolicy
+from model_client import (
+    configure_cassette, configure_judge_backend, configure_judge_budget, configure_judge_hedging,
+    JUDGE_USAGE_RUBRIC, configure_response_cache, estimate_judge_tokens, judge_inputs, judge_replaces_other_models,
+    prompt_model, judge_response, judge_response_b
+)
+from fingerprints import cell_inputs, changed_inputs, content_hash, invalidated_phases
+from postprocess import clean_response, configure_postprocessing, current_settings
+from prejudge import prejudge
+from response_cache import ResponseCache
+from similarity import ReferenceIndex, configure_similarity, similarity_verdict
+from run_status import RunMetrics
+from record_codec import current_codec
+from storage import configure_compression, get_prompt_result, load_response, raw_response, save_prompt_result
+from work_queue import WorkQueue
+
+# Work done for each cell: prompting the model, then judging its response
+PHASES = ("prompt", "judge")
+
+# Cell orders: each model's cells in turn, or batches of words taken by every model before the next batch
+SCHEDULES = ("model", "interleaved")
+DEFAULT_BATCH_WORDS = 16
+
+# Fingerprints of rubrics whose wording changed when judge prompts moved to a shared system prefix: the usage rubric
+# no longer quotes the word ("la palabra indicada"), so its judgments stored without fingerprints are judged again
+REWORDED_RUBRICS = {content_hash(JUDGE_USAGE_RUBRIC)}
+
+
+def _judge_for(judge: str):
+    """Return the judge function for a registry entry's judge kind"""
+    return judge_response_b if judge == "usage" else judge_response
+
+
+def current_inputs(entry: dict, prompt: dict) -> dict:
+    """Input fingerprints a cell would be produced with now (see fingerprints.cell_inputs)"""
+    rubric, judge_model = judge_inputs(prompt["judge"])
+    return cell_inputs(prompt["template"], entry["word"], entry["answer"], rubric, judge_model, current_settings())
+
+
+def stale_phases(response_data: dict, result: dict, inputs: dict) -> tuple[str, ...]:
+    """Phases whose stored output for a cell was produced from inputs that have since changed
+
+    Cells stored before fingerprints were recorded can only be checked
+    against the record's reference answer, and their judgments under a
+    rubric reworded since (REWORDED_RUBRICS) are redone.
+    """
+    if not result.get("response"):
+        return ()
+    if "inputs" in result:
+        changed = changed_inputs(result["inputs"], inputs)
+        if not judge_replaces_other_models():
+            # A judgment from another judge model (e.g. a paid one before a local one) is kept unless replacing is asked for
+            changed.discard("judge_model")
+        stale = invalidated_phases(changed)
+        if "prompt" not in stale and not result.get("judgment"):
+            # Nothing was judged, so at most the response needs cleaning again
+            return tuple(phase for phase in stale if phase == "clean")
+        return stale
+    reference = response_data.get("correct_definition")
+    if result.get("judgment") and reference is not None and content_hash(reference) != inputs["reference"]:
+        return ("judge",)
+    if result.get("judgment") and inputs["rubric"] in REWORDED_RUBRICS:
+        return ("judge",)
+    return ()
+
+
+def _current_cell(response_data: dict, entry: dict, prompt_id: str, prompt: dict) -> dict:
+    """The cell for the current template version in a loaded record, without outputs whose inputs have changed since"""
+    result = get_prompt_result(response_data, prompt_id, prompt["version"])
+    stale = stale_phases(response_data, result, current_inputs(entry, prompt))
+    if "prompt" in stale:
+        return {}
+    if "clean" in stale:
+        result = {**result, "response": clean_response(raw_response(result))}
+    if "judge" in stale:
+        return {key: value for key, value in result.items() if key not in ("judgment", "judged_by")}
+    return result
+
+
+def pending_prompts(model: str, entry: dict, registry: dict[str, dict], phases: tuple[str, ...] = PHASES) -> list[str]:
+    """Prompt ids with work left in the given phases for (model, word), reading its record once for all prompts"""
+    response_data = load_response(model, entry["word"])
+    prompt_ids = []
+    for prompt_id, prompt in registry.items():
+        result = _current_cell(response_data, entry, prompt_id, prompt)
+        needs_prompt = "prompt" in phases and not result.get("response")
+        needs_judge = "judge" in phases and not result.get("judgment") and (result.get("response") or needs_prompt)
+        if needs_prompt or needs_judge:
+            prompt_ids.append(prompt_id)
+    return prompt_ids
+
+
+def evaluate_cell(model: str, entry: dict, prompt_id: str, prompt: dict, options: dict | None = None,
+                  phases: tuple[str, ...] = PHASES, metrics: RunMetrics | None = None) -> dict:
+    """Prompt and/or judge one (model, prompt, word) cell, reusing what is stored for this template version"""
+    def tracked(phase: str):
+        return metrics.track(model, phase) if metrics is not None else nullcontext()
+    
+    word = entry["word"]
+    correct_definition = entry["answer"]
+    
+    inputs = current_inputs(entry, prompt)
+    response_data = load_response(model, word)
+    stored = get_prompt_result(response_data, prompt_id, prompt["version"])
+    result = _current_cell(response_data, entry, prompt_id, prompt)
+    response = result.get("response", "")
+    judgment = result.get("judgment", "")
+    # Passed on when the judgment is saved, so a response cleaned again keeps the output it was cleaned from
+    raw = raw_response(stored) if response else ""
+    saved = False
+    
+    if not response and "prompt" in phases:
+        with tracked("prompt"):
+            raw = prompt_model(word, model, prompt["template"], options)
+        # With cleaning enabled, reasoning blocks, markdown and preambles are stripped so the judge never pays for them
+        response = clean_response(raw)
+        save_prompt_result(model, word, correct_definition, prompt_id, prompt["version"], response=response, raw_response=raw,
+                           inputs=inputs)
+        saved = True
+    
+    judged_by = ""
+    if response and not judgment and "judge" in phases:
+        # Obvious verdicts (empty, refusal, circular, ...) are settled by rules without a judge call
+        verdict = prejudge(prompt["judge"], word, response)
+        if verdict is not None:
+            judgment, judged_by = verdict[0], f"rule:{verdict[1]}"
+        elif prompt["judge"] == "definition" and (similar := similarity_verdict(word, response)) is not None:
+            # Near-copies and unrelated text are labelled by similarity to the reference when the fast path is enabled
+            judgment, judged_by = similar[0], f"similarity:{similar[1]:.3f}"
+        else:
+            with tracked("judge"):
+                judgment = _judge_for(prompt["judge"])(word, correct_definition, response)
+        if judged_by and metrics is not None:
+            metrics.record_prejudged(model)
+        # Re-save the response too so results adopted from legacy fields become versioned
+        save_prompt_result(model, word, correct_definition, prompt_id, prompt["version"], response=response, judgment=judgment,
+                           judged_by=judged_by, raw_response=raw, inputs=inputs)
+        saved = True
+    
+    if saved and metrics is not None:
+        # The status derives partial accuracy from these changes instead of re-reading every record
+        metrics.record_judgment(model, prompt_id, judgment, stored.get("judgment", ""))
+    
+    return {"response": response, "judgment": judgment}
+
+
+def evaluate_with_retries(retries: int, cancel_token: CancellationToken | None, metrics: RunMetrics | None, *args) -> dict:
+    """Run evaluate_cell, attempting a failing cell again up to retries times unless the run is cancelled"""
+    for attempt in range(retries + 1):
+        try:
+            return evaluate_cell(*args)
+        except BudgetExceeded:
+            raise
+        except Exception:
+            if attempt == retries or (cancel_token is not None and cancel_token.cancelled):
+                raise
+            if metrics is not None:
+                metrics.record_retry()
+
+
+def pending_cells(models: list[str], vocabulary: list[dict], registry: dict[str, dict],
+                  phases: tuple[str, ...] = PHASES) -> list[tuple[str, dict, str]]:
+    """List (model, entry, prompt_id) cells with work left in the given phases for their current template version
+
+    Outputs made from inputs that changed since (see stale_phases) count as
+    missing.
+    """
+    return [
+        (model, entry, prompt_id)
+        for model in models for entry in vocabulary for prompt_id in pending_prompts(model, entry, registry, phases)
+    ]
+
+
+def stale_cells(models: list[str], vocabulary: list[dict], registry: dict[str, dict]) -> dict[str, dict[str, dict[str, int]]]:
+    """Count stored cells per model and prompt that the next run re-prompts or only re-judges because their inputs changed"""
+    counts = {model: {prompt_id: {"prompt": 0, "judge": 0} for prompt_id in registry} for model in models}
+    for model in models:
+        for entry in vocabulary:
+            response_data = load_response(model, entry["word"])
+            for prompt_id, prompt in registry.items():
+                result = get_prompt_result(response_data, prompt_id, prompt["version"])
+                stale = stale_phases(response_data, result, current_inputs(entry, prompt))
+                # Cleaning the stored output again needs no model call, so it counts as re-judging only
+                if "prompt" in stale:
+                    counts[model][prompt_id]["prompt"] += 1
+                elif "judge" in stale:
+                    counts[model][prompt_id]["judge"] += 1
+    return counts
+
+
+def schedule_cells(cells: list[tuple[str, dict, str]], schedule: str = "model", batch_words: int = DEFAULT_BATCH_WORDS,
+                   seed: int | None = None) -> list[tuple[str, dict, str]]:
+    """Order pending cells for submission
+    
+    "model" finishes one model's words before starting the next.
+    "interleaved" works through the words in batches of batch_words, and
+    every model takes its turn on a batch before the next batch starts. A
+    run stopped early then leaves every model with about the same words
+    done, while requests within a turn still go to one model, so Ollama does
+    not swap models on every word. seed shuffles the word order.
+    """
+    if schedule not in SCHEDULES:
+        raise ValueError(f"schedule must be one of {SCHEDULES}, not {schedule!r}")
+    words = list(dict.fromkeys(entry["word"] for _, entry, _ in cells))
+    if seed is not None:
+        random.Random(seed).shuffle(words)
+    position = {word: index for index, word in enumerate(words)}
+    model_rank = {model: index for index, model in enumerate(dict.fromkeys(model for model, _, _ in cells))}
+    
+    if schedule == "model":
+        def key(cell):
+            return model_rank[cell[0]], position[cell[1]["word"]]
+    else:
+        def key(cell):
+            return position[cell[1]["word"]] // batch_words, model_rank[cell[0]], position[cell[1]["word"]]
+    # A stable sort keeps each word's prompts in registry order
+    return sorted(cells, key=key)
+
+
+def _settled_without_judge(judge: str, word: str, response: str) -> bool:
+    """Whether a pre-judge rule or the similarity fast path would label a response"""
+    if prejudge(judge, word, response) is not None:
+        return True
+    return judge == "definition" and similarity_verdict(word, response) is not None
+
+
+def pending_judge_tokens(models: list[str], vocabulary: list[dict], registry: dict[str, dict]) -> tuple[int, int]:
+    """Count judge calls still to make and estimate their input tokens
+    
+    Cells without a response yet are estimated with the reference definition
+    standing in for the model's answer; stored responses settled by the
+    pre-judge rules or the similarity fast path need no call.
+    """
+    calls = 0
+    input_tokens = 0
+    for model in models:
+        for entry in vocabulary:
+            response_data = load_response(model, entry["word"])
+            for prompt_id, prompt in registry.items():
+                result = _current_cell(response_data, entry, prompt_id, prompt)
+                if result.get("judgment"):
+                    continue
+                if result.get("response") and _settled_without_judge(prompt["judge"], entry["word"], result["response"]):
+                    continue
+                calls += 1
+                input_tokens += estimate_judge_tokens(prompt["judge"], entry["word"], entry["answer"],
+                                                      result.get("response") or entry["answer"])
+    return calls, input_tokens
+
+
+def run_matrix(models: list[str], vocabulary: list[dict], registry: dict[str, dict], max_workers: int = 4,
+               model_options: dict[str, dict] | None = None, cancel_token: CancellationToken | None = None,
+               checkpoint_path: str = CHECKPOINT_PATH, phases: tuple[str, ...] = PHASES,
+               metrics: RunMetrics | None = None, retries: int = 1, schedule: str = "model",
+               batch_words: int = DEFAULT_BATCH_WORDS, seed: int | None = None) -> int:
+    """Evaluate every pending prompt × model × word cell concurrently
+    
+    Cells are submitted in the order of schedule (see schedule_cells); either
+    way in-flight requests mostly target the same Ollama model. Once
+    cancel_token is cancelled, cells that have not started are dropped while
+    in-flight ones finish and are saved. Progress starts from the completed
+    fraction of the whole matrix, and a checkpoint records throughput for the
+    next run's ETA. phases restricts the run to prompting or judging only. A
+    cell that raises is attempted again up to retries times before the error
+    ends the run. Returns the number of cells processed.
+    """
+    model_options = model_options or {}
+    cells = schedule_cells(pending_cells(models, vocabulary, registry, phases), schedule, batch_words, seed)
+    total_cells = len(models) * len(vocabulary) * len(registry)
+    checkpoint = RunCheckpoint(total_cells, total_cells - len(cells), checkpoint_path)
+    
+    eta = checkpoint.eta_seconds()
+    if cells and checkpoint.completed_cells and eta is not None:
+        tqdm.write(f"Resuming: {checkpoint.completed_cells}/{total_cells} cells complete, ETA {eta / 60:.1f} min")
+    
+    processed = 0
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+    try:
+        futures = [
+            executor.submit(evaluate_with_retries, retries, cancel_token, metrics,
+                            model, entry, prompt_id, registry[prompt_id], model_options.get(model), phases, metrics)
+            for model, entry, prompt_id in cells
+        ]
+        with tqdm(total=total_cells, initial=checkpoint.completed_cells, desc="Evaluating") as progress:
+            for future in as_completed(futures):
+                if future.cancelled():
+                    continue
+                future.result()
+                processed += 1
+                checkpoint.advance()
+                progress.update()
+                
+                if cancel_token is not None and cancel_token.cancelled:
+                    for queued in futures:
+                        queued.cancel()
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+        checkpoint.save(cancelled=cancel_token is not None and cancel_token.cancelled)
+    
+    return processed
+
+
+def run_worker(queue_path: str, vocabulary: list[dict], registry: dict[str, dict], model_options: dict[str, dict] | None = None,
+               cache_path: str | None = None, poll_interval: float = 5.0, lease_seconds: float = 600,
+               max_judge_usd: float | None = None, max_judge_tokens: int | None = None,
+               judge_backend: dict | None = None, similarity_thresholds: tuple[float, float] | None = None,
+               cassette: tuple[str, str, bool] | None = None, hedge: tuple[float, float] | None = None,
+               postprocess: dict | None = None, compress: bool = False, retries: int = 1) -> int:
+    """Claim and evaluate queued cells until the shared queue is drained
+    
+    Cells leased by other workers are waited on rather than skipped, so an
+    expired lease from a crashed worker is picked up. A cell that raises goes
+    back to the queue until it has been attempted retries + 1 times and is
+    then marked failed, while the worker carries on; only an exhausted judge
+    budget stops it. Judge budget caps apply to this worker alone. With
+    similarity_thresholds the worker maps the shared reference vectors for
+    the fast path. cassette is (path, mode, realtime) of a cassette to record
+    to or replay from, and hedge (max extra fraction, percentile) enables
+    hedged judge calls. postprocess selects the response cleaning steps, and
+    compress writes records with the current compression dictionary. Returns
+    the number of cells this worker completed.
+    """
+    model_options = model_options or {}
+    worker_id = f"{socket.gethostname()}:{os.getpid()}"
+    entries = {entry["word"]: entry for entry in vocabulary}
+    if cache_path:
+        configure_response_cache(ResponseCache(cache_path))
+    if max_judge_usd is not None or max_judge_tokens is not None:
+        configure_judge_budget(BudgetGovernor(max_judge_usd, max_judge_tokens))
+    if judge_backend is not None:
+        configure_judge_backend(**judge_backend)
+    if similarity_thresholds is not None:
+        configure_similarity(ReferenceIndex(vocabulary), *similarity_thresholds)
+    if cassette is not None:
+        configure_cassette(Cassette(*cassette))
+    if hedge is not None:
+        configure_judge_hedging(HedgePolicy(*hedge))
+    configure_postprocessing(postprocess)
+    if compress:
+        configure_compression(current_codec())
+    
+    queue = WorkQueue(queue_path, lease_seconds)
+    completed = 0
+    # Each worker process receives Ctrl-C itself; it stops claiming and finishes its current cell
+    with handle_interrupts(CancellationToken()) as cancel_token:
+        try:
+            while not cancel_token.cancelled:
+                item = queue.claim(worker_id)
+                if item is None:
+                    counts = queue.counts()
+                    if counts["pending"] == 0 and counts["leased"] == 0:
+                        break
+                    time.sleep(poll_interval)
+                    continue
+                
+                item_id, model, word, prompt_id = item
+                try:
+                    # evaluate_cell is idempotent, so re-running a reclaimed cell only finishes what is missing
+                    evaluate_cell(model, entries[word], prompt_id, registry[prompt_id], model_options.get(model))
+                except BudgetExceeded:
+                    queue.release(item_id, worker_id)
+                    raise
+                except Exception as error:
+                    if queue.fail(item_id, worker_id, retries + 1):
+                        tqdm.write(f"Giving up on {model} / {word} / {prompt_id}: {error}")
+                    continue
+                if queue.complete(item_id, worker_id):
+                    completed += 1
+        finally:
+            queue.close()
+    
+    return completed
+
+
+def run_distributed(models: list[str], vocabulary: list[dict], registry: dict[str, dict], queue_path: str, processes: int = 2,
+                    model_options: dict[str, dict] | None = None, cache_path: str | None = None, poll_interval: float = 5.0,
+                    max_judge_usd: float | None = None, max_judge_tokens: int | None = None,
+                    judge_backend: dict | None = None, similarity_thresholds: tuple[float, float] | None = None,
+                    cassette: tuple[str, str, bool] | None = None, hedge: tuple[float, float] | None = None,
+                    postprocess: dict | None = None, compress: bool = False, schedule: str = "model",
+                    batch_words: int = DEFAULT_BATCH_WORDS, seed: int | None = None) -> int:
+    """Queue every pending cell in a shared work queue and drain it with a pool of worker processes
+    
+    Several invocations (on one machine or on machines sharing the queue and
+    output/ directory) can run against the same queue safely. Judge budget
+    caps are split evenly between the worker processes. Cells are queued in
+    the order of schedule (see schedule_cells). Returns the number of cells
+    completed by this invocation's workers.
+    """
+    cells = schedule_cells(pending_cells(models, vocabulary, registry), schedule, batch_words, seed)
+    queue = WorkQueue(queue_path)
+    queue.enqueue([(model, entry["word"], prompt_id) for model, entry, prompt_id in cells])
+    queue.close()
+    
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        futures = [
+            executor.submit(run_worker, queue_path, vocabulary, registry, model_options, cache_path, poll_interval, 600,
+                            max_judge_usd / processes if max_judge_usd is not None else None,
+                            max_judge_tokens // processes if max_judge_tokens is not None else None,
+                            judge_backend, similarity_thresholds, cassette, hedge, postprocess, compress)
+            for _ in range(processes)
+        ]
+        return sum(future.result() for future in futures)
@@ -0,0 +1,150 @@
+"""Character n-gram TF-IDF similarity fast path for definition judging."""
+
+import functools
+import hashlib
+import json
+import math
+import mmap
+import os
+from array import array
+from pathlib import Path
+
+from prejudge import normalize
+
+SIMILARITY_DIR = "output/similarity"
+
+# Hashed feature space and n-gram size; changing either invalidates cached reference vectors
+DIMENSIONS = 4096
+NGRAM = 3
+
+
+@functools.lru_cache(maxsize=65536)
+def _bucket(ngram: str) -> int:
+    """Stable hash bucket of an n-gram (Python's hash() is salted per process)"""
+    return int.from_bytes(hashlib.blake2b(ngram.encode('utf-8'), digest_size=4).digest(), 'little') % DIMENSIONS
+
+
+def _ngram_counts(text: str) -> dict[int, int]:
+    """Hashed character n-gram counts of accent-insensitive text, with word boundaries marked"""
+    counts: dict[int, int] = {}
+    for word in normalize(text).split():
+        padded = f" {''.join(char for char in word if char.isalnum())} "
+        for start in range(len(padded) - NGRAM + 1):
+            bucket = _bucket(padded[start:start + NGRAM])
+            counts[bucket] = counts.get(bucket, 0) + 1
+    return counts
+
+
+def _weigh(counts: dict[int, int], idf) -> dict[int, float]:
+    """Sublinear TF-IDF weights, L2-normalised"""
+    weights = {bucket: (1 + math.log(count)) * idf[bucket] for bucket, count in counts.items()}
+    norm = math.sqrt(sum(weight * weight for weight in weights.values()))
+    return {bucket: weight / norm for bucket, weight in weights.items()} if norm else {}
+
+
+def vocabulary_hash(vocabulary: list[dict]) -> str:
+    """Hash of the reference definitions and vectoriser settings"""
+    payload = json.dumps([[entry["word"], entry["answer"]] for entry in vocabulary] + [DIMENSIONS, NGRAM], ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()[:12]
+
+
+def build_reference_vectors(vocabulary: list[dict], path: str):
+    """Write the IDF row and the sparse reference vectors (CSR) as raw arrays
+    
+    The file holds float32 IDF weights for every dimension, then uint32 row
+    offsets (one per word plus the end), then the float32 weights and the
+    uint16 dimensions of every row's non-zero entries. A short definition
+    has a few dozen non-zero n-grams, so a row takes a few hundred bytes
+    rather than 4 * DIMENSIONS.
+    """
+    documents = [_ngram_counts(entry["answer"]) for entry in vocabulary]
+    document_frequency = [0] * DIMENSIONS
+    for counts in documents:
+        for bucket in counts:
+            document_frequency[bucket] += 1
+    idf = array('f', (math.log((1 + len(documents)) / (1 + df)) + 1 for df in document_frequency))
+    
+    offsets, values, buckets = array('I', [0]), array('f'), array('H')
+    for counts in documents:
+        for bucket, weight in sorted(_weigh(counts, idf).items()):
+            buckets.append(bucket)
+            values.append(weight)
+        offsets.append(len(values))
+    
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        for part in (idf, offsets, values, buckets):
+            part.tofile(f)
+    os.replace(tmp_path, path)
+
+
+class ReferenceIndex:
+    """Memory-mapped sparse reference vectors for a vocabulary, built on first use and cached by content hash
+    
+    Several processes opening the same file share its pages instead of each
+    holding a copy.
+    """
+    
+    def __init__(self, vocabulary: list[dict], directory: str = SIMILARITY_DIR):
+        self.path = str(Path(directory) / f"{vocabulary_hash(vocabulary)}.csr")
+        if not Path(self.path).exists():
+            build_reference_vectors(vocabulary, self.path)
+        self._rows = {entry["word"]: index for index, entry in enumerate(vocabulary)}
+        with open(self.path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        view = memoryview(self._mmap)
+        offsets_start = 4 * DIMENSIONS
+        values_start = offsets_start + 4 * (len(vocabulary) + 1)
+        self._idf = view[:offsets_start].cast('f')
+        self._offsets = view[offsets_start:values_start].cast('I')
+        nonzero = self._offsets[-1]
+        self._values = view[values_start:values_start + 4 * nonzero].cast('f')
+        self._buckets = view[values_start + 4 * nonzero:].cast('H')
+        view.release()
+    
+    def __contains__(self, word: str) -> bool:
+        return word in self._rows
+    
+    def similarity(self, word: str, response: str) -> float:
+        """Cosine similarity between a response and the word's reference definition, over the reference's non-zero entries"""
+        row = self._rows[word]
+        weights = _weigh(_ngram_counts(response), self._idf)
+        return sum(
+            self._values[entry] * weights.get(self._buckets[entry], 0.0)
+            for entry in range(self._offsets[row], self._offsets[row + 1])
+        )
+    
+    def close(self):
+        """Release the memory map"""
+        for view in (self._idf, self._offsets, self._values, self._buckets):
+            view.release()
+        self._mmap.close()
+
+
+_index: ReferenceIndex | None = None
+_thresholds = (0.0, 1.0)
+
+# Paraphrases of a reference can score as low as ~0.15, so only near-zero overlap is auto-labelled incorrect
+DEFAULT_LOW = 0.05
+DEFAULT_HIGH = 0.8
+
+
+def configure_similarity(index: ReferenceIndex | None, low: float = DEFAULT_LOW, high: float = DEFAULT_HIGH):
+    """Enable (or with None, disable) the fast path with its auto-label thresholds"""
+    global _index, _thresholds
+    _index = index
+    _thresholds = (low, high)
+
+
+def similarity_verdict(word: str, response: str) -> tuple[str, float] | None:
+    """Auto-label a definition far above or below the thresholds; None leaves it to the judge"""
+    if _index is None or word not in _index:
+        return None
+    score = _index.similarity(word, response)
+    low, high = _thresholds
+    if score >= high:
+        return "correct", score
+    if score <= low:
+        return "incorrect", score
+    return None
@@ -1,59 +1,349 @@
 """Storage utilities for managing response files."""
 
+import base64
 import json
+import os
+import threading
+import zlib
+from contextlib import contextmanager
 from pathlib import Path
+from urllib.parse import quote
+
+import record_codec
+from data_loader import word_id
+from record_codec import RecordCodec
+
+try:
+    import fcntl
+except ImportError:  # Windows: only in-process locking is available
+    fcntl = None
+
+# Prompt ids that predate the prompt registry and their flat field suffixes
+LEGACY_PROMPT_SUFFIXES = {"prompt_a": "a", "prompt_b": "b"}
+
+# Template versions (data_loader.prompt_version) of the baseline prompts.json the flat fields were produced with
+LEGACY_PROMPT_VERSIONS = {"prompt_a": "c4471bee14d7", "prompt_b": "bfdd55dd5c92"}
+
+# Records share a fixed set of lock stripes by name hash, so lock memory does not grow with the vocabulary
+LOCK_STRIPES = 256
+_file_locks = tuple(threading.Lock() for _ in range(LOCK_STRIPES))
+# Per model directory: its lock file, held open for the life of the process
+_lock_files: dict[str, object] = {}
+_lock_files_lock = threading.Lock()
+_codec: RecordCodec | None = None
+# Per absolute model directory: whether it held records of the word-named legacy layout
+_legacy_dirs: dict[str, bool] = {}
+
+
+def configure_compression(codec: RecordCodec | None):
+    """Write records compressed with a dictionary codec (None: pretty-printed JSON); reads handle both"""
+    global _codec
+    if codec is not None:
+        # Every record written must be readable later, so its dictionary is stored first
+        record_codec.save_dictionary(codec.dictionary, make_current=False)
+    _codec = codec
+
+
+def _hidden_sibling(file_path: str | Path, suffix: str) -> str:
+    """Path of a dot-file next to file_path, e.g. its temporary file"""
+    directory, name = os.path.split(file_path)
+    return os.path.join(directory, f".{name}.{suffix}")
+
+
+def _lock_file(directory: str):
+    """The directory's shared lock file; closing any descriptor of it would drop the process's locks, so none is closed"""
+    path = os.path.join(directory, ".lock")
+    with _lock_files_lock:
+        lock_file = _lock_files.get(directory)
+        if lock_file is None or not os.path.exists(path) or not os.path.samestat(os.fstat(lock_file.fileno()), os.stat(path)):
+            # A directory removed and created again needs the new lock file other processes open
+            lock_file = _lock_files[directory] = open(path, 'a')
+        return lock_file
+
+
+@contextmanager
+def _lock_for(file_path: str | Path):
+    """Serialise read-modify-write cycles on a response file across threads and processes
+    
+    A model directory has one lock file, and each record locks one byte of
+    it at an offset hashed from its name, so no per-record lock files pile up.
+    """
+    directory, name = os.path.split(os.path.abspath(file_path))
+    stripe = zlib.crc32(name.encode()) % LOCK_STRIPES
+    with _file_locks[stripe]:
+        if fcntl is None:
+            yield
+            return
+        lock_file = _lock_file(directory)
+        # POSIX record locks, unlike flock, are forwarded to the lock manager of NFS shares
+        fcntl.lockf(lock_file, fcntl.LOCK_EX, 1, stripe)
+        try:
+            yield
+        finally:
+            fcntl.lockf(lock_file, fcntl.LOCK_UN, 1, stripe)
+
+
+def model_dirname(model: str) -> str:
+    """Collision-safe directory name for a model: percent-encodes ':', '/' and other unsafe characters"""
+    return quote(model, safe='')
+
+
+def _record_file(model: str, word: str) -> str:
+    # A plain string: pathlib interns every path segment it parses, and interned strings are never freed,
+    # so Path objects for per-word files would grow memory with the vocabulary
+    return os.path.join("output", model_dirname(model), f"{word_id(word)}.json")
+
+
+def record_path(model: str, word: str) -> Path:
+    """Path of the response file for (model, word), addressed by the word's vocabulary id"""
+    return Path(_record_file(model, word))
+
+
+def _read_record(file_path: str | Path) -> dict:
+    """Read a response file, returning an empty record if it does not exist
+    
+    Compressed records are recognised by their leading codec tag, so a
+    single read serves both formats.
+    """
+    try:
+        with open(file_path, 'rb') as f:
+            blob = f.read()
+    except (FileNotFoundError, NotADirectoryError):
+        return {}
+    if record_codec.is_compressed(blob):
+        blob = record_codec.decode(blob)
+    return json.loads(blob)
+
+
+def _has_legacy_records(model: str) -> bool:
+    """Whether output/{model}/ held word-named files of the earlier layout when first checked in this process"""
+    directory = os.path.abspath(os.path.join("output", model))
+    if directory not in _legacy_dirs:
+        try:
+            names = os.listdir(directory)
+        except (FileNotFoundError, NotADirectoryError):
+            names = []
+        _legacy_dirs[directory] = any(name.endswith(".json") and not name[:-5].isdigit() for name in names)
+    return _legacy_dirs[directory]
+
+
+def _read_record_or_legacy(file_path: str, model: str, word: str) -> dict:
+    """Read a response file, moving a record of the output/{model}/{word}.json layout of earlier runs into place first
+    
+    Models without legacy files never pay for a second lookup, and a legacy
+    record is moved to its id-addressed path on its first read, so later
+    reads find it directly.
+    """
+    response_data = _read_record(file_path)
+    if response_data or not _has_legacy_records(model):
+        return response_data
+    os.makedirs(os.path.dirname(file_path), exist_ok=True)
+    try:
+        os.replace(os.path.join("output", model, f"{word}.json"), file_path)
+    except (FileNotFoundError, NotADirectoryError):
+        # No legacy record, or a concurrent reader moved it already
+        pass
+    return _read_record(file_path)
+
+
+def _write_record(file_path: str | Path, response_data: dict):
+    """Write a response file atomically so concurrent readers never see a partial record"""
+    tmp_path = _hidden_sibling(file_path, f"{os.getpid()}.{threading.get_ident()}.tmp")
+    if _codec is not None:
+        with open(tmp_path, 'wb') as f:
+            f.write(_codec.encode(json.dumps(response_data, ensure_ascii=False, separators=(",", ":")).encode('utf-8')))
+    else:
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(response_data, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, file_path)
+
+
+def compress_text(text: str) -> str:
+    """zlib-compress text into an ASCII string that fits in a JSON record"""
+    return base64.b64encode(zlib.compress(text.encode('utf-8'), 9)).decode('ascii')
+
+
+def decompress_text(data: str) -> str:
+    """Inverse of compress_text"""
+    return zlib.decompress(base64.b64decode(data)).decode('utf-8')
+
+
+def raw_response(result: dict) -> str:
+    """The model's unprocessed output for a stored cell (the stored response when it needed no cleaning)"""
+    if "raw_response_z" in result:
+        return decompress_text(result["raw_response_z"])
+    return result.get("response", "")
 
 
 def save_response(model: str, word: str, correct_definition: str, model_response_a: str = "", model_response_b: str = "", judgment_a: str = "", judgment_b: str = ""):
     """Save model response to output directory"""
-    output_dir = Path(f"output/{model}")
-    output_dir.mkdir(parents=True, exist_ok=True)
-    
-    # Load existing data if it exists to preserve existing responses
-    file_path = output_dir / f"{word}.json"
-    response_data = {}
-    if file_path.exists():
-        with open(file_path, 'r', encoding='utf-8') as f:
-            response_data = json.load(f)
-    
-    # Update with new data
-    response_data.update({
-        "word": word,
-        "correct_definition": correct_definition
-    })
-    
-    if model_response_a:
-        response_data["model_response_a"] = model_response_a
-    if model_response_b:
-        response_data["model_response_b"] = model_response_b
-    if judgment_a:
-        response_data["judgment_a"] = judgment_a
-    if judgment_b:
-        response_data["judgment_b"] = judgment_b
-    
-    with open(file_path, 'w', encoding='utf-8') as f:
-        json.dump(response_data, f, ensure_ascii=False, indent=2)
+    file_path = _record_file(model, word)
+    os.makedirs(os.path.dirname(file_path), exist_ok=True)
+    
+    with _lock_for(file_path):
+        # Load existing data if it exists to preserve existing responses
+        response_data = _read_record_or_legacy(file_path, model, word)
+        
+        # Update with new data
+        response_data.update({
+            "word": word,
+            "correct_definition": correct_definition
+        })
+        
+        if model_response_a:
+            response_data["model_response_a"] = model_response_a
+        if model_response_b:
+            response_data["model_response_b"] = model_response_b
+        if judgment_a:
+            response_data["judgment_a"] = judgment_a
+        if judgment_b:
+            response_data["judgment_b"] = judgment_b
+        
+        _write_record(file_path, response_data)
 
 
 def load_response(model: str, word: str) -> dict:
     """Load existing response from output directory"""
-    file_path = Path(f"output/{model}/{word}.json")
-    if file_path.exists():
-        with open(file_path, 'r', encoding='utf-8') as f:
-            return json.load(f)
-    return {}
+    return _read_record_or_legacy(_record_file(model, word), model, word)
 
 
 def update_response_judgment(model: str, word: str, judgment_a: str = "", judgment_b: str = ""):
     """Update existing response with judgment"""
-    response_data = load_response(model, word)
+    file_path = _record_file(model, word)
+    os.makedirs(os.path.dirname(file_path), exist_ok=True)
+    with _lock_for(file_path):
+        response_data = _read_record_or_legacy(file_path, model, word)
+        
+        if judgment_a:
+            response_data["judgment_a"] = judgment_a
+        if judgment_b:
+            response_data["judgment_b"] = judgment_b
+        
+        _write_record(file_path, response_data)
+
+
+def get_prompt_result(response_data: dict, prompt_id: str, prompt_version: str | None = None) -> dict:
+    """Return the {"response", "judgment"} cell for a prompt from a loaded record
     
-    if judgment_a:
-        response_data["judgment_a"] = judgment_a
-    if judgment_b:
-        response_data["judgment_b"] = judgment_b
+    Without a version, the most recently added version is returned. Records
+    written before the prompt registry only have flat model_response_a/_b
+    fields; those belong to the baseline templates (LEGACY_PROMPT_VERSIONS)
+    and are used for that version, or without a version, when no versioned
+    result exists. Any other version of the prompt gets {}.
+    """
+    versions = response_data.get("prompts", {}).get(prompt_id, {})
+    if prompt_version in versions:
+        return versions[prompt_version]
+    if versions and prompt_version is None:
+        return versions[list(versions)[-1]]
     
-    output_dir = Path(f"output/{model}")
-    file_path = output_dir / f"{word}.json"
-    with open(file_path, 'w', encoding='utf-8') as f:
-        json.dump(response_data, f, ensure_ascii=False, indent=2)
\ No newline at end of file
+    suffix = LEGACY_PROMPT_SUFFIXES.get(prompt_id)
+    if suffix is None or prompt_version not in (None, LEGACY_PROMPT_VERSIONS[prompt_id]):
+        return {}
+    result = {}
+    if response_data.get(f"model_response_{suffix}"):
+        result["response"] = response_data[f"model_response_{suffix}"]
+    if response_data.get(f"judgment_{suffix}"):
+        result["judgment"] = response_data[f"judgment_{suffix}"]
+    return result
+
+
+def load_prompt_result(model: str, word: str, prompt_id: str, prompt_version: str | None = None) -> dict:
+    """Load the stored cell for (model, prompt_id, prompt_version, word)"""
+    return get_prompt_result(load_response(model, word), prompt_id, prompt_version)
+
+
+def save_prompt_result(model: str, word: str, correct_definition: str, prompt_id: str, prompt_version: str, response: str = "", judgment: str = "",
+                       judged_by: str = "", raw_response: str = "", inputs: dict | None = None):
+    """Save a response and/or judgment for (model, prompt_id, prompt_version, word)
+    
+    Results for other prompt versions are kept, so changing a template never
+    overwrites earlier results. judged_by records where a judgment came from
+    when it was not the LLM judge (e.g. "rule:circular"). raw_response is the
+    model output before cleaning, stored compressed when it differs from
+    response. inputs are the fingerprints of what produced the cell (see
+    fingerprints.cell_inputs). A response saved without a judgment is a new
+    one, so any judgment stored for the cell is dropped.
+    """
+    file_path = _record_file(model, word)
+    os.makedirs(os.path.dirname(file_path), exist_ok=True)
+    
+    with _lock_for(file_path):
+        response_data = _read_record_or_legacy(file_path, model, word)
+        response_data.update({
+            "word": word,
+            "correct_definition": correct_definition
+        })
+        
+        cell = response_data.setdefault("prompts", {}).setdefault(prompt_id, {}).setdefault(prompt_version, {})
+        if response and not judgment:
+            for key in ("judgment", "judged_by"):
+                cell.pop(key, None)
+        if response:
+            cell["response"] = response
+        if inputs:
+            cell["inputs"] = inputs
+        if judgment:
+            cell["judgment"] = judgment
+        if judged_by:
+            cell["judged_by"] = judged_by
+        if raw_response and raw_response != response:
+            cell["raw_response_z"] = compress_text(raw_response)
+        
+        _write_record(file_path, response_data)
+
+
+def record_files(models: list[str]) -> dict[str, list[Path]]:
+    """Response files on disk per model, including files of the legacy per-word layout
+    
+    Only the record directories of models are read, never the indexes,
+    dictionaries and caches that share output/. A model's encoded directory
+    and its legacy output/{model}/ directory are listed together.
+    """
+    files = {}
+    for model in models:
+        directories = {Path("output", model_dirname(model)), Path("output", model)}
+        records = sorted(
+            path for directory in directories if directory.is_dir()
+            for path in directory.glob("*.json") if not path.name.startswith(".")
+        )
+        if records:
+            files[model] = records
+    return files
+
+
+def train_compression(models: list[str], size: int = record_codec.DICTIONARY_SIZE,
+                      min_records: int = record_codec.MIN_TRAINING_RECORDS) -> RecordCodec | None:
+    """Train a dictionary on the stored records of models, make it current and return its codec
+    
+    With fewer than min_records records nothing is trained and None is
+    returned, leaving the current dictionary (if any) in place.
+    """
+    files = [file_path for records in record_files(models).values() for file_path in records]
+    if len(files) < min_records:
+        return None
+    samples = [json.dumps(_read_record(file_path), ensure_ascii=False, separators=(",", ":")).encode('utf-8') for file_path in files]
+    dictionary = record_codec.train_dictionary(samples, size=size)
+    record_codec.save_dictionary(dictionary)
+    return RecordCodec(dictionary)
+
+
+def recompress_records(models: list[str]) -> int:
+    """Rewrite every response file of models in the configured format; returns the number of files rewritten"""
+    rewritten = 0
+    for records in record_files(models).values():
+        for file_path in records:
+            with _lock_for(file_path):
+                _write_record(file_path, _read_record(file_path))
+            rewritten += 1
+    return rewritten
+
+
+def storage_stats(models: list[str]) -> dict[str, dict[str, int]]:
+    """Records, bytes on disk and bytes as pretty-printed JSON per model"""
+    stats = {}
+    for model, records in record_files(models).items():
+        on_disk = sum(file_path.stat().st_size for file_path in records)
+        as_json = sum(len(json.dumps(_read_record(file_path), ensure_ascii=False, indent=2).encode('utf-8')) for file_path in records)
+        stats[model] = {"records": len(records), "bytes": on_disk, "json_bytes": as_json}
+    return stats
@@ -0,0 +1,246 @@
+"""Memory-bounded evaluation: a streamed vocabulary flows through bounded queues between scan, prompt and judge stages."""
+
+import itertools
+import queue
+import threading
+import tracemalloc
+from collections.abc import Callable, Iterable, Iterator
+
+from tqdm import tqdm
+
+from cancellation import CancellationToken
+from run_status import RunMetrics
+from runner import DEFAULT_BATCH_WORDS, PHASES, SCHEDULES, evaluate_with_retries, pending_prompts
+
+# Cells waiting between two stages; with the workers this caps what is in flight whatever the vocabulary size
+DEFAULT_QUEUE_SIZE = 64
+
+# Stack depth kept per allocation, enough to reach a stage function from inside the HTTP clients
+TRACE_FRAMES = 64
+
+
+class CellTask:
+    """One (model, word, prompt) cell in flight between stages, without a per-instance __dict__"""
+    
+    __slots__ = ("model", "word", "answer", "prompt_id")
+    
+    def __init__(self, model: str, word: str, answer: str, prompt_id: str):
+        self.model = model
+        self.word = word
+        self.answer = answer
+        self.prompt_id = prompt_id
+    
+    def entry(self) -> dict:
+        """The vocabulary entry the cell was scanned from"""
+        return {"word": self.word, "answer": self.answer}
+
+
+class _Pipeline:
+    """State shared by the stages: the first error raised, and whether work should stop"""
+    
+    __slots__ = ("cancel_token", "error", "processed", "progress", "_lock")
+    
+    def __init__(self, cancel_token: CancellationToken | None, progress):
+        self.cancel_token = cancel_token
+        self.error: BaseException | None = None
+        self.processed = 0
+        self.progress = progress
+        self._lock = threading.Lock()
+    
+    @property
+    def stopped(self) -> bool:
+        return self.error is not None or (self.cancel_token is not None and self.cancel_token.cancelled)
+    
+    def fail(self, error: BaseException):
+        with self._lock:
+            if self.error is None:
+                self.error = error
+    
+    def complete(self):
+        with self._lock:
+            self.processed += 1
+            self.progress.update()
+
+
+def _scan_order(models: list[str], vocabulary: Iterable[dict], schedule: str, batch_words: int) -> Iterator[tuple[str, dict]]:
+    """(model, entry) pairs in schedule order, holding at most one batch of entries"""
+    if schedule == "model":
+        for model in models:
+            for entry in vocabulary:
+                yield model, entry
+        return
+    entries = iter(vocabulary)
+    while batch := list(itertools.islice(entries, batch_words)):
+        for model in models:
+            for entry in batch:
+                yield model, entry
+
+
+def _scan_stage(pipeline: _Pipeline, models: list[str], vocabulary: Iterable[dict], registry: dict[str, dict],
+                phases: tuple[str, ...], schedule: str, batch_words: int, outbox: queue.Queue, workers: int):
+    """Read the stored records in schedule order and queue the cells with work left"""
+    try:
+        for model, entry in _scan_order(models, vocabulary, schedule, batch_words):
+            if pipeline.stopped:
+                break
+            for prompt_id in pending_prompts(model, entry, registry, phases):
+                outbox.put(CellTask(model, entry["word"], entry["answer"], prompt_id))
+    except Exception as error:
+        pipeline.fail(error)
+    finally:
+        for _ in range(workers):
+            outbox.put(None)
+
+
+def _work(pipeline: _Pipeline, phase: str, registry: dict[str, dict], model_options: dict[str, dict],
+          metrics: RunMetrics | None, retries: int, inbox: queue.Queue, outbox: queue.Queue | None):
+    """Run one phase on queued cells until the end-of-stream marker; once stopped, cells are drained undone"""
+    while (task := inbox.get()) is not None:
+        if pipeline.stopped:
+            continue
+        try:
+            evaluate_with_retries(retries, pipeline.cancel_token, metrics, task.model, task.entry(), task.prompt_id,
+                                  registry[task.prompt_id], model_options.get(task.model), (phase,), metrics)
+        except Exception as error:
+            pipeline.fail(error)
+            continue
+        if outbox is not None:
+            outbox.put(task)
+        else:
+            pipeline.complete()
+
+
+def _prompt_stage(*args):
+    _work(*args)
+
+
+def _judge_stage(*args):
+    _work(*args)
+
+
+STAGES = {"scan": _scan_stage, "prompt": _prompt_stage, "judge": _judge_stage}
+
+
+def run_streaming(models: list[str], vocabulary: Iterable[dict], registry: dict[str, dict], max_workers: int = 4,
+                  model_options: dict[str, dict] | None = None, cancel_token: CancellationToken | None = None,
+                  phases: tuple[str, ...] = PHASES, metrics: RunMetrics | None = None, retries: int = 1,
+                  schedule: str = "model", batch_words: int = DEFAULT_BATCH_WORDS,
+                  queue_size: int = DEFAULT_QUEUE_SIZE) -> int:
+    """Evaluate every pending cell with memory that does not grow with the vocabulary
+    
+    A scan thread reads the vocabulary and each (model, word) record once,
+    queueing the cells with work left; max_workers threads prompt them and
+    another max_workers judge them. Queues between the stages hold at most
+    queue_size cells, so a slow stage holds back the ones before it instead
+    of buffering. The "model" schedule reads the vocabulary once per model,
+    so it must be re-iterable (a list or data_loader.VocabularyStream);
+    "interleaved" reads it once, batch_words entries at a time. Words are
+    taken in vocabulary order (there is no up-front cell list to shuffle),
+    and progress has no total for the same reason. Cancelling or an error
+    stops new work while in-flight cells finish; the first error is then
+    raised. Returns the number of cells processed.
+    """
+    if schedule not in SCHEDULES:
+        raise ValueError(f"schedule must be one of {SCHEDULES}, not {schedule!r}")
+    model_options = model_options or {}
+    stages = [phase for phase in PHASES if phase in phases]
+    queues = [queue.Queue(maxsize=queue_size) for _ in stages]
+    
+    with tqdm(desc="Evaluating (streaming)", unit="cell") as progress:
+        pipeline = _Pipeline(cancel_token, progress)
+        scanner = threading.Thread(target=_scan_stage, name="scan", daemon=True,
+                                   args=(pipeline, models, vocabulary, registry, phases, schedule, batch_words, queues[0], max_workers))
+        stage_workers = [
+            [
+                threading.Thread(target=STAGES[phase], name=f"{phase}-{number}", daemon=True,
+                                 args=(pipeline, phase, registry, model_options, metrics, retries, queues[index],
+                                       queues[index + 1] if index + 1 < len(stages) else None))
+                for number in range(max_workers)
+            ]
+            for index, phase in enumerate(stages)
+        ]
+        scanner.start()
+        for worker in itertools.chain.from_iterable(stage_workers):
+            worker.start()
+        scanner.join()
+        for index, workers in enumerate(stage_workers):
+            for worker in workers:
+                worker.join()
+            # Every cell of this stage has been passed on, so the next stage can be told the stream ended
+            if index + 1 < len(stages):
+                for _ in range(max_workers):
+                    queues[index + 1].put(None)
+    
+    if pipeline.error is not None:
+        raise pipeline.error
+    return pipeline.processed
+
+
+def _code_range(function: Callable) -> tuple[str, int, int]:
+    code = function.__code__
+    return code.co_filename, code.co_firstlineno, max(line for _, _, line in code.co_lines() if line is not None)
+
+
+class StageMemory:
+    """Opt-in tracemalloc report of peak memory held per pipeline stage
+    
+    While running, a sampler thread takes a tracemalloc snapshot every
+    interval seconds and attributes each live allocation to the innermost
+    stage function on its stack (see STAGES); allocations outside the stages,
+    such as the caller's own data, count as "other". Stage peaks are sampled,
+    so a spike shorter than interval can be missed; the overall peak is
+    tracemalloc's exact one, less the sampler's own snapshots. Tracing slows
+    the run, so this is for benchmarks and diagnosis rather than every run.
+    """
+    
+    def __init__(self, interval: float = 0.5, stages: dict[str, Callable] = STAGES):
+        self.interval = interval
+        self.peaks = dict.fromkeys([*stages, "other"], 0)
+        self.peak = 0
+        self._ranges = [(name, *_code_range(function)) for name, function in stages.items()]
+        self._stop = threading.Event()
+        self._thread = None
+    
+    def _stage_of(self, traceback: tracemalloc.Traceback) -> str:
+        # Frames run oldest first, so they are walked from the end to find the innermost stage frame
+        for frame in reversed(traceback):
+            for name, filename, first, last in self._ranges:
+                if frame.filename == filename and first <= frame.lineno <= last:
+                    return name
+        return "other"
+    
+    def sample(self):
+        """Attribute the memory currently traced to stages, raising their peaks"""
+        self.peak = max(self.peak, tracemalloc.get_traced_memory()[1])
+        snapshot = tracemalloc.take_snapshot()
+        sizes = dict.fromkeys(self.peaks, 0)
+        stages = {}
+        for trace in snapshot.traces:
+            if trace.traceback not in stages:
+                stages[trace.traceback] = self._stage_of(trace.traceback)
+            sizes[stages[trace.traceback]] += trace.size
+        for name, size in sizes.items():
+            self.peaks[name] = max(self.peaks[name], size)
+        # The snapshot itself is traced; once it is freed the peak restarts so it never counts as the run's memory
+        del snapshot, stages
+        tracemalloc.reset_peak()
+    
+    def _sample_until_stopped(self):
+        while not self._stop.wait(self.interval):
+            self.sample()
+    
+    def __enter__(self) -> "StageMemory":
+        tracemalloc.start(TRACE_FRAMES)
+        self._thread = threading.Thread(target=self._sample_until_stopped, name="stage-memory", daemon=True)
+        self._thread.start()
+        return self
+    
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+        self.sample()
+        tracemalloc.stop()
+    
+    def report(self) -> dict[str, int]:
+        """Peak bytes per stage and overall ("total")"""
+        return {**self.peaks, "total": self.peak}
@@ -0,0 +1,103 @@
+"""Tests for adaptive module."""
+
+from unittest.mock import patch
+
+import pytest
+
+from adaptive import evaluate_word, is_settled, run_adaptive_evaluation
+from runner import current_inputs
+from storage import load_prompt_result, save_prompt_result
+
+
+@pytest.fixture
+def registry():
+    """Two-prompt registry matching the default suite"""
+    return {
+        "prompt_a": {"template": "A {word}", "judge": "definition", "version": "va"},
+        "prompt_b": {"template": "B {word}", "judge": "usage", "version": "vb"},
+    }
+
+
+class TestEvaluateWord:
+    """Tests for evaluate_word function."""
+    
+    @patch('runner.judge_response_b', return_value="incorrect")
+    @patch('runner.judge_response', return_value="correct")
+    @patch('runner.prompt_model', return_value="respuesta")
+    def test_evaluate_word_prompts_and_judges_both(self, mock_prompt, mock_judge_a, mock_judge_b, tmp_path, monkeypatch, registry):
+        """Test that every prompt is answered and judged"""
+        monkeypatch.chdir(tmp_path)
+        
+        result = evaluate_word("model", {"word": "ardilla", "answer": "def"}, registry)
+        
+        assert result == {"prompt_a": "correct", "prompt_b": "incorrect"}
+        assert mock_prompt.call_count == 2
+    
+    @patch('runner.judge_response')
+    @patch('runner.prompt_model')
+    def test_evaluate_word_reuses_stored_results(self, mock_prompt, mock_judge_a, tmp_path, monkeypatch, registry):
+        """Test that stored responses and judgments are not recomputed"""
+        monkeypatch.chdir(tmp_path)
+        save_prompt_result("model", "ardilla", "def", "prompt_a", "va", response="resp", judgment="correct")
+        save_prompt_result("model", "ardilla", "def", "prompt_b", "vb", response="resp", judgment="correct",
+                           inputs=current_inputs({"word": "ardilla", "answer": "def"}, registry["prompt_b"]))
+        
+        evaluate_word("model", {"word": "ardilla", "answer": "def"}, registry)
+        
+        mock_prompt.assert_not_called()
+        mock_judge_a.assert_not_called()
+
+
+class TestIsSettled:
+    """Tests for is_settled function."""
+    
+    def test_is_settled_when_interval_is_narrow(self):
+        """Test that a narrow interval settles the model"""
+        intervals = {"m1": {"prompt_a": (0.50, 0.60), "prompt_b": (0.40, 0.45)}}
+        assert is_settled("m1", intervals, target_width=0.2)
+    
+    def test_is_settled_when_rank_is_fixed(self):
+        """Test that a wide but non-overlapping interval settles the model"""
+        intervals = {
+            "m1": {"prompt_a": (0.70, 1.00), "prompt_b": (0.65, 1.00)},
+            "m2": {"prompt_a": (0.00, 0.30), "prompt_b": (0.00, 0.40)},
+        }
+        assert is_settled("m1", intervals, target_width=0.1)
+    
+    def test_is_not_settled_when_overlapping(self):
+        """Test that overlapping wide intervals keep the model active"""
+        intervals = {
+            "m1": {"prompt_a": (0.40, 0.90), "prompt_b": (0.65, 1.00)},
+            "m2": {"prompt_a": (0.30, 0.60), "prompt_b": (0.00, 0.40)},
+        }
+        assert not is_settled("m1", intervals, target_width=0.1)
+
+
+class TestRunAdaptiveEvaluation:
+    """Tests for run_adaptive_evaluation function."""
+    
+    @patch('runner.judge_response_b', return_value="correct")
+    @patch('runner.judge_response', return_value="correct")
+    @patch('runner.prompt_model', return_value="respuesta")
+    def test_run_adaptive_evaluation_stops_early(self, mock_prompt, mock_judge_a, mock_judge_b, tmp_path, monkeypatch, registry):
+        """Test that a settled model stops before the vocabulary is exhausted"""
+        monkeypatch.chdir(tmp_path)
+        vocabulary = [{"word": f"word{i}", "answer": "def"} for i in range(200)]
+        
+        words_used = run_adaptive_evaluation(["model"], vocabulary, registry, target_width=0.1, min_words=5, seed=1)
+        
+        assert 5 <= len(words_used["model"]) < 200
+    
+    @patch('runner.judge_response_b', return_value="incorrect")
+    @patch('runner.judge_response', return_value="incorrect")
+    @patch('runner.prompt_model', return_value="respuesta")
+    def test_run_adaptive_evaluation_respects_min_words(self, mock_prompt, mock_judge_a, mock_judge_b, tmp_path, monkeypatch, registry):
+        """Test that at least min_words words are evaluated per model"""
+        monkeypatch.chdir(tmp_path)
+        vocabulary = [{"word": f"word{i}", "answer": "def"} for i in range(20)]
+        
+        words_used = run_adaptive_evaluation(["m1", "m2"], vocabulary, registry, target_width=1.0, min_words=8, seed=1)
+        
+        assert len(words_used["m1"]) == 8
+        assert len(words_used["m2"]) == 8
+        assert load_prompt_result("m1", words_used["m1"][0]["word"], "prompt_a", "va")["judgment"] == "incorrect"
@@ -0,0 +1,66 @@
+"""Tests for autotune module."""
+
+import json
+from concurrent.futures import ThreadPoolExecutor
+
+import model_client
+from autotune import autotune_model, find_knee, host_key, load_concurrency, save_concurrency
+from mock_server import MockServer
+from model_client import configure_model_concurrency
+
+
+class TestAutotune:
+    """Tests for concurrency autotuning."""
+    
+    def test_find_knee_prefers_throughput_without_queueing(self):
+        """Test that the knee is where throughput stops growing faster than p95 latency"""
+        levels = [
+            {"concurrency": 1, "throughput": 5.0, "p95": 0.2},
+            {"concurrency": 2, "throughput": 10.0, "p95": 0.2},
+            {"concurrency": 4, "throughput": 11.0, "p95": 0.4},
+        ]
+        
+        assert find_knee(levels) == 2
+    
+    def test_autotune_finds_mock_server_parallelism(self, monkeypatch):
+        """Test that tuning against a server serving two requests at once settles on two"""
+        with MockServer(reply="respuesta", latency=0.1, parallel=2) as server:
+            monkeypatch.setattr(model_client, "OLLAMA_HOST", server.base_url.removesuffix("/v1"))
+            result = autotune_model("m", ["ardilla", "corbata", "agüista", "sal"], "Define {word}", (1, 2, 4, 8))
+        
+        assert result["concurrency"] == 2
+        assert [level["concurrency"] for level in result["levels"]] == [1, 2, 4, 8]
+    
+    def test_settings_persist_per_host(self, tmp_path, monkeypatch):
+        """Test that saved settings are loaded for the same host only"""
+        path = str(tmp_path / "concurrency.json")
+        save_concurrency("gemma3:12b", {"concurrency": 4, "levels": []}, path)
+        
+        assert load_concurrency(path) == {"gemma3:12b": 4}
+        assert list(json.loads((tmp_path / "concurrency.json").read_text())) == [host_key()]
+        
+        monkeypatch.setattr(model_client, "OLLAMA_HOST", "http://gpu-box:11434")
+        assert load_concurrency(path) == {}
+    
+    def test_model_concurrency_caps_in_flight_requests(self, monkeypatch):
+        """Test that configured limits cap concurrent prompt_model calls per model"""
+        with MockServer(reply="respuesta", latency=0.05) as server:
+            monkeypatch.setattr(model_client, "OLLAMA_HOST", server.base_url.removesuffix("/v1"))
+            configure_model_concurrency({"m": 1})
+            try:
+                in_flight = []
+                original = model_client._prompt_openai_compatible
+                
+                def tracked(*args):
+                    in_flight.append(1)
+                    assert len(in_flight) == 1
+                    try:
+                        return original(*args)
+                    finally:
+                        in_flight.pop()
+                
+                monkeypatch.setattr(model_client, "_prompt_openai_compatible", tracked)
+                with ThreadPoolExecutor(max_workers=4) as executor:
+                    assert list(executor.map(lambda word: model_client.prompt_model(word, "m", "{word}"), "abcd")) == ["respuesta"] * 4
+            finally:
+                configure_model_concurrency(None)
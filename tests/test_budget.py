@@ -0,0 +1,59 @@
+"""Tests for budget module."""
+
+from types import SimpleNamespace
+
+import pytest
+
+from budget import BudgetExceeded, BudgetGovernor, format_projection
+
+
+class TestBudgetGovernor:
+    """Tests for BudgetGovernor class."""
+    
+    def test_record_charges_actual_usage(self):
+        """Test that reported usage replaces the reservation estimate"""
+        governor = BudgetGovernor(input_usd_per_million=1.0, output_usd_per_million=10.0)
+        
+        reservation = governor.reserve(500)
+        governor.record(reservation, SimpleNamespace(prompt_tokens=400, completion_tokens=100))
+        
+        assert governor.usage() == {"calls": 1, "input_tokens": 400, "output_tokens": 100, "cost_usd": pytest.approx(0.0014)}
+    
+    def test_record_without_usage_charges_estimate(self):
+        """Test that a call without usage is charged its reservation"""
+        governor = BudgetGovernor(expected_output_tokens=50)
+        
+        governor.record(governor.reserve(200))
+        
+        assert governor.usage()["input_tokens"] == 200
+        assert governor.usage()["output_tokens"] == 50
+    
+    def test_reserve_stops_at_token_cap(self):
+        """Test that a call that could exceed the token cap is refused"""
+        governor = BudgetGovernor(max_tokens=1000, expected_output_tokens=100)
+        governor.record(governor.reserve(400), SimpleNamespace(prompt_tokens=400, completion_tokens=100))
+        
+        governor.reserve(300)
+        with pytest.raises(BudgetExceeded):
+            governor.reserve(300)
+    
+    def test_reserve_counts_in_flight_calls(self):
+        """Test that concurrent reservations cannot overshoot the dollar cap together"""
+        governor = BudgetGovernor(max_usd=0.01, input_usd_per_million=1_000.0, output_usd_per_million=0.0)
+        
+        reservation = governor.reserve(6)
+        with pytest.raises(BudgetExceeded):
+            governor.reserve(6)
+        governor.release(reservation)
+        governor.reserve(6)
+    
+    def test_projection_flags_over_budget(self):
+        """Test that a projection beyond the cap is reported in the projection line"""
+        governor = BudgetGovernor(max_usd=1.0, input_usd_per_million=1.0, output_usd_per_million=10.0, expected_output_tokens=1000)
+        
+        projection = governor.projection(calls=200, input_tokens=100_000)
+        
+        assert projection["cost_usd"] == pytest.approx(2.1)
+        assert projection["within_budget"] is False
+        assert "$2.10" in format_projection(projection, governor)
+        assert "stop" in format_projection(projection, governor)
@@ -0,0 +1,73 @@
+"""Tests for calibration module."""
+
+import pytest
+
+from calibration import calibrate_judges, stored_responses
+from mock_server import MockServer
+from storage import save_prompt_result
+
+
+@pytest.fixture
+def registry():
+    """Two-prompt registry using both judge kinds"""
+    return {
+        "prompt_a": {"template": "A {word}", "judge": "definition", "version": "va"},
+        "prompt_b": {"template": "B {word}", "judge": "usage", "version": "vb"},
+    }
+
+
+class TestStoredResponses:
+    """Tests for stored_responses function."""
+    
+    def test_stored_responses_current_versions_only(self, tmp_path, monkeypatch, registry, sample_vocabulary):
+        """Test that only responses for the current template versions are listed"""
+        monkeypatch.chdir(tmp_path)
+        save_prompt_result("m1", "ardilla", "def", "prompt_a", "va", response="roedor")
+        save_prompt_result("m1", "corbata", "def", "prompt_a", "old", response="prenda")
+        
+        items = stored_responses(["m1"], sample_vocabulary, registry)
+        
+        assert items == [(sample_vocabulary[0], registry["prompt_a"], "roedor")]
+
+
+class TestCalibrateJudges:
+    """Tests for calibrate_judges function."""
+    
+    def test_calibrate_judges_reports_agreement(self, tmp_path, monkeypatch, registry, sample_vocabulary):
+        """Test that both judges see every stored response and their agreement is reported"""
+        monkeypatch.chdir(tmp_path)
+        for entry in sample_vocabulary:
+            save_prompt_result("m1", entry["word"], entry["answer"], "prompt_a", "va", response="r")
+            save_prompt_result("m1", entry["word"], entry["answer"], "prompt_b", "vb", response="r")
+        
+        with MockServer(reply="correct") as reference_server, MockServer(reply="Correct") as candidate_server:
+            result = calibrate_judges(
+                ["m1"], sample_vocabulary, registry,
+                candidate={"model": "local-judge", "base_url": candidate_server.base_url},
+                reference={"model": "gpt-5", "base_url": reference_server.base_url},
+                workers=2,
+            )
+        
+        assert result["items"] == 6
+        assert result["agreement"] == 1.0
+        assert result["kappa"] == 1.0
+        assert result["candidate_throughput"] > 0
+        assert len(candidate_server.requests) == 6
+        assert {request["model"] for request in candidate_server.requests} == {"local-judge"}
+    
+    def test_calibrate_judges_respects_limit(self, tmp_path, monkeypatch, registry, sample_vocabulary):
+        """Test that at most limit responses are judged"""
+        monkeypatch.chdir(tmp_path)
+        for entry in sample_vocabulary:
+            save_prompt_result("m1", entry["word"], entry["answer"], "prompt_a", "va", response="r")
+        
+        with MockServer(reply="correct") as reference_server, MockServer(reply="incorrect") as candidate_server:
+            result = calibrate_judges(
+                ["m1"], sample_vocabulary, registry,
+                candidate={"model": "local-judge", "base_url": candidate_server.base_url},
+                reference={"model": "gpt-5", "base_url": reference_server.base_url},
+                limit=2,
+            )
+        
+        assert result["items"] == 2
+        assert result["agreement"] == 0.0
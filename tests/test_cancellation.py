@@ -0,0 +1,36 @@
+"""Tests for cancellation module."""
+
+import os
+import signal
+
+import pytest
+
+from cancellation import CancellationToken, handle_interrupts
+
+
+class TestHandleInterrupts:
+    """Tests for handle_interrupts context manager."""
+    
+    def test_first_interrupt_cancels_token(self):
+        """Test that the first Ctrl-C only cancels the token"""
+        calls = []
+        with handle_interrupts(CancellationToken(), lambda: calls.append("cancel")) as token:
+            os.kill(os.getpid(), signal.SIGINT)
+            assert token.cancelled
+        
+        assert calls == ["cancel"]
+    
+    def test_second_interrupt_aborts(self):
+        """Test that a second Ctrl-C raises KeyboardInterrupt"""
+        with pytest.raises(KeyboardInterrupt):
+            with handle_interrupts(CancellationToken()):
+                os.kill(os.getpid(), signal.SIGINT)
+                os.kill(os.getpid(), signal.SIGINT)
+    
+    def test_previous_handler_restored(self):
+        """Test that the original SIGINT handler is restored on exit"""
+        previous = signal.getsignal(signal.SIGINT)
+        with handle_interrupts(CancellationToken()):
+            pass
+        
+        assert signal.getsignal(signal.SIGINT) is previous
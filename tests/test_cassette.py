@@ -0,0 +1,93 @@
+"""Tests for cassette module."""
+
+import json
+import time
+
+import pytest
+
+import model_client
+from cassette import Cassette, CassetteMiss, request_key
+from mock_server import MockServer
+from model_client import configure_cassette, judge_response, prompt_model
+
+
+@pytest.fixture
+def use_cassette():
+    """Configure a cassette for model_client and always unset it afterwards"""
+    def configure(cassette: Cassette) -> Cassette:
+        configure_cassette(cassette)
+        return cassette
+    yield configure
+    configure_cassette(None)
+
+
+class TestCassette:
+    """Tests for the Cassette class."""
+    
+    def test_request_key_ignores_non_semantic_options(self):
+        """Test that serving options such as keep_alive do not change the key"""
+        messages = [{"role": "user", "content": "Define ardilla"}]
+        
+        assert request_key("prompt", "m", messages, {"temperature": 0}) == request_key("prompt", "m", messages, {"temperature": 0, "keep_alive": "5m"})
+        assert request_key("prompt", "m", messages, {"temperature": 0}) != request_key("prompt", "m", messages, {"temperature": 1})
+        assert request_key("prompt", "m", messages) != request_key("judge", "m", messages)
+    
+    def test_record_then_replay(self, tmp_path):
+        """Test that recorded calls are replayed without calling send"""
+        path = str(tmp_path / "calls.jsonl")
+        recorder = Cassette(path, "record")
+        assert recorder.call("prompt", "m", [{"role": "user", "content": "a"}], None, lambda: "first") == "first"
+        recorder.close()
+        
+        player = Cassette(path, "replay")
+        
+        assert player.call("prompt", "m", [{"role": "user", "content": "a"}], None, lambda: pytest.fail("sent")) == "first"
+        assert player.stats() == {"mode": "replay", "recorded": 0, "replayed": 1}
+    
+    def test_repeated_requests_replay_in_recorded_order(self, tmp_path):
+        """Test that a request recorded twice replays both responses, then repeats the last"""
+        path = str(tmp_path / "calls.jsonl")
+        recorder = Cassette(path, "record")
+        for response in ("one", "two"):
+            recorder.call("judge", "m", [], None, lambda: response)
+        recorder.close()
+        
+        player = Cassette(path, "replay")
+        
+        assert [player.call("judge", "m", [], None, lambda: "") for _ in range(3)] == ["one", "two", "two"]
+    
+    def test_replay_miss_raises(self, tmp_path):
+        """Test that an unrecorded request raises CassetteMiss instead of reaching a backend"""
+        path = tmp_path / "calls.jsonl"
+        path.write_text("")
+        
+        with pytest.raises(CassetteMiss):
+            Cassette(str(path), "replay").call("prompt", "m", [], None, lambda: "sent")
+    
+    def test_realtime_replay_waits_recorded_latency(self, tmp_path):
+        """Test that realtime replay sleeps for each call's recorded seconds"""
+        path = tmp_path / "calls.jsonl"
+        path.write_text(json.dumps({"key": request_key("prompt", "m", []), "response": "r", "seconds": 0.2}) + "\n")
+        
+        started = time.monotonic()
+        Cassette(str(path), "replay", realtime=True).call("prompt", "m", [], None, lambda: "")
+        
+        assert time.monotonic() - started >= 0.2
+    
+    def test_model_and_judge_traffic_replays_offline(self, tmp_path, monkeypatch, use_cassette):
+        """Test that prompt_model and the judge are recorded against a server and replayed once it is gone"""
+        path = str(tmp_path / "calls.jsonl")
+        with MockServer(reply="correct", latency=0.05) as server:
+            monkeypatch.setattr(model_client, "OLLAMA_HOST", server.base_url.removesuffix("/v1"))
+            backend = {"model": "judge", "base_url": server.base_url, "api_key": None}
+            recorder = use_cassette(Cassette(path, "record"))
+            recorded = (prompt_model("ardilla", "m", "Define {word}"), judge_response("ardilla", "roedor", "r", backend))
+            recorder.close()
+        
+        entries = [json.loads(line) for line in open(path, encoding="utf-8")]
+        assert [entry["kind"] for entry in entries] == ["prompt", "judge"]
+        assert all(entry["seconds"] >= 0.05 for entry in entries)
+        
+        use_cassette(Cassette(path, "replay"))
+        
+        assert (prompt_model("ardilla", "m", "Define {word}"), judge_response("ardilla", "roedor", "r", backend)) == recorded
@@ -0,0 +1,43 @@
+"""Tests for checkpoint module."""
+
+from checkpoint import RunCheckpoint, load_checkpoint
+
+
+class TestRunCheckpoint:
+    """Tests for RunCheckpoint class."""
+    
+    def test_save_records_progress(self, tmp_path):
+        """Test that the saved checkpoint reflects completed cells"""
+        path = str(tmp_path / "checkpoint.json")
+        checkpoint = RunCheckpoint(total_cells=10, completed_cells=4, path=path)
+        checkpoint.advance()
+        checkpoint.save(cancelled=True)
+        
+        saved = load_checkpoint(path)
+        assert saved["total_cells"] == 10
+        assert saved["completed_cells"] == 5
+        assert saved["processed_cells"] == 1
+        assert saved["cancelled"] is True
+    
+    def test_throughput_accumulates_across_sessions(self, tmp_path):
+        """Test that a resumed run inherits earlier throughput for its ETA"""
+        path = str(tmp_path / "checkpoint.json")
+        (tmp_path / "checkpoint.json").write_text(
+            '{"processed_cells": 100, "elapsed_seconds": 50.0, "throughput": 2.0}'
+        )
+        
+        checkpoint = RunCheckpoint(total_cells=200, completed_cells=100, path=path)
+        
+        assert checkpoint.throughput <= 2.0
+        assert checkpoint.eta_seconds() >= 50.0
+        assert checkpoint.save()["processed_cells"] == 100
+    
+    def test_eta_unknown_without_history(self, tmp_path):
+        """Test that no ETA is given before any throughput is measured"""
+        checkpoint = RunCheckpoint(total_cells=10, completed_cells=0, path=str(tmp_path / "checkpoint.json"))
+        
+        assert checkpoint.eta_seconds() is None
+    
+    def test_load_checkpoint_missing_file(self, tmp_path):
+        """Test that a missing checkpoint loads as empty"""
+        assert load_checkpoint(str(tmp_path / "missing.json")) == {}
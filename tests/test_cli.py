@@ -0,0 +1,219 @@
+"""Tests for cli module."""
+
+import json
+import subprocess
+import sys
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+from cli import main
+from storage import load_prompt_result, save_prompt_result
+
+PACKAGE_DIR = Path(__file__).parent.parent
+
+
+@pytest.fixture
+def suite(tmp_path, monkeypatch):
+    """Minimal suite directory with one model, two words and one prompt"""
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "suite").mkdir()
+    (tmp_path / "suite" / "models_list.txt").write_text("model1\n")
+    (tmp_path / "suite" / "prompts.json").write_text(json.dumps({"prompt_a": "Define {word}"}))
+    (tmp_path / "suite" / "vocabulary_short.json").write_text(json.dumps([
+        {"word": "ardilla", "answer": "roedor"},
+        {"word": "corbata", "answer": "prenda"},
+    ]))
+    return tmp_path
+
+
+def _current_version():
+    from data_loader import load_prompt_registry
+    return load_prompt_registry()["prompt_a"]["version"]
+
+
+class TestCli:
+    """Tests for command-line subcommands."""
+    
+    def test_status_reports_progress(self, suite, capsys):
+        """Test that status prints judged counts and partial accuracy"""
+        save_prompt_result("model1", "ardilla", "roedor", "prompt_a", _current_version(), response="r", judgment="correct")
+        
+        assert main(["status"]) == 0
+        
+        output = capsys.readouterr().out
+        assert "model1" in output
+        assert "1/2" in output
+        assert "100.0%" in output
+    
+    @patch('runner.judge_response')
+    @patch('runner.prompt_model', return_value="respuesta")
+    def test_prompt_does_not_judge(self, mock_prompt, mock_judge, suite):
+        """Test that the prompt subcommand stores responses without calling the judge"""
+        assert main(["prompt", "--workers", "1"]) == 0
+        
+        assert mock_prompt.call_count == 2
+        mock_judge.assert_not_called()
+    
+    @patch('runner.judge_response', return_value="correct")
+    @patch('runner.prompt_model')
+    def test_judge_only_judges_stored_responses(self, mock_prompt, mock_judge, suite):
+        """Test that the judge subcommand never prompts models"""
+        save_prompt_result("model1", "ardilla", "roedor", "prompt_a", _current_version(), response="r")
+        
+        assert main(["judge", "--workers", "1"]) == 0
+        
+        mock_prompt.assert_not_called()
+        mock_judge.assert_called_once_with("ardilla", "roedor", "r")
+    
+    def test_export_writes_csv(self, suite):
+        """Test that export writes one row per stored prompt version"""
+        save_prompt_result("model1", "ardilla", "roedor", "prompt_a", "v1", response="r", judgment="correct")
+        
+        assert main(["export", "--output", "cells.csv"]) == 0
+        
+        rows = (suite / "cells.csv").read_text(encoding="utf-8").splitlines()
+        assert rows[0] == "model,word,prompt_id,prompt_version,response,judgment"
+        assert rows[1:] == ["model1,ardilla,prompt_a,v1,r,correct"]
+    
+    def test_summarize_writes_summary(self, suite):
+        """Test that summarize regenerates summary.json from stored judgments"""
+        save_prompt_result("model1", "ardilla", "roedor", "prompt_a", _current_version(), response="r", judgment="correct")
+        
+        assert main(["summarize"]) == 0
+        
+        summary = json.loads((suite / "summary.json").read_text(encoding="utf-8"))
+        assert summary["model1"]["prompt_a_accuracy"] == 50.0
+    
+    def test_prompt_replays_cassette(self, suite, capsys):
+        """Test that --replay serves model calls from a cassette without contacting a backend"""
+        from cassette import request_key
+        with open("calls.jsonl", "w", encoding="utf-8") as f:
+            for word in ("ardilla", "corbata"):
+                key = request_key("prompt", "model1", [{"role": "user", "content": f"Define {word}"}], {})
+                f.write(json.dumps({"key": key, "response": f"{word} grabada", "seconds": 1.0}) + "\n")
+        
+        assert main(["prompt", "--workers", "1", "--replay", "calls.jsonl"]) == 0
+        
+        assert load_prompt_result("model1", "corbata", "prompt_a", _current_version())["response"] == "corbata grabada"
+        assert "2 replayed" in capsys.readouterr().out
+    
+    def test_compress_and_stats_report_savings(self, suite, capsys):
+        """Test that compress rewrites stored records and stats reports bytes saved"""
+        for word, answer in (("ardilla", "roedor"), ("corbata", "prenda")):
+            save_prompt_result("model1", word, answer, "prompt_a", _current_version(), response=f"Es una {answer} común.",
+                               judgment="correct")
+        
+        assert main(["compress", "--min-records", "2"]) == 0
+        capsys.readouterr()
+        assert main(["stats"]) == 0
+        
+        output = capsys.readouterr().out
+        assert "model1" in output and "total" in output
+        assert load_prompt_result("model1", "corbata", "prompt_a", _current_version())["judgment"] == "correct"
+    
+    def test_compress_needs_enough_records(self, suite, capsys):
+        """Test that compress trains nothing from too few records"""
+        save_prompt_result("model1", "ardilla", "roedor", "prompt_a", _current_version(), response="Es un roedor.")
+        
+        assert main(["compress"]) == 1
+        
+        assert "not enough" in capsys.readouterr().out
+        assert not (suite / "output" / "dictionaries").exists()
+    
+    @patch('runner.judge_response', return_value="correct")
+    @patch('runner.prompt_model', return_value="respuesta")
+    def test_run_compress_does_not_train_a_dictionary(self, mock_prompt, mock_judge, suite, capsys):
+        """Test that --compress without a trained dictionary writes JSON records instead of training one"""
+        assert main(["prompt", "--workers", "1", "--compress"]) == 0
+        
+        assert "no compression dictionary" in capsys.readouterr().out
+        assert not (suite / "output" / "dictionaries").exists()
+        assert load_prompt_result("model1", "ardilla", "prompt_a", _current_version())["response"] == "respuesta"
+    
+    @patch('runner.judge_response', return_value="correct")
+    @patch('runner.prompt_model', return_value="respuesta")
+    def test_changes_reports_cells_to_rejudge(self, mock_prompt, mock_judge, suite, capsys):
+        """Test that changes counts the cells a new judge model would re-judge only when replacing judgments"""
+        assert main(["run", "--workers", "1"]) == 0
+        capsys.readouterr()
+        
+        assert main(["changes"]) == 0
+        assert "0 cells to re-prompt, 0 to re-judge only" in capsys.readouterr().out
+        assert main(["changes", "--judge-model", "other-judge"]) == 0
+        assert "0 cells to re-prompt, 0 to re-judge only" in capsys.readouterr().out
+        assert main(["changes", "--judge-model", "other-judge", "--replace-judgments"]) == 0
+        assert "0 cells to re-prompt, 2 to re-judge only" in capsys.readouterr().out
+    
+    @patch('model_client.resolve_model_digests', return_value={"model1": "sha256:aaa", "model1:alias": "sha256:aaa"})
+    @patch('runner.prompt_model', return_value="respuesta")
+    def test_prompt_evaluates_aliases_once(self, mock_prompt, mock_digests, suite, capsys):
+        """Test that a tag sharing another tag's weights is not prompted and status reports it as an alias"""
+        (suite / "suite" / "models_list.txt").write_text("model1\nmodel1:alias\n")
+        
+        assert main(["prompt", "--workers", "1"]) == 0
+        assert {call.args[1] for call in mock_prompt.call_args_list} == {"model1"}
+        assert mock_prompt.call_count == 2
+        
+        capsys.readouterr()
+        assert main(["status"]) == 0
+        assert "alias of model1" in capsys.readouterr().out
+    
+    @patch('runner.judge_response', return_value="correct")
+    @patch('runner.prompt_model', return_value="respuesta")
+    def test_run_records_runs_for_compare(self, mock_prompt, mock_judge, suite, capsys):
+        """Test that each run is added to the run registry and compare diffs the last two"""
+        from run_registry import load_runs
+        
+        assert main(["compare"]) == 2
+        assert main(["run", "--workers", "1"]) == 0
+        assert main(["run", "--workers", "1"]) == 0
+        capsys.readouterr()
+        
+        runs = load_runs()
+        assert len(runs) == 2
+        assert runs[0]["pipeline"]["items"] == 2 and runs[1]["pipeline"]["items"] == 0
+        assert runs[0]["accuracy"]["model1"]["prompt_a_accuracy"] == 100.0
+        assert main(["compare"]) == 0
+        output = capsys.readouterr().out
+        assert f"{runs[0]['run_id']} -> {runs[1]['run_id']}" in output
+        assert "REGRESSION" not in output
+    
+    @patch('runner.judge_response', return_value="correct")
+    @patch('runner.prompt_model', return_value="respuesta")
+    def test_run_stream_reports_stage_memory(self, mock_prompt, mock_judge, suite, capsys):
+        """Test that a streamed run evaluates every cell, reports peak memory per stage and skips the word analysis"""
+        from run_registry import load_runs
+        
+        assert main(["run", "--stream", "--memory-report", "--workers", "1", "--queue-size", "1"]) == 0
+        
+        assert mock_prompt.call_count == 2
+        assert "Peak Memory by Stage" in capsys.readouterr().out
+        assert load_runs()[-1]["pipeline"]["items"] == 2
+        assert json.loads((suite / "summary.json").read_text())["model1"]["prompt_a_accuracy"] == 100.0
+        assert not (suite / "word_analysis.json").exists()
+    
+    @patch('runner.prompt_model', return_value="respuesta")
+    def test_prompt_stream_prints_memory_report(self, mock_prompt, suite, capsys):
+        """Test that a streamed phase prints its per-stage peaks"""
+        assert main(["prompt", "--stream", "--memory-report"]) == 0
+        
+        assert mock_prompt.call_count == 2
+        assert "peak memory: scan" in capsys.readouterr().out
+    
+    def test_run_stream_rejects_adaptive(self, suite, capsys):
+        """Test that streaming cannot be combined with adaptive sampling"""
+        assert main(["run", "--stream", "--adaptive"]) == 2
+        assert "--stream" in capsys.readouterr().out
+    
+    @pytest.mark.parametrize("command", ["status", "export", "stats", "compare"])
+    def test_read_only_commands_skip_client_imports(self, suite, command):
+        """Test that read-only commands never import the model clients or tqdm"""
+        script = (
+            f"import sys; sys.path.insert(0, {str(PACKAGE_DIR)!r}); import cli; cli.main([{command!r}]); "
+            "print(sorted(m for m in ('openai', 'ollama', 'tqdm', 'rich') if m in sys.modules), file=sys.stderr)"
+        )
+        result = subprocess.run([sys.executable, "-c", script], capture_output=True, text=True, check=True)
+        
+        assert result.stderr.strip().splitlines()[-1] == "[]"
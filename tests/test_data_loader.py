@@ -2,7 +2,12 @@
 
 import json
 
-from data_loader import load_models, load_prompts, load_vocabulary
+import pytest
+
+from data_loader import (
+    VocabularyStream, compile_vocabulary, iter_vocabulary, load_model_aliases, load_model_options, load_models,
+    load_prompt_registry, load_prompts, load_vocabulary, load_vocabulary_index, model_aliases, prompt_version, vocabulary_key, word_id
+)
 
 
 class TestLoadModels:
@@ -40,6 +45,46 @@ class TestLoadModels:
         assert isinstance(models, list)
         assert len(models) == 2
     
+    def test_load_models_drops_aliases_of_the_same_weights(self, tmp_path, monkeypatch):
+        """Test that tags resolving to an earlier tag's digest are left out and recorded as aliases"""
+        models_file = tmp_path / "suite" / "models_list.txt"
+        models_file.parent.mkdir(parents=True)
+        models_file.write_text("llama3.1:8b\ngemma3:12b\nllama3.1:latest\n")
+        digests = {"llama3.1:8b": "sha256:aaa", "gemma3:12b": "sha256:bbb", "llama3.1:latest": "sha256:aaa"}
+        monkeypatch.chdir(tmp_path)
+        
+        models = load_models(lambda tags: {tag: digests[tag] for tag in tags})
+        
+        assert models == ["llama3.1:8b", "gemma3:12b"]
+        assert load_model_aliases() == {"llama3.1:latest": "llama3.1:8b"}
+        assert load_models() == ["llama3.1:8b", "gemma3:12b", "llama3.1:latest"]
+    
+    def test_load_models_keeps_aliases_when_nothing_resolves(self, tmp_path, monkeypatch):
+        """Test that an unreachable Ollama (no digests) leaves the recorded aliases in place"""
+        models_file = tmp_path / "suite" / "models_list.txt"
+        models_file.parent.mkdir(parents=True)
+        models_file.write_text("llama3.1:8b\nllama3.1:latest\n")
+        monkeypatch.chdir(tmp_path)
+        load_models(lambda tags: dict.fromkeys(tags, "sha256:aaa"))
+        
+        models = load_models(lambda tags: {})
+        
+        assert models == ["llama3.1:8b"]
+        assert load_model_aliases() == {"llama3.1:latest": "llama3.1:8b"}
+    
+    def test_model_aliases_keep_tags_with_different_options_apart(self):
+        """Test that the same weights run with different options are evaluated separately"""
+        digests = {"a": "sha256:1", "b": "sha256:1", "c": "sha256:1"}
+        options = {"a": {"num_ctx": 4096}, "b": {"num_ctx": 8192}, "c": {"num_ctx": 4096}}
+        
+        assert model_aliases(["a", "b", "c"], digests, options) == {"c": "a"}
+    
+    def test_model_aliases_keep_unresolved_tags_apart(self):
+        """Test that tags without a digest are never merged"""
+        aliases = model_aliases(["a", "b", "c", "d"], {"a": "sha256:1", "c": "sha256:1", "d": "sha256:2"})
+        
+        assert aliases == {"c": "a"}
+    
     def test_load_models_excludes_empty_lines(self, tmp_path, monkeypatch):
         """Test that empty lines are excluded"""
         models_file = tmp_path / "suite" / "models_list.txt"
@@ -77,6 +122,54 @@ class TestLoadModels:
         assert "model2" in models
         assert "model3" in models
         assert "  model1  " not in models
+    
+    def test_load_models_ignores_inline_options(self, tmp_path, monkeypatch):
+        """Test that key=value options after the model name are not part of the name"""
+        models_file = tmp_path / "suite" / "models_list.txt"
+        models_file.parent.mkdir(parents=True)
+        models_file.write_text("gemma3:12b backend=ollama num_predict=200\nllama3.1:latest\n")
+        
+        monkeypatch.chdir(tmp_path)
+        models = load_models()
+        
+        assert models == ["gemma3:12b", "llama3.1:latest"]
+
+
+class TestLoadModelOptions:
+    """Tests for load_model_options function."""
+    
+    def test_load_model_options_parses_inline_options(self, tmp_path, monkeypatch):
+        """Test that inline options are parsed with numeric values converted"""
+        models_file = tmp_path / "suite" / "models_list.txt"
+        models_file.parent.mkdir(parents=True)
+        models_file.write_text(
+            "#solar:10.7b backend=ollama\n"
+            "gemma3:12b backend=ollama num_predict=200 keep_alive=30m temperature=0.0\n"
+            "llama3.1:latest\n"
+        )
+        
+        monkeypatch.chdir(tmp_path)
+        options = load_model_options()
+        
+        assert options == {
+            "gemma3:12b": {"backend": "ollama", "num_predict": 200, "keep_alive": "30m", "temperature": 0.0}
+        }
+    
+    def test_load_model_options_merges_sidecar(self, tmp_path, monkeypatch):
+        """Test that the sidecar file is read and inline options take precedence"""
+        suite = tmp_path / "suite"
+        suite.mkdir()
+        (suite / "models_list.txt").write_text("gemma3:12b num_ctx=4096\nllama3.1:latest\n")
+        (suite / "model_options.json").write_text(json.dumps({
+            "gemma3:12b": {"backend": "ollama", "num_ctx": 2048},
+            "llama3.1:latest": {"num_predict": 128}
+        }))
+        
+        monkeypatch.chdir(tmp_path)
+        options = load_model_options()
+        
+        assert options["gemma3:12b"] == {"backend": "ollama", "num_ctx": 4096}
+        assert options["llama3.1:latest"] == {"num_predict": 128}
 
 
 class TestLoadPrompts:
@@ -132,6 +225,34 @@ class TestLoadPrompts:
         assert "oración" in prompts["prompt_b"]
 
 
+class TestLoadPromptRegistry:
+    """Tests for load_prompt_registry function."""
+    
+    def test_load_prompt_registry_versions_templates(self, tmp_path, monkeypatch):
+        """Test that each prompt gets a content-hashed version and default judge"""
+        prompts_file = tmp_path / "suite" / "prompts.json"
+        prompts_file.parent.mkdir(parents=True)
+        prompts_file.write_text(json.dumps({
+            "prompt_a": "Define {word}",
+            "prompt_b": "Use {word} in a sentence",
+            "prompt_c": {"template": "Sinónimo de {word}", "judge": "definition"}
+        }, ensure_ascii=False))
+        
+        monkeypatch.chdir(tmp_path)
+        registry = load_prompt_registry()
+        
+        assert list(registry) == ["prompt_a", "prompt_b", "prompt_c"]
+        assert registry["prompt_a"]["version"] == prompt_version("Define {word}")
+        assert registry["prompt_a"]["judge"] == "definition"
+        assert registry["prompt_b"]["judge"] == "usage"
+        assert registry["prompt_c"]["template"] == "Sinónimo de {word}"
+    
+    def test_prompt_version_changes_with_template(self):
+        """Test that editing a template changes its version"""
+        assert prompt_version("Define {word}") == prompt_version("Define {word}")
+        assert prompt_version("Define {word}") != prompt_version("Define {word}.")
+
+
 class TestLoadVocabulary:
     """Tests for load_vocabulary function."""
     
@@ -182,3 +303,101 @@ class TestLoadVocabulary:
         
         assert vocabulary[0]["word"] == "agüista"
         assert "medicinales" in vocabulary[0]["answer"]
+
+
+class TestVocabularyIndex:
+    """Tests for the compiled vocabulary index."""
+    
+    def test_vocabulary_key_normalises_form_and_case(self):
+        """Test that NFD and capitalised spellings share a key while accents stay significant"""
+        assert vocabulary_key("Agu\u0308ista ") == vocabulary_key("agüista")
+        assert vocabulary_key("año") != vocabulary_key("ano")
+        assert word_id("Agu\u0308ista") == word_id("agüista")
+    
+    def test_compile_vocabulary_drops_duplicate_keys(self):
+        """Test that entries sharing a normalised key are kept once"""
+        index = compile_vocabulary([
+            {"word": "agüista", "answer": "first"},
+            {"word": "agu\u0308ista", "answer": "second"},
+            {"word": "ardilla", "answer": "A squirrel"},
+        ])
+        
+        assert [entry["answer"] for entry in index["entries"].values()] == ["first", "A squirrel"]
+        assert index["keys"]["ardilla"] == word_id("ardilla")
+    
+    def test_load_vocabulary_index_is_cached_by_source_hash(self, tmp_path, monkeypatch):
+        """Test that the index is written once per vocabulary content and rebuilt when it changes"""
+        vocab_file = tmp_path / "suite" / "vocabulary_short.json"
+        vocab_file.parent.mkdir(parents=True)
+        vocab_file.write_text(json.dumps([{"word": "ardilla", "answer": "A squirrel"}]))
+        monkeypatch.chdir(tmp_path)
+        
+        first = load_vocabulary_index()
+        assert load_vocabulary_index() == first
+        assert len(list((tmp_path / "output" / "index").iterdir())) == 1
+        
+        vocab_file.write_text(json.dumps([{"word": "corbata", "answer": "A necktie"}]))
+        
+        assert [entry["word"] for entry in load_vocabulary()] == ["corbata"]
+        assert len(list((tmp_path / "output" / "index").iterdir())) == 2
+    
+    def test_load_vocabulary_index_cache_is_json(self, tmp_path, monkeypatch):
+        """Test that the cached index is plain JSON and round-trips integer ids"""
+        vocab_file = tmp_path / "suite" / "vocabulary_short.json"
+        vocab_file.parent.mkdir(parents=True)
+        vocab_file.write_text(json.dumps([{"word": "ardilla", "answer": "A squirrel"}]))
+        monkeypatch.chdir(tmp_path)
+        
+        built = load_vocabulary_index()
+        cached_file, = (tmp_path / "output" / "index").iterdir()
+        
+        assert cached_file.suffix == ".json"
+        json.loads(cached_file.read_text(encoding='utf-8'))
+        assert load_vocabulary_index() == built
+        assert list(built["entries"]) == [word_id("ardilla")]
+
+
+class TestIterVocabulary:
+    """Tests for the streamed vocabulary."""
+    
+    def test_iter_vocabulary_matches_json_across_chunks(self, tmp_path):
+        """Test that entries split across small read chunks decode exactly as a whole-file load"""
+        entries = [{"word": f"año{index}", "answer": "Definición con \"comillas\", comas y [corchetes] " * (index % 5)}
+                   for index in range(50)]
+        vocab_file = tmp_path / "vocabulary.json"
+        vocab_file.write_text(json.dumps(entries, ensure_ascii=False, indent=2), encoding='utf-8')
+        
+        assert list(iter_vocabulary(str(vocab_file), chunk_size=7)) == entries
+    
+    def test_iter_vocabulary_empty_array(self, tmp_path):
+        """Test that an empty vocabulary yields nothing"""
+        vocab_file = tmp_path / "vocabulary.json"
+        vocab_file.write_text(" [ ]\n")
+        
+        assert list(iter_vocabulary(str(vocab_file))) == []
+    
+    def test_iter_vocabulary_rejects_non_array(self, tmp_path):
+        """Test that a file not holding a JSON array raises ValueError"""
+        vocab_file = tmp_path / "vocabulary.json"
+        vocab_file.write_text(json.dumps({"word": "ardilla"}))
+        
+        with pytest.raises(ValueError):
+            list(iter_vocabulary(str(vocab_file)))
+    
+    def test_iter_vocabulary_truncated_file_raises(self, tmp_path):
+        """Test that a file cut off mid-entry raises rather than ending the stream early"""
+        vocab_file = tmp_path / "vocabulary.json"
+        vocab_file.write_text('[{"word": "ardilla", "answer": "roedor"}, {"word": "corb')
+        
+        with pytest.raises(json.JSONDecodeError):
+            list(iter_vocabulary(str(vocab_file), chunk_size=8))
+    
+    def test_vocabulary_stream_is_reiterable(self, sample_vocabulary, tmp_path):
+        """Test that every pass re-reads the file and len counts its entries"""
+        vocab_file = tmp_path / "vocabulary.json"
+        vocab_file.write_text(json.dumps(sample_vocabulary, ensure_ascii=False), encoding='utf-8')
+        stream = VocabularyStream(str(vocab_file))
+        
+        assert list(stream) == sample_vocabulary
+        assert list(stream) == sample_vocabulary
+        assert len(stream) == 3
@@ -2,8 +2,11 @@
 
 import pytest
 
-from evaluator import calculate_accuracy
-from storage import save_response
+from evaluator import (
+    analyze_word_difficulty, build_correctness_matrix, calculate_accuracy, cohen_kappa, covered_words, percentile, postprocess_savings,
+    progress_counts, wilson_interval, word_features
+)
+from storage import save_prompt_result, save_response
 
 
 class TestCalculateAccuracy:
@@ -149,3 +152,227 @@ class TestCalculateAccuracy:
         # Call without prompt_type parameter
         accuracy = calculate_accuracy(model, sample_vocabulary)
         assert accuracy == 100.0
+    
+    
+    def test_calculate_accuracy_generic_prompt_id(self, tmp_path, monkeypatch):
+        """Test accuracy for a registry prompt id and template version"""
+        monkeypatch.chdir(tmp_path)
+        
+        vocabulary = [{"word": "word1", "answer": "def1"}, {"word": "word2", "answer": "def2"}]
+        save_prompt_result("model", "word1", "def1", "prompt_c", "v1", response="r", judgment="correct")
+        save_prompt_result("model", "word2", "def2", "prompt_c", "v0", response="r", judgment="correct")
+        
+        assert calculate_accuracy("model", vocabulary, "prompt_c", "v1") == 50.0
+
+class TestBuildCorrectnessMatrix:
+    """Tests for build_correctness_matrix function."""
+    
+    def test_build_correctness_matrix_sets_model_bits(self, tmp_path, monkeypatch):
+        """Test that each model maps to its own bit in the word rows"""
+        monkeypatch.chdir(tmp_path)
+        
+        vocabulary = [{"word": "word1", "answer": "def1"}]
+        save_response("model1", "word1", "def1", model_response_a="resp", judgment_a="correct")
+        save_response("model2", "word1", "def1", model_response_a="resp", judgment_a="incorrect")
+        
+        matrix = build_correctness_matrix(["model1", "model2"], vocabulary)
+        
+        assert matrix["prompt_a"]["judged"] == [0b11]
+        assert matrix["prompt_a"]["correct"] == [0b01]
+        assert matrix["prompt_b"]["judged"] == [0]
+    
+    def test_build_correctness_matrix_empty_vocabulary(self, tmp_path, monkeypatch):
+        """Test matrix for an empty vocabulary"""
+        monkeypatch.chdir(tmp_path)
+        
+        matrix = build_correctness_matrix(["model1"], [])
+        
+        assert matrix["prompt_a"] == {"judged": [], "correct": []}
+    
+    def test_build_correctness_matrix_filters_prompt_version(self, tmp_path, monkeypatch):
+        """Test that only judgments for the requested template version count"""
+        monkeypatch.chdir(tmp_path)
+        
+        vocabulary = [{"word": "word1", "answer": "def1"}]
+        save_prompt_result("model1", "word1", "def1", "prompt_c", "v1", response="r", judgment="correct")
+        
+        current = build_correctness_matrix(["model1"], vocabulary, ("prompt_c",), {"prompt_c": "v1"})
+        changed = build_correctness_matrix(["model1"], vocabulary, ("prompt_c",), {"prompt_c": "v2"})
+        
+        assert current["prompt_c"]["correct"] == [1]
+        assert changed["prompt_c"]["judged"] == [0]
+
+
+class TestProgressCounts:
+    """Tests for progress_counts function."""
+    
+    def test_progress_counts_per_model_and_prompt(self, tmp_path, monkeypatch):
+        """Test that responses, judgments and correct judgments are counted for the current version"""
+        monkeypatch.chdir(tmp_path)
+        
+        vocabulary = [{"word": "word1", "answer": "def1"}, {"word": "word2", "answer": "def2"}]
+        registry = {"prompt_c": {"template": "C {word}", "judge": "definition", "version": "v1"}}
+        save_prompt_result("model1", "word1", "def1", "prompt_c", "v1", response="r", judgment="correct")
+        save_prompt_result("model1", "word2", "def2", "prompt_c", "v1", response="r")
+        save_prompt_result("model2", "word1", "def1", "prompt_c", "v0", response="r", judgment="correct")
+        
+        counts = progress_counts(["model1", "model2"], vocabulary, registry)
+        
+        assert counts["model1"]["prompt_c"] == {"total": 2, "responses": 2, "judged": 1, "correct": 1}
+        assert counts["model2"]["prompt_c"] == {"total": 2, "responses": 0, "judged": 0, "correct": 0}
+
+
+class TestCoveredWords:
+    """Tests for covered_words function."""
+    
+    def test_covered_words_need_every_model_and_prompt(self, tmp_path, monkeypatch):
+        """Test that only words judged for all prompts by all models are covered"""
+        monkeypatch.chdir(tmp_path)
+        
+        vocabulary = [{"word": "word1", "answer": "def1"}, {"word": "word2", "answer": "def2"}, {"word": "word3", "answer": "def3"}]
+        for model in ("model1", "model2"):
+            for prompt_id in ("prompt_a", "prompt_b"):
+                save_prompt_result(model, "word1", "def1", prompt_id, "v1", response="r", judgment="correct")
+        save_prompt_result("model1", "word2", "def2", "prompt_a", "v1", response="r", judgment="correct")
+        save_prompt_result("model1", "word2", "def2", "prompt_b", "v1", response="r", judgment="correct")
+        save_prompt_result("model2", "word2", "def2", "prompt_a", "v1", response="r", judgment="correct")
+        
+        covered = covered_words(["model1", "model2"], vocabulary, ("prompt_a", "prompt_b"), {"prompt_a": "v1", "prompt_b": "v1"})
+        
+        assert covered == [vocabulary[0]]
+
+
+class TestAnalyzeWordDifficulty:
+    """Tests for analyze_word_difficulty function."""
+    
+    def test_analyze_word_difficulty_ranks_hardest_first(self, tmp_path, monkeypatch):
+        """Test that words failed by more models rank first"""
+        monkeypatch.chdir(tmp_path)
+        
+        vocabulary = [{"word": "fácil", "answer": "def"}, {"word": "difícil", "answer": "def"}]
+        for model in ["model1", "model2"]:
+            save_response(model, "fácil", "def", judgment_a="correct", judgment_b="correct")
+            save_response(model, "difícil", "def", judgment_a="incorrect", judgment_b="incorrect")
+        
+        analysis = analyze_word_difficulty(["model1", "model2"], vocabulary)
+        
+        assert analysis["words"][0]["word"] == "difícil"
+        assert analysis["words"][0]["failures"]["prompt_a"] == 2
+        assert analysis["words"][0]["failed_models"]["prompt_b"] == ["model1", "model2"]
+        assert analysis["words"][1]["failure_rate"] == 0.0
+    
+    def test_analyze_word_difficulty_finds_prompt_disagreements(self, tmp_path, monkeypatch):
+        """Test that prompt A/B disagreements are reported per model"""
+        monkeypatch.chdir(tmp_path)
+        
+        vocabulary = [{"word": "ardilla", "answer": "def"}]
+        save_response("model1", "ardilla", "def", judgment_a="correct", judgment_b="incorrect")
+        save_response("model2", "ardilla", "def", judgment_a="correct", judgment_b="correct")
+        
+        analysis = analyze_word_difficulty(["model1", "model2"], vocabulary)
+        
+        assert analysis["disagreements"] == ["ardilla"]
+        assert analysis["words"][0]["disagreeing_models"] == ["model1"]
+        assert analysis["words"][0]["discriminating"] is True
+    
+    def test_analyze_word_difficulty_clusters_by_feature(self, tmp_path, monkeypatch):
+        """Test that failures are aggregated per feature bucket"""
+        monkeypatch.chdir(tmp_path)
+        
+        vocabulary = [{"word": "agüista", "answer": "def"}, {"word": "casa", "answer": "def"}]
+        save_response("model1", "agüista", "def", judgment_a="incorrect")
+        save_response("model1", "casa", "def", judgment_a="correct")
+        
+        analysis = analyze_word_difficulty(["model1"], vocabulary)
+        
+        diacritics = analysis["feature_clusters"]["diacritics"]
+        assert diacritics["ü"] == {"judged": 1, "failed": 1, "failure_rate": 1.0}
+        assert diacritics["none"]["failure_rate"] == 0.0
+
+
+class TestWordFeatures:
+    """Tests for word_features function."""
+    
+    def test_word_features_detects_diacritics(self):
+        """Test that ñ, ü and accents are bucketed separately"""
+        assert word_features({"word": "año", "answer": "x"})["diacritics"] == "ñ"
+        assert word_features({"word": "pingüino", "answer": "x"})["diacritics"] == "ü"
+        assert word_features({"word": "árbol", "answer": "x"})["diacritics"] == "accent"
+        assert word_features({"word": "casa", "answer": "x"})["diacritics"] == "none"
+
+
+
+class TestWilsonInterval:
+    """Tests for wilson_interval function."""
+    
+    def test_wilson_interval_contains_proportion(self):
+        """Test that the interval brackets the observed proportion"""
+        low, high = wilson_interval(7, 10)
+        assert low < 0.7 < high
+    
+    def test_wilson_interval_narrows_with_more_samples(self):
+        """Test that more samples give a narrower interval"""
+        low_small, high_small = wilson_interval(5, 10)
+        low_large, high_large = wilson_interval(50, 100)
+        assert high_large - low_large < high_small - low_small
+    
+    def test_wilson_interval_no_samples(self):
+        """Test that no samples gives the full interval"""
+        assert wilson_interval(0, 0) == (0.0, 1.0)
+
+
+
+class TestCohenKappa:
+    """Tests for cohen_kappa function."""
+    
+    def test_cohen_kappa_perfect_agreement(self):
+        """Test that identical labels give a kappa of 1"""
+        labels = ["correct", "incorrect", "correct"]
+        
+        assert cohen_kappa(labels, labels) == 1.0
+    
+    def test_cohen_kappa_corrects_for_chance(self):
+        """Test that agreement expected by chance is discounted"""
+        reference = ["correct", "correct", "incorrect", "incorrect"]
+        candidate = ["correct", "incorrect", "correct", "incorrect"]
+        
+        assert cohen_kappa(reference, candidate) == pytest.approx(0.0)
+    
+    def test_cohen_kappa_partial_agreement(self):
+        """Test kappa for a standard two-label example"""
+        reference = ["correct"] * 6 + ["incorrect"] * 4
+        candidate = ["correct"] * 5 + ["incorrect"] + ["incorrect"] * 3 + ["correct"]
+        
+        assert cohen_kappa(reference, candidate) == pytest.approx((0.8 - 0.52) / 0.48)
+    
+    def test_cohen_kappa_no_items(self):
+        """Test that no items give a kappa of 0"""
+        assert cohen_kappa([], []) == 0.0
+
+
+class TestPercentile:
+    """Tests for percentile function."""
+    
+    def test_percentile_nearest_rank(self):
+        """Test that percentile returns the nearest-rank value"""
+        assert percentile([float(value) for value in range(1, 21)], 95) == 19.0
+        assert percentile([3.0], 95) == 3.0
+
+
+class TestPostprocessSavings:
+    """Tests for postprocess_savings function."""
+    
+    def test_postprocess_savings_counts_removed_tokens(self, tmp_path, monkeypatch):
+        """Test that only cleaned responses count and savings are raw minus cleaned tokens"""
+        monkeypatch.chdir(tmp_path)
+        registry = {"prompt_a": {"template": "A {word}", "judge": "definition", "version": "va"}}
+        vocabulary = [{"word": "ardilla", "answer": "def"}, {"word": "sal", "answer": "def"}]
+        save_prompt_result("model", "ardilla", "def", "prompt_a", "va", response="Un roedor.",
+                           raw_response="<think>pienso</think> Un roedor.")
+        save_prompt_result("model", "sal", "def", "prompt_a", "va", response="Un mineral.", raw_response="Un mineral.")
+        
+        savings = postprocess_savings(["model"], vocabulary, registry)
+        
+        assert savings["model"]["responses"] == 2
+        assert savings["model"]["cleaned"] == 1
+        assert savings["model"]["tokens_saved"] > 0
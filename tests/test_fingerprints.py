@@ -0,0 +1,39 @@
+"""Tests for fingerprints module."""
+
+from fingerprints import cell_inputs, changed_inputs, invalidated_phases
+
+
+class TestFingerprints:
+    """Tests for cell input fingerprints."""
+    
+    def test_cell_inputs_hash_the_rendered_prompt(self):
+        """Test that the prompt fingerprint covers the word as well as the template"""
+        first = cell_inputs("Define {word}", "ardilla", "def", "rubric", "gpt-5")
+        second = cell_inputs("Define {word}", "Ardilla", "def", "rubric", "gpt-5")
+        
+        assert first["prompt"] != second["prompt"]
+        assert {key: first[key] for key in ("reference", "rubric", "judge_model")} == \
+            {key: second[key] for key in ("reference", "rubric", "judge_model")}
+    
+    def test_cell_inputs_cover_cleaning_settings(self):
+        """Test that changing the response cleaning settings re-cleans and re-judges without re-prompting"""
+        raw = cell_inputs("Define {word}", "ardilla", "def", "rubric", "gpt-5")
+        cleaned = cell_inputs("Define {word}", "ardilla", "def", "rubric", "gpt-5", {"max_chars": 2000})
+        shorter = cell_inputs("Define {word}", "ardilla", "def", "rubric", "gpt-5", {"max_chars": 500})
+        
+        assert len({raw["postprocess"], cleaned["postprocess"], shorter["postprocess"]}) == 3
+        assert invalidated_phases(changed_inputs(raw, cleaned)) == ("clean", "judge")
+    
+    def test_changed_inputs_ignores_inputs_not_stored(self):
+        """Test that only fingerprints present in the stored cell are compared"""
+        current = cell_inputs("Define {word}", "ardilla", "new def", "rubric", "gpt-5")
+        stored = {"prompt": current["prompt"], "reference": "0" * 12}
+        
+        assert changed_inputs(stored, current) == {"reference"}
+    
+    def test_invalidated_phases(self):
+        """Test that a prompt change redoes both phases and judge inputs only the judgment"""
+        assert invalidated_phases({"prompt", "reference"}) == ("prompt", "judge")
+        assert invalidated_phases({"rubric"}) == ("judge",)
+        assert invalidated_phases({"judge_model"}) == ("judge",)
+        assert invalidated_phases(set()) == ()
@@ -0,0 +1,121 @@
+"""Tests for hedging module."""
+
+import threading
+import time
+from unittest.mock import Mock
+
+import pytest
+
+import model_client
+from budget import BudgetGovernor
+from hedging import MIN_SAMPLES, HedgePolicy
+from mock_server import MockServer
+from model_client import configure_judge_hedging, judge_response
+
+
+def _attempt(result: str, seconds: float = 0.0, cancelled: list | None = None):
+    """start() callable whose attempts sleep and return result, recording cancellations"""
+    def start():
+        def run():
+            time.sleep(seconds)
+            return result
+        return run, lambda: cancelled.append(result) if cancelled is not None else None
+    return start
+
+
+@pytest.fixture
+def warm_policy():
+    """Policy with enough fast calls observed to set a hedging threshold"""
+    policy = HedgePolicy(max_extra=1.0)
+    for _ in range(MIN_SAMPLES):
+        policy.call(_attempt("correct"))
+    yield policy
+    policy.close()
+
+
+class TestHedgePolicy:
+    """Tests for the HedgePolicy class."""
+    
+    def test_no_hedge_before_threshold_is_known(self):
+        """Test that calls are not hedged until enough latencies were observed"""
+        policy = HedgePolicy(max_extra=1.0)
+        
+        assert policy.threshold() is None
+        assert policy.call(_attempt("correct", 0.05)) == "correct"
+        assert policy.stats()["hedged"] == 0
+        policy.close()
+    
+    def test_straggler_is_hedged_and_cancelled(self, warm_policy):
+        """Test that a call past the threshold is duplicated, the faster response wins and the loser is cancelled"""
+        cancelled = []
+        attempts = iter([("slow", 2.0), ("fast", 0.0)])
+        
+        def start():
+            result, seconds = next(attempts)
+            return _attempt(result, seconds, cancelled)()
+        
+        started = time.monotonic()
+        assert warm_policy.call(start) == "fast"
+        
+        assert time.monotonic() - started < 1.0
+        assert cancelled == ["slow"]
+        stats = warm_policy.stats()
+        assert (stats["hedged"], stats["hedge_wins"]) == (1, 1)
+    
+    def test_extra_calls_are_capped(self):
+        """Test that no duplicate is sent once it would exceed max_extra of all calls"""
+        policy = HedgePolicy(max_extra=0.0)
+        for _ in range(MIN_SAMPLES):
+            policy.call(_attempt("correct"))
+        
+        assert policy.call(_attempt("correct", 0.1)) == "correct"
+        assert policy.stats()["hedged"] == 0
+        policy.close()
+    
+    def test_failed_attempt_waits_for_the_other(self, warm_policy):
+        """Test that a failing attempt does not win; the error is raised only when both fail"""
+        def failing():
+            def run():
+                time.sleep(0.2)
+                raise RuntimeError("backend down")
+            return run, lambda: None
+        
+        with pytest.raises(RuntimeError):
+            warm_policy.call(failing)
+    
+    def test_hedged_judge_calls_reach_the_backend(self):
+        """Test that judge_response goes through the configured policy"""
+        policy = HedgePolicy()
+        configure_judge_hedging(policy)
+        try:
+            with MockServer(reply="Correct") as server:
+                backend = {"model": "judge", "base_url": server.base_url, "api_key": None}
+                assert judge_response("ardilla", "roedor", "un roedor", backend) == "correct"
+        finally:
+            configure_judge_hedging(None)
+            policy.close()
+        
+        assert policy.stats()["calls"] == 1
+    
+    def test_abandoned_losing_attempt_is_charged(self):
+        """Test that a duplicate failing after it lost is charged its estimate, while an ordinary failure is released"""
+        client = Mock()
+        client.chat.completions.create.side_effect = RuntimeError("client closed")
+        backend = {"model": "gpt-5", "base_url": None, "api_key": None}
+        messages = [{"role": "user", "content": "Palabra: ardilla"}]
+        budget = BudgetGovernor()
+        abandoned = threading.Event()
+        model_client.configure_judge_budget(budget)
+        try:
+            with pytest.raises(RuntimeError):
+                model_client._judge_attempt(messages, backend, client, abandoned)
+            assert budget.usage()["calls"] == 0
+            
+            abandoned.set()
+            with pytest.raises(RuntimeError):
+                model_client._judge_attempt(messages, backend, client, abandoned)
+        finally:
+            model_client.configure_judge_budget(None)
+        
+        assert budget.usage()["calls"] == 1
+        assert budget.usage()["input_tokens"] > 0
@@ -0,0 +1,39 @@
+"""Tests for judge_tokens module."""
+
+import model_client
+from judge_tokens import legacy_judge_messages, measure_judge_tokens
+from token_estimate import estimate_message_tokens
+from model_client import JUDGE_DEFINITION_RUBRIC, judge_messages
+
+
+class TestMeasureJudgeTokens:
+    """Tests for measure_judge_tokens function."""
+    
+    def test_measure_judge_tokens_compares_layouts(self, sample_vocabulary):
+        """Test that both judges are measured for every word and the prefix is reported"""
+        measurement = measure_judge_tokens(sample_vocabulary)
+        
+        assert measurement["calls"] == 2 * len(sample_vocabulary)
+        assert measurement["after"] < measurement["before"]
+        assert measurement["prefix"] + measurement["per_item"] == measurement["after"]
+    
+    def test_measure_judge_tokens_ignores_configured_judge(self, sample_vocabulary):
+        """Test that the mock server receives the judge calls even when another judge endpoint is configured"""
+        model_client.configure_judge_backend(model="remote", base_url="http://judge.invalid/v1")
+        try:
+            measurement = measure_judge_tokens(sample_vocabulary)
+        finally:
+            model_client.configure_judge_backend()
+        
+        assert measurement["calls"] == 2 * len(sample_vocabulary)
+    
+    def test_measure_judge_tokens_empty_vocabulary(self):
+        """Test that an empty vocabulary reports no calls"""
+        assert measure_judge_tokens([])["calls"] == 0
+    
+    def test_legacy_layout_costs_more_than_current(self):
+        """Test that the indented single-message layout is estimated above the split layout"""
+        legacy = legacy_judge_messages(JUDGE_DEFINITION_RUBRIC, "ardilla", "roedor", "roedor")
+        current = judge_messages(JUDGE_DEFINITION_RUBRIC, "ardilla", "roedor", "roedor")
+        
+        assert estimate_message_tokens(legacy) > estimate_message_tokens(current)
@@ -0,0 +1,50 @@
+"""Tests for memory_benchmark module."""
+
+import json
+import os
+
+import pytest
+
+from memory_benchmark import CannedResponder, measure_memory, write_synthetic_vocabulary
+
+
+class TestMemoryBenchmark:
+    """Tests for the peak memory benchmark."""
+    
+    def test_write_synthetic_vocabulary(self, tmp_path):
+        """Test that the synthetic vocabulary is a JSON array of distinct words"""
+        path = tmp_path / "vocabulary.json"
+        write_synthetic_vocabulary(5, str(path))
+        
+        entries = json.loads(path.read_text(encoding='utf-8'))
+        assert len({entry["word"] for entry in entries}) == 5
+    
+    def test_canned_responder_answers_by_kind(self):
+        """Test that judge calls are answered with a verdict and model calls with a definition"""
+        responder = CannedResponder()
+        
+        assert responder.call("judge", "gpt-5", [], None, lambda: "unused") == "correct"
+        assert responder.call("prompt", "model", [], {}, lambda: "unused") != "correct"
+    
+    def test_measure_memory_runs_in_temporary_directory(self, tmp_path, monkeypatch):
+        """Test that a measurement evaluates every cell and leaves the working directory untouched"""
+        monkeypatch.chdir(tmp_path)
+        
+        result = measure_memory("streaming", 20)
+        
+        assert result["cells"] == 20
+        assert result["peak"] > 0
+        assert os.getcwd() == str(tmp_path)
+        assert list(tmp_path.iterdir()) == []
+    
+    def test_streaming_memory_stays_flat_as_vocabulary_grows(self):
+        """Test that the streaming peak grows by less than a fixed bound over an eightfold vocabulary"""
+        growth = measure_memory("streaming", 1600)["peak"] - measure_memory("streaming", 200)["peak"]
+        
+        # The bound leaves room for encoder garbage the cyclic collector frees on its own schedule
+        assert growth < 512 * 1024
+    
+    def test_measure_memory_rejects_unknown_mode(self):
+        """Test that an unknown mode raises ValueError"""
+        with pytest.raises(ValueError):
+            measure_memory("unbounded", 10)
@@ -0,0 +1,19 @@
+"""Tests for mock_server module."""
+
+from openai import OpenAI
+
+from mock_server import MockServer
+
+
+class TestMockServer:
+    """Tests for MockServer class."""
+    
+    def test_mock_server_answers_chat_completions(self):
+        """Test that the OpenAI client receives the reply and token usage"""
+        with MockServer(reply="incorrect") as server:
+            client = OpenAI(base_url=server.base_url, api_key="mock")
+            response = client.chat.completions.create(model="gpt-5", messages=[{"role": "user", "content": "hola"}])
+        
+        assert response.choices[0].message.content == "incorrect"
+        assert response.usage.prompt_tokens == 5
+        assert server.requests == [{"model": "gpt-5", "messages": [{"role": "user", "content": "hola"}], "prompt_tokens": 5}]
@@ -1,8 +1,15 @@
 """Tests for model_client module."""
 
+from types import SimpleNamespace
 from unittest.mock import Mock, patch
 
-from model_client import prompt_model, judge_response, judge_response_b
+import pytest
+
+import model_client
+from budget import BudgetExceeded, BudgetGovernor
+from mock_server import MockServer
+from model_client import prompt_model, judge_messages, judge_response, judge_response_b
+from response_cache import ResponseCache
 
 
 class TestPromptModel:
@@ -108,6 +115,139 @@ class TestPromptModel:
         assert result == "Definición con acentos"
         call_args = mock_client.chat.completions.create.call_args
         assert "agüista" in call_args.kwargs['messages'][0]['content']
+    
+    
+    @patch('model_client.OpenAI')
+    @patch('model_client.OllamaClient')
+    def test_prompt_model_native_backend(self, mock_ollama_class, mock_openai_class):
+        """Test that backend=ollama uses the native API with generation options"""
+        mock_client = Mock()
+        mock_ollama_class.return_value = mock_client
+        mock_client.chat.return_value = {"message": {"content": "Un roedor"}}
+        
+        result = prompt_model("ardilla", "gemma3:12b", "Define {word}", {
+            "backend": "ollama", "num_predict": 128, "num_ctx": 2048, "keep_alive": "30m"
+        })
+        
+        assert result == "Un roedor"
+        mock_openai_class.assert_not_called()
+        call_args = mock_client.chat.call_args
+        assert call_args.kwargs['model'] == "gemma3:12b"
+        assert call_args.kwargs['options'] == {"num_predict": 128, "num_ctx": 2048}
+        assert call_args.kwargs['keep_alive'] == "30m"
+        assert "Define ardilla" in call_args.kwargs['messages'][0]['content']
+    
+    @patch('model_client.OllamaClient')
+    def test_prompt_model_native_handles_none_response(self, mock_ollama_class):
+        """Test that an empty native response is converted to empty string"""
+        mock_client = Mock()
+        mock_ollama_class.return_value = mock_client
+        mock_client.chat.return_value = {"message": {"content": None}}
+        
+        result = prompt_model("word", "model", "template {word}", {"backend": "ollama"})
+        
+        assert result == ""
+
+
+
+class TestNormalizeOllamaHost:
+    """Tests for normalize_ollama_host function."""
+    
+    def test_scheme_and_port_are_added(self):
+        """Test that host-only values get http:// and Ollama's default port"""
+        assert model_client.normalize_ollama_host("gpu-box") == "http://gpu-box:11434"
+        assert model_client.normalize_ollama_host("gpu-box:8080") == "http://gpu-box:8080"
+        assert model_client.normalize_ollama_host(":11434") == "http://localhost:11434"
+    
+    def test_trailing_slash_is_stripped(self):
+        """Test that URLs keep their scheme and lose a trailing slash"""
+        assert model_client.normalize_ollama_host("http://gpu-box:11434/") == "http://gpu-box:11434"
+        assert model_client.normalize_ollama_host("https://ollama.example.com/") == "https://ollama.example.com"
+
+
+class TestPromptModelCache:
+    """Tests for the response cache around prompt_model."""
+    
+    @patch('model_client.get_model_digest', return_value="sha256:abc")
+    @patch('model_client.OpenAI')
+    def test_prompt_model_serves_deterministic_requests_from_cache(self, mock_openai_class, mock_digest, tmp_path):
+        """Test that a repeated temperature 0 request is not sent again"""
+        mock_client = Mock()
+        mock_openai_class.return_value = mock_client
+        mock_response = Mock()
+        mock_response.choices = [Mock()]
+        mock_response.choices[0].message.content = "Un roedor"
+        mock_client.chat.completions.create.return_value = mock_response
+        
+        cache = ResponseCache(str(tmp_path / "cache.sqlite"))
+        model_client.configure_response_cache(cache)
+        try:
+            first = prompt_model("ardilla", "llama3.1:latest", "Define {word}", {"temperature": 0})
+            second = prompt_model("ardilla", "llama3.1:latest", "Define {word}", {"temperature": 0})
+        finally:
+            model_client.configure_response_cache(None)
+        
+        assert first == second == "Un roedor"
+        mock_client.chat.completions.create.assert_called_once()
+        assert mock_client.chat.completions.create.call_args.kwargs['temperature'] == 0
+        assert cache.stats()["hits"] == 1
+    
+    @patch('model_client.get_model_digest', return_value="sha256:abc")
+    @patch('model_client.OpenAI')
+    def test_prompt_model_bypasses_cache_when_sampling(self, mock_openai_class, mock_digest, tmp_path):
+        """Test that non-deterministic requests are never cached"""
+        mock_client = Mock()
+        mock_openai_class.return_value = mock_client
+        mock_response = Mock()
+        mock_response.choices = [Mock()]
+        mock_response.choices[0].message.content = "respuesta"
+        mock_client.chat.completions.create.return_value = mock_response
+        
+        cache = ResponseCache(str(tmp_path / "cache.sqlite"))
+        model_client.configure_response_cache(cache)
+        try:
+            prompt_model("ardilla", "model", "Define {word}")
+            prompt_model("ardilla", "model", "Define {word}")
+        finally:
+            model_client.configure_response_cache(None)
+        
+        assert mock_client.chat.completions.create.call_count == 2
+        assert cache.stats()["entries"] == 0
+
+
+class TestGetModelDigest:
+    """Tests for get_model_digest function."""
+    
+    @patch('model_client.OllamaClient')
+    def test_get_model_digest_resolves_tag(self, mock_ollama_class):
+        """Test that a listed tag resolves to its digest and unknown tags fall back"""
+        model_client.get_model_digest.cache_clear()
+        mock_ollama_class.return_value.list.return_value = {
+            "models": [{"model": "llama3.1:latest", "digest": "sha256:abc"}]
+        }
+        
+        assert model_client.get_model_digest("llama3.1:latest") == "sha256:abc"
+        assert model_client.get_model_digest("unknown:tag") == "unknown:tag"
+        model_client.get_model_digest.cache_clear()
+
+
+class TestResolveModelDigests:
+    """Tests for resolve_model_digests function."""
+    
+    def test_resolve_model_digests_from_ollama_tags(self, monkeypatch):
+        """Test that listed tags resolve to their digests, an untagged name as :latest"""
+        digests = {"llama3.1:latest": "sha256:aaa", "llama3.1:8b": "sha256:aaa", "gemma3:12b": "sha256:bbb"}
+        with MockServer(digests=digests) as server:
+            monkeypatch.setattr(model_client, "OLLAMA_HOST", server.host)
+            resolved = model_client.resolve_model_digests(["llama3.1", "llama3.1:8b", "gemma3:12b", "qwen3:4b"])
+        
+        assert resolved == {"llama3.1": "sha256:aaa", "llama3.1:8b": "sha256:aaa", "gemma3:12b": "sha256:bbb"}
+    
+    def test_resolve_model_digests_without_ollama(self, monkeypatch):
+        """Test that an unreachable Ollama resolves nothing, so no tags are merged"""
+        monkeypatch.setattr(model_client, "OLLAMA_HOST", "http://127.0.0.1:9")
+        
+        assert model_client.resolve_model_digests(["llama3.1:8b"]) == {}
 
 
 class TestJudgeResponse:
@@ -218,8 +358,27 @@ class TestJudgeResponse:
         judge_response("ardilla", "squirrel", "response")
         
         call_args = mock_client.chat.completions.create.call_args
-        prompt_content = call_args.kwargs['messages'][0]['content']
+        prompt_content = call_args.kwargs['messages'][-1]['content']
         assert "ardilla" in prompt_content.lower()
+    
+    @patch('model_client.OpenAI')
+    def test_judge_response_rubric_is_stable_system_prefix(self, mock_openai_class):
+        """Test that the rubric is a system message identical for every word"""
+        mock_client = Mock()
+        mock_openai_class.return_value = mock_client
+        
+        mock_response = Mock()
+        mock_response.choices = [Mock()]
+        mock_response.choices[0].message.content = "correct"
+        mock_client.chat.completions.create.return_value = mock_response
+        
+        judge_response("ardilla", "roedor", "response")
+        judge_response("corbata", "prenda", "response")
+        
+        first, second = [call.kwargs['messages'] for call in mock_client.chat.completions.create.call_args_list]
+        assert first[0] == second[0] == {"role": "system", "content": model_client.JUDGE_DEFINITION_RUBRIC}
+        assert "ardilla" not in first[0]['content']
+        assert first[1]['role'] == "user"
 
 
 class TestJudgeResponseB:
@@ -315,5 +474,142 @@ class TestJudgeResponseB:
         judge_response_b("ardilla", "squirrel", "response")
         
         call_args = mock_client.chat.completions.create.call_args
-        prompt_content = call_args.kwargs['messages'][0]['content']
+        prompt_content = call_args.kwargs['messages'][-1]['content']
         assert "ardilla" in prompt_content
+        assert call_args.kwargs['messages'][0]['content'] == model_client.JUDGE_USAGE_RUBRIC
+
+
+class TestJudgeBackend:
+    """Tests for configurable judge backends."""
+    
+    def test_judge_uses_configured_endpoint(self):
+        """Test that a configured OpenAI-compatible endpoint and model receive judge calls"""
+        with MockServer(reply="incorrect") as server:
+            model_client.configure_judge_backend(model="qwen3:8b", base_url=server.base_url)
+            try:
+                result = judge_response("ardilla", "roedor", "respuesta")
+            finally:
+                model_client.configure_judge_backend()
+        
+        assert result == "incorrect"
+        assert server.requests[0]["model"] == "qwen3:8b"
+    
+    @patch('model_client.OpenAI')
+    def test_local_judge_not_charged_to_budget(self, mock_openai_class):
+        """Test that calls to a custom endpoint bypass the GPT-5 budget"""
+        mock_client = Mock()
+        mock_openai_class.return_value = mock_client
+        
+        mock_response = Mock()
+        mock_response.choices = [Mock()]
+        mock_response.choices[0].message.content = "correct"
+        mock_client.chat.completions.create.return_value = mock_response
+        
+        model_client.configure_judge_budget(BudgetGovernor(max_tokens=10))
+        try:
+            result = judge_response("ardilla", "roedor", "r", {"model": "local", "base_url": "http://localhost:11434/v1"})
+        finally:
+            model_client.configure_judge_budget(None)
+        
+        assert result == "correct"
+        mock_openai_class.assert_called_once_with(base_url="http://localhost:11434/v1", api_key="ollama")
+    
+    @patch('model_client.OpenAI')
+    def test_paid_endpoint_charged_to_budget(self, mock_openai_class):
+        """Test that a remote OpenAI-compatible endpoint is charged unless flagged free"""
+        mock_client = Mock()
+        mock_openai_class.return_value = mock_client
+        
+        mock_response = Mock()
+        mock_response.choices = [Mock()]
+        mock_response.choices[0].message.content = "correct"
+        mock_response.usage = SimpleNamespace(prompt_tokens=350, completion_tokens=40)
+        mock_client.chat.completions.create.return_value = mock_response
+        
+        budget = BudgetGovernor()
+        model_client.configure_judge_budget(budget)
+        try:
+            judge_response("ardilla", "roedor", "r", {"model": "paid", "base_url": "https://api.example.com/v1"})
+            judge_response("ardilla", "roedor", "r", {"model": "paid", "base_url": "https://api.example.com/v1", "free": True})
+        finally:
+            model_client.configure_judge_budget(None)
+        
+        assert budget.usage()["input_tokens"] == 350
+    
+    def test_judge_is_free_only_for_local_or_flagged(self):
+        """Test that only local endpoints or an explicit free flag make a backend free"""
+        assert model_client.judge_is_free({"base_url": "http://127.0.0.1:8080/v1"})
+        assert model_client.judge_is_free({"base_url": "https://api.example.com/v1", "free": True})
+        assert not model_client.judge_is_free({"base_url": "https://api.example.com/v1"})
+        assert not model_client.judge_is_free({"base_url": "http://localhost:11434/v1", "free": False})
+        assert not model_client.judge_is_free({"base_url": None})
+    
+    def test_default_judge_backend_is_gpt5(self):
+        """Test that the judge defaults to GPT-5 on the OpenAI API"""
+        backend = model_client.configure_judge_backend()
+        
+        assert backend["model"] == "gpt-5"
+        assert backend["base_url"] is None
+        assert backend["free"] is False
+
+
+class TestJudgeBudget:
+    """Tests for judge budget enforcement."""
+    
+    @patch('model_client.OpenAI')
+    def test_judge_charges_configured_budget(self, mock_openai_class):
+        """Test that a judge call records its reported usage"""
+        mock_client = Mock()
+        mock_openai_class.return_value = mock_client
+        
+        mock_response = Mock()
+        mock_response.choices = [Mock()]
+        mock_response.choices[0].message.content = "correct"
+        mock_response.usage = SimpleNamespace(prompt_tokens=350, completion_tokens=40)
+        mock_client.chat.completions.create.return_value = mock_response
+        
+        budget = BudgetGovernor()
+        model_client.configure_judge_budget(budget)
+        try:
+            judge_response("ardilla", "roedor", "response")
+        finally:
+            model_client.configure_judge_budget(None)
+        
+        assert budget.usage()["input_tokens"] == 350
+        assert budget.usage()["output_tokens"] == 40
+    
+    @patch('model_client.OpenAI')
+    def test_judge_refused_when_budget_exhausted(self, mock_openai_class):
+        """Test that no request is sent once the budget is reached"""
+        mock_client = Mock()
+        mock_openai_class.return_value = mock_client
+        
+        model_client.configure_judge_budget(BudgetGovernor(max_tokens=10))
+        try:
+            with pytest.raises(BudgetExceeded):
+                judge_response_b("ardilla", "roedor", "response")
+        finally:
+            model_client.configure_judge_budget(None)
+        
+        mock_client.chat.completions.create.assert_not_called()
+
+
+class TestJudgeMessages:
+    """Tests for judge_messages function."""
+    
+    def test_judge_messages_normalizes_item_whitespace(self):
+        """Test that the per-item user message has no indentation or repeated whitespace"""
+        messages = judge_messages("rubric", "ardilla", "Un  roedor\n pequeño", "  Es un\n\nanimal  ")
+        
+        assert messages[0] == {"role": "system", "content": "rubric"}
+        assert messages[1]['content'] == (
+            "Palabra: ardilla\n"
+            "Definición de referencia: Un roedor pequeño\n"
+            "Definición del modelo: Es un animal"
+        )
+    
+    def test_judge_rubrics_have_no_indentation(self):
+        """Test that the rubric prefixes carry no f-string indentation"""
+        for rubric in (model_client.JUDGE_DEFINITION_RUBRIC, model_client.JUDGE_USAGE_RUBRIC):
+            assert all(line == line.lstrip() for line in rubric.splitlines())
+            assert "{word}" not in rubric
@@ -0,0 +1,48 @@
+"""Tests for postprocess module."""
+
+from postprocess import CLEANING_SETTINGS, clean_response, normalize_whitespace
+
+
+class TestCleanResponse:
+    """Tests for clean_response function."""
+    
+    def test_strips_reasoning_blocks(self):
+        """Test that think/thinking blocks are removed, including an unclosed trailing one"""
+        assert clean_response("<think>\nrazonando...\n</think>\n\nUn roedor.", CLEANING_SETTINGS) == "Un roedor."
+        assert clean_response("Un roedor.<THINKING>más</THINKING>", CLEANING_SETTINGS) == "Un roedor."
+        assert clean_response("Un roedor. <think>cortado por num_predict", CLEANING_SETTINGS) == "Un roedor."
+    
+    def test_strips_markdown_and_preamble(self):
+        """Test that headers, bold markers and an announcing first line are removed"""
+        text = "¡Claro! Aquí tienes la definición:\n\n### Ardilla\n\nUn **roedor** pequeño."
+        
+        assert clean_response(text, CLEANING_SETTINGS) == "Ardilla\nUn roedor pequeño."
+    
+    def test_keeps_answer_lines_ending_in_colon_without_preamble_words(self):
+        """Test that a first line is only dropped when it announces the answer"""
+        assert clean_response("Ardilla:\nUn roedor.", CLEANING_SETTINGS) == "Ardilla:\nUn roedor."
+    
+    def test_preamble_words_must_be_whole_words(self):
+        """Test that "there is" or "measure" in a first line do not make it a preamble"""
+        for text in ("Where there is a rule:\nEvery word counts.", "A measure of length:\nOne metre."):
+            assert clean_response(text, CLEANING_SETTINGS) == text
+    
+    def test_truncates_at_word_boundary(self):
+        """Test that responses are cut to max_chars without splitting a word"""
+        assert clean_response("uno dos tres", {**CLEANING_SETTINGS, "max_chars": 9}) == "uno dos"
+    
+    def test_reasoning_only_reply_is_not_emptied(self):
+        """Test that a reply consisting only of reasoning is kept rather than stored empty"""
+        assert clean_response("<think>no sé   qué es</think>", CLEANING_SETTINGS) == "<think>no sé qué es</think>"
+    
+    def test_cleaning_is_off_unless_configured(self):
+        """Test that without configured settings model output is kept as returned"""
+        assert clean_response("## Ardilla\n\n" + "roedor " * 400) == "## Ardilla\n\n" + "roedor " * 400
+    
+    def test_disabled_settings_return_text_unchanged(self):
+        """Test that an empty settings dict leaves the text as returned"""
+        assert clean_response("<think>x</think>  Un roedor", {}) == "<think>x</think>  Un roedor"
+    
+    def test_normalize_whitespace_keeps_line_breaks(self):
+        """Test that spaces collapse but sentences on separate lines stay separate"""
+        assert normalize_whitespace("  Uso  la  ardilla.\n\n\nOtra   frase.  ") == "Uso la ardilla.\nOtra frase."
@@ -0,0 +1,76 @@
+"""Tests for prejudge module."""
+
+from prejudge import matches_word, normalize, prejudge, tokenize
+
+
+class TestTokenize:
+    """Tests for normalize and tokenize functions."""
+    
+    def test_normalize_strips_accents_and_case(self):
+        """Test that accents and case are ignored"""
+        assert normalize("Ñandú Árbol") == "nandu arbol"
+    
+    def test_tokenize_splits_words(self):
+        """Test that punctuation is dropped from tokens"""
+        assert tokenize("¡La ardilla, corre!") == ["la", "ardilla", "corre"]
+
+
+class TestMatchesWord:
+    """Tests for matches_word function."""
+    
+    def test_matches_word_plural_forms(self):
+        """Test that the word and its plurals match"""
+        assert matches_word("ardilla", "ardilla")
+        assert matches_word("ardillas", "ardilla")
+        assert matches_word("nandues", "ñandú")
+        assert matches_word("luces", "luz")
+    
+    def test_matches_word_rejects_distinct_lemmas(self):
+        """Test that words differing only in their ending do not match"""
+        assert not matches_word("caso", "casa")
+        assert not matches_word("cuenta", "cuento")
+        assert not matches_word("funcion", "funcionario")
+
+
+class TestPrejudge:
+    """Tests for prejudge function."""
+    
+    def test_prejudge_empty_response(self):
+        """Test that a response without words is incorrect"""
+        assert prejudge("definition", "ardilla", " ... ") == ("incorrect", "empty")
+    
+    def test_prejudge_refusal(self):
+        """Test that a short refusal is incorrect"""
+        assert prejudge("definition", "ardilla", "Lo siento, no conozco esa palabra.") == ("incorrect", "refusal")
+    
+    def test_prejudge_refusal_must_be_whole_response(self):
+        """Test that refusal phrases inside an answer or another sentence leave it to the judge"""
+        assert prejudge("definition", "ardilla", "No sé qué significa ardilla.") == ("incorrect", "refusal")
+        assert prejudge("definition", "ardilla", "Lo siento, no puedo definir eso pero es un roedor.") is None
+        assert prejudge("usage", "hacer", "Que no puedo hacerse solo. Trabajé toda la noche.") is None
+        assert prejudge("definition", "ardilla", "No estoy seguro, pero creo que es un roedor.") is None
+    
+    def test_prejudge_circular_definition_keeps_related_lemmas(self):
+        """Test that a definition through a related but distinct word is not circular"""
+        assert prejudge("definition", "cuento", "Una cuenta.") is None
+    
+    def test_prejudge_circular_definition(self):
+        """Test that a definition repeating only the word is incorrect"""
+        assert prejudge("definition", "ardilla", "Ardilla: es una ardilla.") == ("incorrect", "circular")
+    
+    def test_prejudge_word_in_second_sentence(self):
+        """Test that a usage answer repeating the word in the second sentence is incorrect"""
+        response = "Aquí tienes dos frases:\n1. La ardilla trepó al árbol.\n2. Las ardillas guardan nueces."
+        
+        assert prejudge("usage", "ardilla", response) == ("incorrect", "word_in_second_sentence")
+    
+    def test_prejudge_ignores_parenthetical_notes(self):
+        """Test that a note mentioning the word does not count as the second sentence"""
+        response = "1. La ardilla trepó al árbol.\n2. El roedor guardó nueces (sin usar la palabra ardilla)."
+        
+        assert prejudge("usage", "ardilla", response) is None
+    
+    def test_prejudge_leaves_real_answers_to_judge(self):
+        """Test that ordinary definitions are not settled by rules"""
+        assert prejudge("definition", "ardilla", "Mamífero roedor de cola poblada.") is None
+        assert prejudge("definition", "unicornio", "Animal fantástico que no existe en la realidad.") is None
@@ -0,0 +1,91 @@
+"""Tests for record_codec module."""
+
+import json
+from unittest.mock import patch
+
+import pytest
+
+import record_codec
+from record_codec import (
+    ZLIB_MAGIC, ZSTD_MAGIC, RecordCodec, current_codec, decode, is_compressed, save_dictionary, train_dictionary
+)
+
+
+def _record(word: str, response: str) -> bytes:
+    return json.dumps({
+        "word": word,
+        "correct_definition": f"Definición de referencia de {word}",
+        "prompts": {"prompt_a": {"3f9a0c1b2d4e": {"response": response, "judgment": "correct"}}},
+    }, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+SAMPLES = [_record(f"palabra{index}", f"Es un sustantivo que se refiere a una cosa número {index} de uso común.") for index in range(50)]
+
+
+class TestRecordCodec:
+    """Tests for dictionary record compression."""
+    
+    def test_round_trip_through_stored_dictionary(self, tmp_path, monkeypatch):
+        """Test that an encoded record decodes with the dictionary it names"""
+        monkeypatch.chdir(tmp_path)
+        save_dictionary(train_dictionary(SAMPLES, codec="zlib"))
+        codec = current_codec()
+        record = _record("ardilla", "Es un roedor pequeño de cola peluda que vive en los árboles.")
+        
+        blob = codec.encode(record)
+        
+        assert is_compressed(blob)
+        assert not is_compressed(record)
+        assert decode(blob) == record
+    
+    def test_decode_loads_each_dictionary_once(self, tmp_path, monkeypatch):
+        """Test that the decompressor set up for a dictionary serves every later record written with it"""
+        monkeypatch.chdir(tmp_path)
+        save_dictionary(train_dictionary(SAMPLES, codec="zlib"))
+        codec = current_codec()
+        
+        with patch('record_codec.load_dictionary', wraps=record_codec.load_dictionary) as mock_load:
+            decoded = [decode(codec.encode(sample)) for sample in SAMPLES[:3]]
+        
+        assert decoded == SAMPLES[:3]
+        mock_load.assert_called_once()
+    
+    def test_dictionary_shrinks_small_records(self):
+        """Test that a trained dictionary compresses a small record better than none"""
+        record = _record("corbata", "Es un sustantivo que se refiere a una prenda de uso común.")
+        
+        with_dictionary = RecordCodec(train_dictionary(SAMPLES, codec="zlib"), codec="zlib").encode(record)
+        without_dictionary = RecordCodec(b"", codec="zlib").encode(record)
+        
+        assert len(with_dictionary) < len(without_dictionary) < len(record)
+    
+    def test_current_codec_is_none_without_dictionary(self, tmp_path):
+        """Test that no codec is current before a dictionary is trained"""
+        assert current_codec(str(tmp_path / "dictionaries")) is None
+    
+    def test_zstd_round_trip(self, tmp_path, monkeypatch):
+        """Test that a zstd-encoded record is tagged as such and decodes with its stored dictionary"""
+        pytest.importorskip("zstandard")
+        monkeypatch.chdir(tmp_path)
+        dictionary = train_dictionary(SAMPLES, codec="zstd")
+        save_dictionary(dictionary)
+        record = _record("ardilla", "Es un roedor pequeño de cola peluda que vive en los árboles.")
+        
+        blob = RecordCodec(dictionary, codec="zstd").encode(record)
+        
+        assert blob.startswith(ZSTD_MAGIC)
+        assert decode(blob) == record
+    
+    def test_zlib_and_zstd_records_read_alike(self, tmp_path, monkeypatch):
+        """Test that records written with either codec, under different dictionaries, are read back in any order"""
+        pytest.importorskip("zstandard")
+        monkeypatch.chdir(tmp_path)
+        zlib_codec = RecordCodec(train_dictionary(SAMPLES, codec="zlib"), codec="zlib")
+        zstd_codec = RecordCodec(train_dictionary(SAMPLES[:40], codec="zstd"), codec="zstd")
+        for codec in (zlib_codec, zstd_codec):
+            save_dictionary(codec.dictionary, make_current=False)
+        
+        blobs = [(zlib_codec if index % 2 else zstd_codec).encode(sample) for index, sample in enumerate(SAMPLES[:6])]
+        
+        assert {blob[:4] for blob in blobs} == {ZLIB_MAGIC, ZSTD_MAGIC}
+        assert [decode(blob) for blob in blobs] == SAMPLES[:6]
@@ -3,8 +3,8 @@
 import json
 from unittest.mock import patch, Mock
 
-from reporter import generate_summary
-from storage import save_response
+from reporter import generate_summary, generate_word_analysis
+from storage import save_prompt_result, save_response
 
 
 class TestGenerateSummary:
@@ -167,3 +167,85 @@ class TestGenerateSummary:
         
         assert summary["model1"]["prompt_a_accuracy"] == 0.0
         assert summary["model1"]["prompt_b_accuracy"] == 0.0
+    
+    
+    
+    def test_generate_summary_generic_prompt_ids(self, tmp_path, monkeypatch):
+        """Test that summary keys follow the registry prompt ids"""
+        monkeypatch.chdir(tmp_path)
+        
+        vocabulary = [{"word": "word1", "answer": "def1"}]
+        save_prompt_result("model1", "word1", "def1", "prompt_c", "v2", response="r", judgment="correct")
+        
+        generate_summary(["model1"], vocabulary, prompt_ids=("prompt_c",), prompt_versions={"prompt_c": "v2"})
+        
+        with open(tmp_path / "summary.json") as f:
+            summary = json.load(f)
+        
+        assert summary["model1"] == {"prompt_c_accuracy": 100.0, "words_evaluated": 1}
+    
+    def test_generate_summary_reports_aliases(self, tmp_path, monkeypatch):
+        """Test that an alias is reported with the results of the tag it shares weights with"""
+        monkeypatch.chdir(tmp_path)
+        
+        vocabulary = [{"word": "word1", "answer": "def1"}]
+        save_prompt_result("llama3.1:8b", "word1", "def1", "prompt_c", "v2", response="r", judgment="correct")
+        
+        generate_summary(["llama3.1:8b"], vocabulary, prompt_ids=("prompt_c",), prompt_versions={"prompt_c": "v2"},
+                         aliases={"llama3.1:latest": "llama3.1:8b"})
+        
+        with open(tmp_path / "summary.json") as f:
+            summary = json.load(f)
+        
+        assert summary["llama3.1:latest"] == {"prompt_c_accuracy": 100.0, "words_evaluated": 1, "alias_of": "llama3.1:8b"}
+    
+    def test_generate_summary_partial_compares_covered_words(self, tmp_path, monkeypatch):
+        """Test that a partial summary scores every model on the words all models have judged"""
+        monkeypatch.chdir(tmp_path)
+        
+        vocabulary = [{"word": "word1", "answer": "def1"}, {"word": "word2", "answer": "def2"}]
+        save_prompt_result("model1", "word1", "def1", "prompt_c", "v2", response="r", judgment="correct")
+        save_prompt_result("model1", "word2", "def2", "prompt_c", "v2", response="r", judgment="incorrect")
+        save_prompt_result("model2", "word1", "def1", "prompt_c", "v2", response="r", judgment="correct")
+        
+        generate_summary(["model1", "model2"], vocabulary, prompt_ids=("prompt_c",), prompt_versions={"prompt_c": "v2"},
+                         partial=True)
+        
+        with open(tmp_path / "summary.json") as f:
+            summary = json.load(f)
+        
+        assert summary["model1"] == {"prompt_c_accuracy": 100.0, "words_evaluated": 1}
+        assert summary["model2"] == {"prompt_c_accuracy": 100.0, "words_evaluated": 1}
+
+
+class TestGenerateWordAnalysis:
+    """Tests for generate_word_analysis function."""
+    
+    def test_generate_word_analysis_creates_json_file(self, tmp_path, monkeypatch):
+        """Test that generate_word_analysis writes word_analysis.json"""
+        monkeypatch.chdir(tmp_path)
+        
+        vocabulary = [{"word": "ardilla", "answer": "def"}]
+        save_response("model1", "ardilla", "def",
+                     model_response_a="resp", judgment_a="incorrect",
+                     model_response_b="resp", judgment_b="correct")
+        
+        generate_word_analysis(["model1"], vocabulary)
+        
+        with open(tmp_path / "word_analysis.json", encoding='utf-8') as f:
+            analysis = json.load(f)
+        
+        assert analysis["words"][0]["word"] == "ardilla"
+        assert analysis["disagreements"] == ["ardilla"]
+    
+    @patch('reporter.Console')
+    def test_generate_word_analysis_displays_tables(self, mock_console_class, tmp_path, monkeypatch):
+        """Test that the word ranking and feature clusters are displayed"""
+        monkeypatch.chdir(tmp_path)
+        
+        mock_console = Mock()
+        mock_console_class.return_value = mock_console
+        
+        generate_word_analysis(["model1"], [{"word": "word1", "answer": "def1"}])
+        
+        assert mock_console.print.call_count == 2
@@ -0,0 +1,57 @@
+"""Tests for response_cache module."""
+
+from response_cache import ResponseCache, cache_key
+
+
+class TestCacheKey:
+    """Tests for cache_key function."""
+    
+    def test_cache_key_depends_on_digest_prompt_and_options(self):
+        """Test that any semantic input change produces a different key"""
+        base = cache_key("sha256:abc", "Define ardilla", {"temperature": 0})
+        
+        assert base == cache_key("sha256:abc", "Define ardilla", {"temperature": 0})
+        assert base != cache_key("sha256:def", "Define ardilla", {"temperature": 0})
+        assert base != cache_key("sha256:abc", "Define corbata", {"temperature": 0})
+        assert base != cache_key("sha256:abc", "Define ardilla", {"temperature": 0, "num_predict": 64})
+    
+    def test_cache_key_ignores_non_semantic_options(self):
+        """Test that keep_alive, backend and num_thread do not affect the key"""
+        assert cache_key("d", "p", {"temperature": 0}) == cache_key(
+            "d", "p", {"temperature": 0, "keep_alive": "30m", "backend": "ollama", "num_thread": 8}
+        )
+
+
+class TestResponseCache:
+    """Tests for ResponseCache class."""
+    
+    def test_response_cache_round_trip(self, tmp_path):
+        """Test that stored responses are returned and counted as hits"""
+        cache = ResponseCache(str(tmp_path / "cache.sqlite"))
+        
+        assert cache.get("key") is None
+        cache.put("key", "Un roedor")
+        assert cache.get("key") == "Un roedor"
+        
+        assert cache.stats() == {"hits": 1, "misses": 1, "hit_rate": 0.5, "entries": 1}
+    
+    def test_response_cache_persists_across_instances(self, tmp_path):
+        """Test that a second process sees entries written by the first"""
+        path = str(tmp_path / "cache.sqlite")
+        first = ResponseCache(path)
+        first.put("key", "respuesta")
+        first.close()
+        
+        assert ResponseCache(path).get("key") == "respuesta"
+    
+    def test_response_cache_evicts_least_recently_used(self, tmp_path):
+        """Test that the oldest unused entry is evicted beyond max_entries"""
+        cache = ResponseCache(str(tmp_path / "cache.sqlite"), max_entries=2)
+        cache.put("old", "1")
+        cache.put("used", "2")
+        cache.get("old")
+        cache.put("new", "3")
+        
+        assert cache.get("used") is None
+        assert cache.get("old") == "1"
+        assert cache.get("new") == "3"
@@ -0,0 +1,72 @@
+"""Tests for run_registry module."""
+
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from run_registry import append_run, build_run_record, compare_runs, find_run, load_runs, suite_hashes
+
+STARTED = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+
+def _record(run_id: str, seconds: float = 10.0, p95: float = 1.0, accuracy: float = 80.0, vocabulary: str = "v1",
+            tokens: int = 1000) -> dict:
+    suite = {"models": "m", "prompts": "p", "vocabulary": vocabulary, "code": "abc123"}
+    return build_run_record(
+        run_id, STARTED, STARTED + timedelta(seconds=seconds), suite,
+        {"model1": {"prompt_a_accuracy": accuracy, "words_evaluated": 10}}, 20,
+        {"prompt": {"p50": 0.5, "p95": p95, "p99": p95}}, {"calls": 10, "input_tokens": tokens, "output_tokens": 0, "cost_usd": 0.01}
+    )
+
+
+class TestRunRegistry:
+    """Tests for recording and comparing runs."""
+    
+    def test_build_run_record_is_compact(self):
+        """Test that a record carries throughput, latency percentiles and judge spend per call"""
+        record = _record("r1")
+        
+        assert record["pipeline"]["items_per_second"] == 2.0
+        assert record["pipeline"]["latency"]["prompt"]["p95"] == 1.0
+        assert record["judge"]["tokens_per_call"] == 100.0
+        assert record["accuracy"]["model1"]["prompt_a_accuracy"] == 80.0
+    
+    def test_append_and_find_runs(self, tmp_path):
+        """Test that runs are appended in order and found by id prefix or negative index"""
+        path = str(tmp_path / "runs.jsonl")
+        append_run(_record("20260101T000000-aaaaaa"), path)
+        append_run(_record("20260102T000000-bbbbbb"), path)
+        
+        runs = load_runs(path)
+        
+        assert [run["run_id"] for run in runs] == ["20260101T000000-aaaaaa", "20260102T000000-bbbbbb"]
+        assert find_run(runs, "-1")["run_id"] == "20260102T000000-bbbbbb"
+        assert find_run(runs, "20260101")["run_id"] == "20260101T000000-aaaaaa"
+        with pytest.raises(KeyError):
+            find_run(runs, "2026")
+    
+    def test_compare_flags_pipeline_regressions(self):
+        """Test that slower throughput, higher p95 latency and more tokens per call are flagged"""
+        comparison = compare_runs(_record("r1"), _record("r2", seconds=20.0, p95=2.0, tokens=1500))
+        
+        assert comparison["regressions"] == ["items_per_second fell 50%", "prompt_p95_seconds rose 100%", "tokens_per_call rose 50%"]
+        assert comparison["suite_changes"] == []
+    
+    def test_compare_flags_accuracy_drop_only_on_the_same_suite(self):
+        """Test that an accuracy drop is a regression unless the vocabulary changed"""
+        assert compare_runs(_record("r1"), _record("r2", accuracy=70.0))["regressions"] == ["model1 prompt_a_accuracy fell 10.0 points"]
+        
+        comparison = compare_runs(_record("r1"), _record("r2", accuracy=70.0, vocabulary="v2"))
+        
+        assert comparison["regressions"] == []
+        assert comparison["suite_changes"] == ["vocabulary"]
+        assert comparison["accuracy"]["model1"]["prompt_a_accuracy"]["delta"] == -10.0
+    
+    def test_suite_hashes_follow_prompt_versions(self):
+        """Test that a new prompt version changes the prompts hash"""
+        vocabulary = [{"word": "ardilla", "answer": "roedor"}]
+        first = suite_hashes(["m"], {"prompt_a": {"version": "v1"}}, vocabulary)
+        second = suite_hashes(["m"], {"prompt_a": {"version": "v2"}}, vocabulary)
+        
+        assert first["prompts"] != second["prompts"]
+        assert first["vocabulary"] == second["vocabulary"]
@@ -0,0 +1,199 @@
+"""Tests for run_status module."""
+
+import json
+import socket
+import threading
+import tracemalloc
+import urllib.request
+from unittest.mock import patch
+
+import pytest
+
+from evaluator import progress_counts
+from run_status import LATENCY_BUCKETS, LatencyHistogram, RunMetrics, build_status, publish_status
+from storage import save_prompt_result
+
+
+@pytest.fixture
+def registry():
+    """Single-prompt registry"""
+    return {"prompt_a": {"template": "A {word}", "judge": "definition", "version": "va"}}
+
+
+class TestRunMetrics:
+    """Tests for RunMetrics class."""
+    
+    def test_track_counts_completed_and_in_flight(self):
+        """Test that a request is in flight inside the block and completed after it"""
+        metrics = RunMetrics()
+        
+        with metrics.track("m1", "prompt"):
+            assert metrics.snapshot()["in_flight"] == 1
+        
+        snapshot = metrics.snapshot()
+        assert snapshot["in_flight"] == 0
+        assert snapshot["models"]["m1"]["prompt"]["completed"] == 1
+        assert snapshot["throughput"]["prompt"] > 0
+    
+    def test_track_counts_errors(self):
+        """Test that an exception is counted as an error and re-raised"""
+        metrics = RunMetrics()
+        
+        with pytest.raises(RuntimeError):
+            with metrics.track("m1", "judge"):
+                raise RuntimeError("rate limited")
+        
+        snapshot = metrics.snapshot()
+        assert snapshot["errors"] == 1
+        assert snapshot["models"]["m1"]["judge"] == {"completed": 0, "in_flight": 0, "errors": 1}
+    
+    def test_latency_percentiles_per_phase(self):
+        """Test that completed requests are timed per phase and failed ones are not"""
+        metrics = RunMetrics()
+        
+        for _ in range(3):
+            with metrics.track("m1", "prompt"):
+                pass
+        with pytest.raises(RuntimeError):
+            with metrics.track("m1", "judge"):
+                raise RuntimeError("rate limited")
+        
+        latencies = metrics.latency_percentiles()
+        assert set(latencies) == {"prompt"}
+        assert 0 <= latencies["prompt"]["p50"] <= latencies["prompt"]["p95"] <= latencies["prompt"]["p99"]
+    
+    def test_track_keeps_one_window_of_completions(self):
+        """Test that completions are counted per second and seconds older than the throughput window are dropped"""
+        metrics = RunMetrics(window_seconds=60)
+        
+        with patch('run_status.time.monotonic', side_effect=[0, 1.2, 5, 1.7, 100, 101.5]):
+            for _ in range(3):
+                with metrics.track("m1", "prompt"):
+                    pass
+        
+        assert list(metrics._recent["prompt"]) == [[101, 1]]
+    
+    def test_metrics_memory_does_not_grow_with_requests(self):
+        """Test that counting many more requests leaves the metrics no larger"""
+        metrics = RunMetrics()
+        
+        def traced_after(requests: int) -> int:
+            for _ in range(requests):
+                with metrics.track("m1", "judge"):
+                    pass
+            return tracemalloc.get_traced_memory()[0]
+        
+        tracemalloc.start()
+        try:
+            before = traced_after(100)
+            after = traced_after(10000)
+        finally:
+            tracemalloc.stop()
+        
+        assert after - before < 4096
+    
+    def test_latency_histogram_percentiles(self):
+        """Test that bucketed percentiles stay close to the exact ones and the buckets never grow"""
+        histogram = LatencyHistogram()
+        
+        for index in range(1, 1001):
+            histogram.add(index / 100)
+        
+        assert len(histogram.counts) == LATENCY_BUCKETS
+        assert histogram.percentile(50) == pytest.approx(5.0, rel=0.05)
+        assert histogram.percentile(99) == pytest.approx(9.9, rel=0.05)
+        assert histogram.percentile(100) == pytest.approx(10.0, rel=0.05)
+    
+    def test_record_judgment_counts_changes(self):
+        """Test that new judgments add to the counts and a replaced judgment is taken off"""
+        metrics = RunMetrics()
+        
+        metrics.record_judgment("m1", "prompt_a", "correct")
+        metrics.record_judgment("m1", "prompt_a", "incorrect")
+        metrics.record_judgment("m1", "prompt_a", "incorrect", replaced="correct")
+        metrics.record_judgment("m1", "prompt_a", "", replaced="incorrect")
+        
+        assert metrics.judgment_counts() == {"m1": {"prompt_a": {"judged": 1, "correct": 0}}}
+
+
+class TestBuildStatus:
+    """Tests for build_status function."""
+    
+    def test_build_status_includes_partial_accuracy(self, tmp_path, monkeypatch, registry):
+        """Test that accuracy is computed from the judgments stored so far"""
+        monkeypatch.chdir(tmp_path)
+        vocabulary = [{"word": "ardilla", "answer": "def"}, {"word": "corbata", "answer": "def"}]
+        save_prompt_result("m1", "ardilla", "def", "prompt_a", "va", response="r", judgment="correct")
+        
+        status = build_status(RunMetrics(), ["m1"], vocabulary, registry)
+        
+        assert status["accuracy"]["m1"]["prompt_a"] == {"judged": 1, "total": 2, "accuracy": 100.0}
+    
+    def test_build_status_adds_recorded_judgments_to_initial_counts(self, registry):
+        """Test that with initial counts the records are not read again and recorded judgments are added"""
+        initial = {"m1": {"prompt_a": {"total": 4, "responses": 2, "judged": 2, "correct": 1}}}
+        metrics = RunMetrics()
+        metrics.record_judgment("m1", "prompt_a", "correct")
+        
+        with patch('run_status.progress_counts') as mock_counts:
+            status = build_status(metrics, ["m1"], [], registry, initial)
+        
+        mock_counts.assert_not_called()
+        assert status["accuracy"]["m1"]["prompt_a"] == {"judged": 3, "total": 4, "accuracy": pytest.approx(200 / 3)}
+
+
+class TestPublishStatus:
+    """Tests for publish_status function."""
+    
+    def test_publish_status_writes_file_on_exit(self, tmp_path, monkeypatch, registry):
+        """Test that the status file reflects the run when publishing stops"""
+        monkeypatch.chdir(tmp_path)
+        path = str(tmp_path / "status.json")
+        
+        with publish_status(["m1"], [{"word": "ardilla", "answer": "def"}], registry, path, interval=60) as metrics:
+            with metrics.track("m1", "prompt"):
+                pass
+        
+        status = json.loads((tmp_path / "status.json").read_text(encoding="utf-8"))
+        assert status["models"]["m1"]["prompt"]["completed"] == 1
+        assert status["accuracy"]["m1"]["prompt_a"]["judged"] == 0
+    
+    def test_publish_status_counts_records_once(self, tmp_path, monkeypatch, registry):
+        """Test that the records are counted when publishing starts, not on every status write"""
+        monkeypatch.chdir(tmp_path)
+        save_prompt_result("m1", "ardilla", "def", "prompt_a", "va", response="r", judgment="incorrect")
+        vocabulary = [{"word": "ardilla", "answer": "def"}, {"word": "corbata", "answer": "def"}]
+        
+        with patch('run_status.progress_counts', wraps=progress_counts) as mock_counts:
+            with publish_status(["m1"], vocabulary, registry, str(tmp_path / "status.json"), interval=0.01) as metrics:
+                metrics.record_judgment("m1", "prompt_a", "correct")
+                threading.Event().wait(0.1)
+        
+        mock_counts.assert_called_once()
+        status = json.loads((tmp_path / "status.json").read_text(encoding="utf-8"))
+        assert status["accuracy"]["m1"]["prompt_a"] == {"judged": 2, "total": 2, "accuracy": 50.0}
+    
+    def test_publish_status_without_sink_reads_no_records(self, registry):
+        """Test that a run publishing no status never counts the stored records"""
+        with patch('run_status.progress_counts') as mock_counts:
+            with publish_status(["m1"], [{"word": "ardilla", "answer": "def"}], registry, path=None) as metrics:
+                with metrics.track("m1", "prompt"):
+                    pass
+        
+        mock_counts.assert_not_called()
+        assert metrics.snapshot()["models"]["m1"]["prompt"]["completed"] == 1
+    
+    def test_publish_status_serves_http(self, tmp_path, monkeypatch, registry):
+        """Test that the local endpoint serves the live status"""
+        monkeypatch.chdir(tmp_path)
+        with socket.socket() as probe:
+            probe.bind(("127.0.0.1", 0))
+            port = probe.getsockname()[1]
+        
+        with publish_status(["m1"], [], registry, path=None, port=port) as metrics:
+            with metrics.track("m1", "judge"):
+                with urllib.request.urlopen(f"http://127.0.0.1:{port}/status") as response:
+                    status = json.load(response)
+        
+        assert status["in_flight"] == 1
+        assert status["models"]["m1"]["judge"]["in_flight"] == 1
@@ -0,0 +1,512 @@
+"""Tests for runner module."""
+
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+
+import pytest
+
+from budget import BudgetExceeded
+from cancellation import CancellationToken
+from checkpoint import load_checkpoint
+from run_status import RunMetrics
+from similarity import ReferenceIndex, configure_similarity
+from runner import (
+    current_inputs, evaluate_cell, pending_cells, pending_judge_tokens, pending_prompts, run_distributed, run_matrix, run_worker,
+    schedule_cells, stale_cells
+)
+from postprocess import CLEANING_SETTINGS, configure_postprocessing
+from work_queue import WorkQueue
+from storage import LEGACY_PROMPT_VERSIONS, load_prompt_result, load_response, raw_response, save_prompt_result, save_response
+
+
+@pytest.fixture
+def registry():
+    """Three-prompt registry with a custom prompt variant"""
+    return {
+        "prompt_a": {"template": "A {word}", "judge": "definition", "version": "va"},
+        "prompt_b": {"template": "B {word}", "judge": "usage", "version": "vb"},
+        "prompt_c": {"template": "C {word}", "judge": "definition", "version": "vc"},
+    }
+
+
+class TestEvaluateCell:
+    """Tests for evaluate_cell function."""
+    
+    @patch('runner.judge_response_b', return_value="incorrect")
+    @patch('runner.judge_response', return_value="correct")
+    @patch('runner.prompt_model', return_value="respuesta")
+    def test_evaluate_cell_uses_registry_judge(self, mock_prompt, mock_judge_a, mock_judge_b, tmp_path, monkeypatch, registry):
+        """Test that the judge is chosen by the registry entry"""
+        monkeypatch.chdir(tmp_path)
+        
+        result = evaluate_cell("model", {"word": "ardilla", "answer": "def"}, "prompt_b", registry["prompt_b"])
+        
+        assert result == {"response": "respuesta", "judgment": "incorrect"}
+        mock_prompt.assert_called_once_with("ardilla", "model", "B {word}", None)
+        mock_judge_a.assert_not_called()
+    
+    @patch('runner.judge_response')
+    @patch('runner.prompt_model')
+    def test_evaluate_cell_adopts_legacy_results(self, mock_prompt, mock_judge, tmp_path, monkeypatch, registry):
+        """Test that a legacy response is judged without re-prompting and becomes versioned under the baseline version"""
+        monkeypatch.chdir(tmp_path)
+        mock_judge.return_value = "correct"
+        save_response("model", "ardilla", "def", model_response_a="resp")
+        baseline = {**registry["prompt_a"], "version": LEGACY_PROMPT_VERSIONS["prompt_a"]}
+        
+        evaluate_cell("model", {"word": "ardilla", "answer": "def"}, "prompt_a", baseline)
+        
+        mock_prompt.assert_not_called()
+        result = load_prompt_result("model", "ardilla", "prompt_a", baseline["version"])
+        assert (result["response"], result["judgment"]) == ("resp", "correct")
+    
+    @patch('runner.judge_response', return_value="correct")
+    @patch('runner.prompt_model', return_value="nueva")
+    def test_evaluate_cell_reprompts_legacy_results_of_another_template(self, mock_prompt, mock_judge, tmp_path, monkeypatch, registry):
+        """Test that a changed template does not adopt the flat legacy fields"""
+        monkeypatch.chdir(tmp_path)
+        save_response("model", "ardilla", "def", model_response_a="resp", judgment_a="incorrect")
+        
+        evaluate_cell("model", {"word": "ardilla", "answer": "def"}, "prompt_a", registry["prompt_a"])
+        
+        mock_prompt.assert_called_once()
+        assert load_prompt_result("model", "ardilla", "prompt_a", "va")["response"] == "nueva"
+    
+    
+    @patch('runner.judge_response')
+    @patch('runner.prompt_model', return_value="Ardilla: una ardilla.")
+    def test_evaluate_cell_prejudge_skips_judge(self, mock_prompt, mock_judge, tmp_path, monkeypatch, registry):
+        """Test that a circular definition is settled by a rule and recorded as such"""
+        monkeypatch.chdir(tmp_path)
+        metrics = RunMetrics()
+        
+        result = evaluate_cell("model", {"word": "ardilla", "answer": "def"}, "prompt_a", registry["prompt_a"], metrics=metrics)
+        
+        assert result["judgment"] == "incorrect"
+        mock_judge.assert_not_called()
+        assert load_prompt_result("model", "ardilla", "prompt_a", "va")["judged_by"] == "rule:circular"
+        assert metrics.snapshot()["prejudged"] == 1
+    
+    @patch('runner.judge_response', return_value="correct")
+    @patch('runner.prompt_model', return_value="respuesta")
+    def test_evaluate_cell_records_judgment_changes(self, mock_prompt, mock_judge, tmp_path, monkeypatch, registry):
+        """Test that the run metrics follow the stored judgment, including one replaced by a re-prompt"""
+        monkeypatch.chdir(tmp_path)
+        metrics = RunMetrics()
+        entry = {"word": "ardilla", "answer": "def"}
+        stale_inputs = {**current_inputs(entry, registry["prompt_a"]), "prompt": "otra"}
+        save_prompt_result("model", "ardilla", "def", "prompt_a", "va", response="vieja", judgment="incorrect", inputs=stale_inputs)
+        
+        evaluate_cell("model", entry, "prompt_a", registry["prompt_a"], metrics=metrics)
+        evaluate_cell("model", entry, "prompt_a", registry["prompt_a"], metrics=metrics)
+        
+        assert metrics.judgment_counts() == {"model": {"prompt_a": {"judged": 0, "correct": 1}}}
+    
+    
+    @patch('runner.judge_response')
+    @patch('runner.prompt_model', return_value="Un roedor pequeño que vive en árboles")
+    def test_evaluate_cell_similarity_fast_path(self, mock_prompt, mock_judge, tmp_path, monkeypatch, registry, sample_vocabulary):
+        """Test that a near-copy of the reference is labelled correct without a judge call"""
+        monkeypatch.chdir(tmp_path)
+        index = ReferenceIndex(sample_vocabulary)
+        configure_similarity(index)
+        try:
+            result = evaluate_cell("model", sample_vocabulary[0], "prompt_a", registry["prompt_a"])
+        finally:
+            configure_similarity(None)
+            index.close()
+        
+        assert result["judgment"] == "correct"
+        mock_judge.assert_not_called()
+        assert load_prompt_result("model", "ardilla", "prompt_a", "va")["judged_by"].startswith("similarity:")
+    
+    @patch('runner.judge_response', return_value="correct")
+    @patch('runner.prompt_model', return_value="<think>El usuario pide una definición.</think>\n## Ardilla\nUn **roedor** arborícola.")
+    def test_evaluate_cell_judges_cleaned_response(self, mock_prompt, mock_judge, tmp_path, monkeypatch, registry):
+        """Test that with cleaning enabled the judge and storage get the cleaned response while the raw output is kept compressed"""
+        monkeypatch.chdir(tmp_path)
+        configure_postprocessing(CLEANING_SETTINGS)
+        try:
+            result = evaluate_cell("model", {"word": "ardilla", "answer": "def"}, "prompt_a", registry["prompt_a"])
+        finally:
+            configure_postprocessing(None)
+        
+        assert result["response"] == "Ardilla\nUn roedor arborícola."
+        mock_judge.assert_called_once_with("ardilla", "def", "Ardilla\nUn roedor arborícola.")
+        stored = load_prompt_result("model", "ardilla", "prompt_a", "va")
+        assert raw_response(stored) == mock_prompt.return_value
+    
+    @patch('runner.judge_response', return_value="correct")
+    @patch('runner.prompt_model', return_value="## Ardilla\nUn roedor.")
+    def test_changed_cleaning_settings_reclean_without_model_call(self, mock_prompt, mock_judge, tmp_path, monkeypatch, registry):
+        """Test that enabling cleaning after a raw run cleans the stored output again and re-judges it, with no model request"""
+        monkeypatch.chdir(tmp_path)
+        entry = {"word": "ardilla", "answer": "def"}
+        evaluate_cell("model", entry, "prompt_a", registry["prompt_a"])
+        
+        configure_postprocessing(CLEANING_SETTINGS)
+        try:
+            assert pending_prompts("model", entry, {"prompt_a": registry["prompt_a"]}, phases=("prompt",)) == []
+            assert stale_cells(["model"], [entry], {"prompt_a": registry["prompt_a"]})["model"]["prompt_a"] == {"prompt": 0, "judge": 1}
+            result = evaluate_cell("model", entry, "prompt_a", registry["prompt_a"])
+        finally:
+            configure_postprocessing(None)
+        
+        mock_prompt.assert_called_once()
+        assert mock_judge.call_count == 2
+        assert result["response"] == "Ardilla\nUn roedor."
+        stored = load_prompt_result("model", "ardilla", "prompt_a", "va")
+        assert stored["response"] == "Ardilla\nUn roedor."
+        assert raw_response(stored) == mock_prompt.return_value
+        
+        evaluate_cell("model", entry, "prompt_a", registry["prompt_a"])
+        
+        mock_prompt.assert_called_once()
+        assert load_prompt_result("model", "ardilla", "prompt_a", "va")["response"] == mock_prompt.return_value
+    
+    @patch('runner.judge_response', return_value="incorrect")
+    @patch('runner.prompt_model', return_value="respuesta")
+    def test_evaluate_cell_rejudges_changed_reference(self, mock_prompt, mock_judge, tmp_path, monkeypatch, registry):
+        """Test that a corrected reference answer re-judges the stored response without re-prompting"""
+        monkeypatch.chdir(tmp_path)
+        evaluate_cell("model", {"word": "ardilla", "answer": "def"}, "prompt_a", registry["prompt_a"])
+        mock_judge.return_value = "correct"
+        
+        result = evaluate_cell("model", {"word": "ardilla", "answer": "fixed def"}, "prompt_a", registry["prompt_a"])
+        
+        assert result == {"response": "respuesta", "judgment": "correct"}
+        mock_prompt.assert_called_once()
+        mock_judge.assert_called_with("ardilla", "fixed def", "respuesta")
+    
+    @patch('runner.judge_response', return_value="correct")
+    @patch('runner.prompt_model', return_value="respuesta")
+    def test_evaluate_cell_keeps_judgment_of_another_judge_model(self, mock_prompt, mock_judge, tmp_path, monkeypatch, registry):
+        """Test that switching the judge model keeps the stored judgment unless replacing is asked for"""
+        monkeypatch.chdir(tmp_path)
+        entry = {"word": "ardilla", "answer": "def"}
+        evaluate_cell("model", entry, "prompt_a", registry["prompt_a"])
+        judge_model = load_prompt_result("model", "ardilla", "prompt_a", "va")["inputs"]["judge_model"]
+        
+        monkeypatch.setattr("model_client._judge_backend", {"model": "other-judge", "base_url": None, "api_key": None})
+        evaluate_cell("model", entry, "prompt_a", registry["prompt_a"])
+        
+        assert mock_prompt.call_count == 1
+        assert mock_judge.call_count == 1
+        assert load_prompt_result("model", "ardilla", "prompt_a", "va")["inputs"]["judge_model"] == judge_model
+    
+    @patch('runner.judge_response', return_value="correct")
+    @patch('runner.prompt_model', return_value="respuesta")
+    def test_evaluate_cell_rejudges_changed_judge_model(self, mock_prompt, mock_judge, tmp_path, monkeypatch, registry):
+        """Test that switching the judge model with replacing re-judges but keeps responses"""
+        monkeypatch.chdir(tmp_path)
+        entry = {"word": "ardilla", "answer": "def"}
+        evaluate_cell("model", entry, "prompt_a", registry["prompt_a"])
+        
+        monkeypatch.setattr("model_client._judge_backend",
+                            {"model": "other-judge", "base_url": None, "api_key": None, "replace": True})
+        evaluate_cell("model", entry, "prompt_a", registry["prompt_a"])
+        
+        assert mock_prompt.call_count == 1
+        assert mock_judge.call_count == 2
+        assert load_prompt_result("model", "ardilla", "prompt_a", "va")["inputs"]["judge_model"] == "other-judge"
+    
+    @patch('runner.judge_response', return_value="correct")
+    @patch('runner.prompt_model', return_value="respuesta")
+    def test_evaluate_cell_reprompts_changed_rendered_prompt(self, mock_prompt, mock_judge, tmp_path, monkeypatch, registry):
+        """Test that a word whose rendered prompt changed (same vocabulary id) is prompted and judged again"""
+        monkeypatch.chdir(tmp_path)
+        evaluate_cell("model", {"word": "ardilla", "answer": "def"}, "prompt_a", registry["prompt_a"])
+        
+        evaluate_cell("model", {"word": "Ardilla", "answer": "def"}, "prompt_a", registry["prompt_a"])
+        
+        assert mock_prompt.call_count == 2
+        assert mock_judge.call_count == 2
+
+
+class TestPendingCells:
+    """Tests for pending_cells function."""
+    
+    def test_pending_cells_only_changed_templates(self, tmp_path, monkeypatch, registry):
+        """Test that complete cells for the current version are skipped"""
+        monkeypatch.chdir(tmp_path)
+        entry = {"word": "ardilla", "answer": "def"}
+        save_prompt_result("model", "ardilla", "def", "prompt_a", "va", response="r", judgment="correct")
+        save_prompt_result("model", "ardilla", "def", "prompt_b", "vb", response="r", judgment="correct",
+                           inputs=current_inputs(entry, registry["prompt_b"]))
+        save_prompt_result("model", "ardilla", "def", "prompt_c", "old", response="r", judgment="correct")
+        
+        cells = pending_cells(["model"], [entry], registry)
+        
+        assert cells == [("model", entry, "prompt_c")]
+    
+    def test_pending_cells_rejudge_unfingerprinted_usage_judgments(self, tmp_path, monkeypatch, registry):
+        """Test that usage judgments stored before fingerprints are redone since that rubric was reworded"""
+        monkeypatch.chdir(tmp_path)
+        entry = {"word": "ardilla", "answer": "def"}
+        save_prompt_result("model", "ardilla", "def", "prompt_a", "va", response="r", judgment="correct")
+        save_prompt_result("model", "ardilla", "def", "prompt_b", "vb", response="r", judgment="correct")
+        
+        assert pending_cells(["model"], [entry], {prompt_id: registry[prompt_id] for prompt_id in ("prompt_a", "prompt_b")}) == [
+            ("model", entry, "prompt_b")
+        ]
+        assert stale_cells(["model"], [entry], registry)["model"]["prompt_b"] == {"prompt": 0, "judge": 1}
+    
+    def test_pending_cells_include_legacy_cells_with_changed_reference(self, tmp_path, monkeypatch, registry):
+        """Test that a judgment stored without fingerprints is redone when the record's reference differs"""
+        monkeypatch.chdir(tmp_path)
+        save_prompt_result("model", "ardilla", "old def", "prompt_a", "va", response="r", judgment="correct")
+        
+        assert pending_cells(["model"], [{"word": "ardilla", "answer": "old def"}], {"prompt_a": registry["prompt_a"]}) == []
+        assert len(pending_cells(["model"], [{"word": "ardilla", "answer": "new def"}], {"prompt_a": registry["prompt_a"]})) == 1
+    
+    def test_pending_prompts_reads_record_once(self, tmp_path, monkeypatch, registry):
+        """Test that one record read serves every prompt of a (model, word) pair"""
+        monkeypatch.chdir(tmp_path)
+        entry = {"word": "ardilla", "answer": "def"}
+        save_prompt_result("model", "ardilla", "def", "prompt_a", "va", response="r", judgment="correct")
+        
+        with patch('runner.load_response', wraps=load_response) as mock_load:
+            prompt_ids = pending_prompts("model", entry, registry)
+        
+        assert prompt_ids == ["prompt_b", "prompt_c"]
+        assert mock_load.call_count == 1
+
+
+class TestScheduleCells:
+    """Tests for schedule_cells function."""
+    
+    def test_schedule_cells_interleaves_word_batches(self):
+        """Test that models take turns on batches of words, each batch prompt by prompt"""
+        words = [{"word": f"w{index}", "answer": "def"} for index in range(4)]
+        cells = [(model, entry, prompt_id) for model in ("m1", "m2") for entry in words for prompt_id in ("prompt_a", "prompt_b")]
+        
+        ordered = schedule_cells(cells, "interleaved", batch_words=2)
+        
+        assert [(model, entry["word"], prompt_id) for model, entry, prompt_id in ordered[:6]] == [
+            ("m1", "w0", "prompt_a"), ("m1", "w0", "prompt_b"), ("m1", "w1", "prompt_a"), ("m1", "w1", "prompt_b"),
+            ("m2", "w0", "prompt_a"), ("m2", "w0", "prompt_b"),
+        ]
+        assert [model for model, _, _ in ordered] == ["m1"] * 4 + ["m2"] * 4 + ["m1"] * 4 + ["m2"] * 4
+    
+    def test_schedule_cells_seeded_word_order(self):
+        """Test that a seed shuffles the word order reproducibly and the model schedule is kept by default"""
+        words = [{"word": f"w{index}", "answer": "def"} for index in range(20)]
+        cells = [(model, entry, "prompt_a") for model in ("m1", "m2") for entry in words]
+        
+        first = schedule_cells(cells, "interleaved", batch_words=5, seed=7)
+        
+        assert first == schedule_cells(cells, "interleaved", batch_words=5, seed=7)
+        assert [entry["word"] for _, entry, _ in first[:5]] != [f"w{index}" for index in range(5)]
+        assert {entry["word"] for _, entry, _ in first[:5]} == {entry["word"] for _, entry, _ in first[5:10]}
+        assert schedule_cells(cells) == cells
+    
+    @patch('runner.judge_response', return_value="correct")
+    @patch('runner.prompt_model', return_value="respuesta")
+    def test_run_matrix_interleaved_keeps_models_level(self, mock_prompt, mock_judge, tmp_path, monkeypatch, registry):
+        """Test that an interleaved run reaches each word batch with every model before the next batch"""
+        monkeypatch.chdir(tmp_path)
+        vocabulary = [{"word": f"w{index}", "answer": "def"} for index in range(6)]
+        
+        run_matrix(["m1", "m2"], vocabulary, {"prompt_a": registry["prompt_a"]}, max_workers=1,
+                   schedule="interleaved", batch_words=2)
+        
+        calls = [(call.args[1], call.args[0]) for call in mock_prompt.call_args_list]
+        assert calls[:4] == [("m1", "w0"), ("m1", "w1"), ("m2", "w0"), ("m2", "w1")]
+        assert len(calls) == 12
+
+
+class TestStaleCells:
+    """Tests for stale_cells function."""
+    
+    @patch('runner.judge_response', return_value="correct")
+    @patch('runner.prompt_model', return_value="respuesta")
+    def test_stale_cells_counts_affected_cells_only(self, mock_prompt, mock_judge, tmp_path, monkeypatch, registry):
+        """Test that only words whose reference changed are counted for re-judging"""
+        monkeypatch.chdir(tmp_path)
+        vocabulary = [{"word": "ardilla", "answer": "def"}, {"word": "corbata", "answer": "prenda"}]
+        for entry in vocabulary:
+            evaluate_cell("model", entry, "prompt_a", registry["prompt_a"])
+        vocabulary[1] = {"word": "corbata", "answer": "prenda de vestir"}
+        
+        counts = stale_cells(["model"], vocabulary, {"prompt_a": registry["prompt_a"]})
+        
+        assert counts == {"model": {"prompt_a": {"prompt": 0, "judge": 1}}}
+
+
+class TestPendingJudgeTokens:
+    """Tests for pending_judge_tokens function."""
+    
+    def test_pending_judge_tokens_skips_judged_cells(self, tmp_path, monkeypatch, registry):
+        """Test that only cells without a judgment are projected"""
+        monkeypatch.chdir(tmp_path)
+        entry = {"word": "ardilla", "answer": "def"}
+        save_prompt_result("model", "ardilla", "def", "prompt_a", "va", response="r", judgment="correct")
+        save_prompt_result("model", "ardilla", "def", "prompt_b", "vb", response="r")
+        
+        calls, input_tokens = pending_judge_tokens(["model"], [entry], registry)
+        
+        assert calls == 2
+        assert input_tokens > 2 * 100
+
+
+class TestRunMatrix:
+    """Tests for run_matrix function."""
+    
+    @patch('runner.judge_response_b', return_value="correct")
+    @patch('runner.judge_response', return_value="correct")
+    @patch('runner.prompt_model', return_value="respuesta")
+    def test_run_matrix_fills_every_cell(self, mock_prompt, mock_judge_a, mock_judge_b, tmp_path, monkeypatch, registry, sample_vocabulary):
+        """Test that the full prompt × model × word matrix is evaluated once"""
+        monkeypatch.chdir(tmp_path)
+        models = ["m1", "m2"]
+        
+        processed = run_matrix(models, sample_vocabulary, registry, max_workers=4)
+        
+        assert processed == 2 * 3 * 3
+        assert mock_prompt.call_count == 18
+        assert pending_cells(models, sample_vocabulary, registry) == []
+        assert run_matrix(models, sample_vocabulary, registry) == 0
+    
+    @patch('runner.judge_response', return_value="correct")
+    def test_run_matrix_retries_failed_cell(self, mock_judge, tmp_path, monkeypatch, registry):
+        """Test that a transient failure is retried and counted in the run metrics"""
+        monkeypatch.chdir(tmp_path)
+        metrics = RunMetrics()
+        registry = {"prompt_a": registry["prompt_a"]}
+        
+        with patch('runner.prompt_model', side_effect=[RuntimeError("timeout"), "respuesta"]):
+            processed = run_matrix(["m1"], [{"word": "ardilla", "answer": "def"}], registry, metrics=metrics)
+        
+        snapshot = metrics.snapshot()
+        assert processed == 1
+        assert snapshot["retries"] == 1
+        assert snapshot["models"]["m1"]["prompt"] == {"completed": 1, "in_flight": 0, "errors": 1}
+        assert snapshot["models"]["m1"]["judge"]["completed"] == 1
+    
+    @patch('runner.prompt_model', side_effect=RuntimeError("ollama down"))
+    def test_run_matrix_raises_after_retries(self, mock_prompt, tmp_path, monkeypatch, registry):
+        """Test that a cell failing on every attempt still ends the run"""
+        monkeypatch.chdir(tmp_path)
+        
+        with pytest.raises(RuntimeError):
+            run_matrix(["m1"], [{"word": "ardilla", "answer": "def"}], {"prompt_a": registry["prompt_a"]}, retries=2)
+        
+        assert mock_prompt.call_count == 3
+    
+    @patch('runner.judge_response', side_effect=BudgetExceeded("judge budget reached"))
+    @patch('runner.prompt_model', return_value="respuesta")
+    def test_run_matrix_budget_stop_is_resumable(self, mock_prompt, mock_judge, tmp_path, monkeypatch, registry):
+        """Test that a budget stop is not retried and keeps the response for a later judge run"""
+        monkeypatch.chdir(tmp_path)
+        
+        with pytest.raises(BudgetExceeded):
+            run_matrix(["m1"], [{"word": "ardilla", "answer": "def"}], {"prompt_a": registry["prompt_a"]})
+        
+        assert mock_judge.call_count == 1
+        result = load_prompt_result("m1", "ardilla", "prompt_a", "va")
+        assert result["response"] == "respuesta" and "judgment" not in result
+    
+    @patch('runner.judge_response_b', return_value="correct")
+    @patch('runner.judge_response', return_value="correct")
+    def test_run_matrix_cancellation_keeps_finished_cells(self, mock_judge_a, mock_judge_b, tmp_path, monkeypatch, registry, sample_vocabulary):
+        """Test that cancelling stops new cells, saves finished ones and checkpoints"""
+        monkeypatch.chdir(tmp_path)
+        token = CancellationToken()
+        
+        def prompt_and_cancel(*args):
+            token.cancel()
+            return "respuesta"
+        
+        with patch('runner.prompt_model', side_effect=prompt_and_cancel):
+            processed = run_matrix(["m1"], sample_vocabulary, registry, max_workers=1, cancel_token=token)
+        
+        remaining = pending_cells(["m1"], sample_vocabulary, registry)
+        assert 1 <= processed < 9
+        assert len(remaining) == 9 - processed
+        checkpoint = load_checkpoint()
+        assert checkpoint["cancelled"] is True
+        assert checkpoint["completed_cells"] == processed
+        assert checkpoint["total_cells"] == 9
+    
+    @patch('runner.judge_response_b', return_value="correct")
+    @patch('runner.judge_response', return_value="correct")
+    @patch('runner.prompt_model', return_value="respuesta")
+    def test_run_matrix_checkpoint_counts_earlier_progress(self, mock_prompt, mock_judge_a, mock_judge_b, tmp_path, monkeypatch, registry, sample_vocabulary):
+        """Test that completed cells from earlier runs count toward progress"""
+        monkeypatch.chdir(tmp_path)
+        save_prompt_result("m1", "ardilla", sample_vocabulary[0]["answer"], "prompt_a", "va", response="r", judgment="correct")
+        
+        processed = run_matrix(["m1"], sample_vocabulary, registry)
+        
+        assert processed == 8
+        assert load_checkpoint()["completed_cells"] == 9
+
+
+class TestRunWorker:
+    """Tests for run_worker function."""
+    
+    @patch('runner.judge_response_b', return_value="correct")
+    @patch('runner.judge_response', return_value="correct")
+    @patch('runner.prompt_model', return_value="respuesta")
+    def test_run_worker_drains_queue(self, mock_prompt, mock_judge_a, mock_judge_b, tmp_path, monkeypatch, registry, sample_vocabulary):
+        """Test that a worker evaluates and completes every queued cell"""
+        monkeypatch.chdir(tmp_path)
+        queue_path = str(tmp_path / "queue.sqlite")
+        WorkQueue(queue_path).enqueue([("m1", entry["word"], "prompt_a") for entry in sample_vocabulary])
+        
+        completed = run_worker(queue_path, sample_vocabulary, registry)
+        
+        assert completed == 3
+        assert WorkQueue(queue_path).counts() == {"pending": 0, "leased": 0, "done": 3, "failed": 0}
+        assert load_prompt_result("m1", "ardilla", "prompt_a", "va")["judgment"] == "correct"
+    
+    @patch('runner.judge_response', return_value="correct")
+    def test_run_worker_retries_then_skips_failed_item(self, mock_judge, tmp_path, monkeypatch, registry, sample_vocabulary):
+        """Test that a failing cell is retried, then marked failed while the worker goes on with the rest"""
+        monkeypatch.chdir(tmp_path)
+        queue_path = str(tmp_path / "queue.sqlite")
+        WorkQueue(queue_path).enqueue([("m1", entry["word"], "prompt_a") for entry in sample_vocabulary])
+        
+        def prompt(word, *args):
+            if word == "ardilla":
+                raise RuntimeError("ollama down")
+            return "respuesta"
+        
+        with patch('runner.prompt_model', side_effect=prompt) as mock_prompt:
+            completed = run_worker(queue_path, sample_vocabulary, registry, retries=1)
+        
+        assert completed == 2
+        assert [call.args[0] for call in mock_prompt.call_args_list].count("ardilla") == 2
+        assert WorkQueue(queue_path).counts() == {"pending": 0, "leased": 0, "done": 2, "failed": 1}
+    
+    @patch('runner.prompt_model', return_value="respuesta")
+    def test_run_worker_stops_when_budget_exhausted(self, mock_prompt, tmp_path, monkeypatch, registry, sample_vocabulary):
+        """Test that an exhausted judge budget stops the worker and returns its cell to the queue"""
+        monkeypatch.chdir(tmp_path)
+        queue_path = str(tmp_path / "queue.sqlite")
+        WorkQueue(queue_path).enqueue([("m1", "ardilla", "prompt_a")])
+        
+        with patch('runner.judge_response', side_effect=BudgetExceeded("cap reached")), pytest.raises(BudgetExceeded):
+            run_worker(queue_path, sample_vocabulary, registry)
+        
+        assert WorkQueue(queue_path).counts()["pending"] == 1
+
+
+class TestRunDistributed:
+    """Tests for run_distributed function."""
+    
+    @patch('runner.ProcessPoolExecutor', ThreadPoolExecutor)
+    @patch('runner.judge_response_b', return_value="correct")
+    @patch('runner.judge_response', return_value="correct")
+    @patch('runner.prompt_model', return_value="respuesta")
+    def test_run_distributed_shares_work_between_workers(self, mock_prompt, mock_judge_a, mock_judge_b, tmp_path, monkeypatch, registry, sample_vocabulary):
+        """Test that concurrent workers evaluate every cell exactly once"""
+        monkeypatch.chdir(tmp_path)
+        monkeypatch.setattr('socket.gethostname', lambda: "host")
+        models = ["m1", "m2"]
+        
+        completed = run_distributed(models, sample_vocabulary, registry, str(tmp_path / "queue.sqlite"), processes=2, poll_interval=0.01)
+        
+        assert completed == 18
+        assert mock_prompt.call_count == 18
+        assert pending_cells(models, sample_vocabulary, registry) == []
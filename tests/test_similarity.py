@@ -0,0 +1,76 @@
+"""Tests for similarity module."""
+
+from pathlib import Path
+
+import pytest
+
+import similarity
+from similarity import DIMENSIONS, ReferenceIndex, configure_similarity, similarity_verdict, vocabulary_hash
+
+
+@pytest.fixture
+def index(tmp_path, sample_vocabulary):
+    """Reference index over the sample vocabulary in a temporary directory"""
+    reference_index = ReferenceIndex(sample_vocabulary, str(tmp_path))
+    yield reference_index
+    configure_similarity(None)
+    reference_index.close()
+
+
+class TestReferenceIndex:
+    """Tests for ReferenceIndex class."""
+    
+    def test_reference_vectors_cached_by_vocabulary(self, tmp_path, sample_vocabulary, index):
+        """Test that the vectors file is named by vocabulary hash and holds the IDF row plus sparse rows"""
+        path = tmp_path / f"{vocabulary_hash(sample_vocabulary)}.csr"
+        
+        assert index.path == str(path)
+        # Each row keeps only its non-zero entries, a few hundred bytes against 4 * DIMENSIONS dense
+        assert 4 * DIMENSIONS < path.stat().st_size < 4 * DIMENSIONS + 512 * len(sample_vocabulary)
+    
+    def test_reference_vectors_reused(self, tmp_path, sample_vocabulary, index):
+        """Test that an existing vectors file is mapped rather than rebuilt"""
+        modified = Path(index.path).stat().st_mtime_ns
+        
+        ReferenceIndex(sample_vocabulary, str(tmp_path)).close()
+        
+        assert Path(index.path).stat().st_mtime_ns == modified
+    
+    def test_similarity_ranks_paraphrase_above_unrelated(self, index):
+        """Test that the reference itself scores 1 and a paraphrase beats unrelated text"""
+        reference = "Un roedor pequeño que vive en árboles"
+        
+        assert index.similarity("ardilla", reference) == pytest.approx(1.0, abs=1e-5)
+        assert index.similarity("ardilla", "Roedor pequeño que vive en los arboles") > index.similarity("ardilla", "Una prenda de vestir")
+    
+    def test_sparse_similarity_matches_dense_cosine(self, index):
+        """Test that the score over the stored non-zero entries equals the cosine of the full weight vectors"""
+        reference = similarity._weigh(similarity._ngram_counts("Un roedor pequeño que vive en árboles"), index._idf)
+        response = similarity._weigh(similarity._ngram_counts("Roedor que vive en los arboles"), index._idf)
+        
+        expected = sum(weight * response.get(bucket, 0.0) for bucket, weight in reference.items())
+        assert index.similarity("ardilla", "Roedor que vive en los arboles") == pytest.approx(expected, abs=1e-6)
+    
+    def test_vocabulary_hash_changes_with_answers(self, sample_vocabulary):
+        """Test that editing a reference definition invalidates the cache"""
+        edited = [dict(entry) for entry in sample_vocabulary]
+        edited[0]["answer"] = "Otro significado"
+        
+        assert vocabulary_hash(edited) != vocabulary_hash(sample_vocabulary)
+
+
+class TestSimilarityVerdict:
+    """Tests for similarity_verdict function."""
+    
+    def test_similarity_verdict_disabled_by_default(self):
+        """Test that nothing is auto-labelled unless the fast path is configured"""
+        assert similarity.similarity_verdict("ardilla", "Un roedor pequeño que vive en árboles") is None
+    
+    def test_similarity_verdict_labels_extremes_only(self, index):
+        """Test that only responses outside the thresholds are labelled"""
+        configure_similarity(index, low=0.05, high=0.8)
+        
+        assert similarity_verdict("ardilla", "Un roedor pequeño que vive en árboles")[0] == "correct"
+        assert similarity_verdict("ardilla", "Xyz qwv")[0] == "incorrect"
+        assert similarity_verdict("ardilla", "Roedor de cola poblada") is None
+        assert similarity_verdict("desconocida", "Un roedor pequeño") is None
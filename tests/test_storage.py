@@ -1,8 +1,13 @@
 """Tests for storage module."""
 
 import json
+from concurrent.futures import ThreadPoolExecutor
 
-from storage import save_response, load_response, update_response_judgment
+from record_codec import RecordCodec
+from storage import (
+    LEGACY_PROMPT_VERSIONS, configure_compression, load_prompt_result, load_response, record_path, recompress_records, save_prompt_result, save_response,
+    storage_stats, update_response_judgment
+)
 
 
 class TestSaveResponse:
@@ -14,7 +19,7 @@ class TestSaveResponse:
         
         save_response("test-model", "ardilla", "A squirrel", model_response_a="Es un roedor")
         
-        file_path = tmp_path / "output" / "test-model" / "ardilla.json"
+        file_path = tmp_path / record_path("test-model", "ardilla")
         assert file_path.exists()
     
     def test_save_response_has_correct_structure(self, tmp_path, monkeypatch):
@@ -23,7 +28,7 @@ class TestSaveResponse:
         
         save_response("test-model", "ardilla", "A squirrel", model_response_a="Es un roedor")
         
-        file_path = tmp_path / "output" / "test-model" / "ardilla.json"
+        file_path = tmp_path / record_path("test-model", "ardilla")
         with open(file_path) as f:
             data = json.load(f)
         
@@ -63,7 +68,7 @@ class TestSaveResponse:
         
         save_response("model", "agüista", "Persona que toma aguas", model_response_a="Definición")
         
-        file_path = tmp_path / "output" / "model" / "agüista.json"
+        file_path = tmp_path / record_path("model", "agüista")
         with open(file_path, encoding='utf-8') as f:
             data = json.load(f)
         
@@ -212,3 +217,158 @@ class TestUpdateResponseJudgment:
         
         data = load_response("model", "word")
         assert data["judgment_a"] == "correct"
+
+
+
+class TestPromptResults:
+    """Tests for versioned prompt result storage."""
+    
+    def test_save_prompt_result_keeps_other_versions(self, tmp_path, monkeypatch):
+        """Test that a new template version does not overwrite older results"""
+        monkeypatch.chdir(tmp_path)
+        
+        save_prompt_result("model", "word", "def", "prompt_c", "v1", response="old", judgment="correct")
+        save_prompt_result("model", "word", "def", "prompt_c", "v2", response="new")
+        
+        assert load_prompt_result("model", "word", "prompt_c", "v1") == {"response": "old", "judgment": "correct"}
+        assert load_prompt_result("model", "word", "prompt_c", "v2") == {"response": "new"}
+        assert load_prompt_result("model", "word", "prompt_c") == {"response": "new"}
+    
+    def test_load_prompt_result_falls_back_to_legacy_fields(self, tmp_path, monkeypatch):
+        """Test that flat model_response_a/judgment_a fields are read for the baseline version of prompt_a only"""
+        monkeypatch.chdir(tmp_path)
+        
+        save_response("model", "word", "def", model_response_a="resp", judgment_a="incorrect")
+        
+        legacy = {"response": "resp", "judgment": "incorrect"}
+        assert load_prompt_result("model", "word", "prompt_a", LEGACY_PROMPT_VERSIONS["prompt_a"]) == legacy
+        assert load_prompt_result("model", "word", "prompt_a") == legacy
+        assert load_prompt_result("model", "word", "prompt_a", "v2") == {}
+        assert load_prompt_result("model", "word", "prompt_c") == {}
+    
+    def test_load_prompt_result_missing_version(self, tmp_path, monkeypatch):
+        """Test that an unknown version of a versioned prompt returns an empty cell"""
+        monkeypatch.chdir(tmp_path)
+        
+        save_prompt_result("model", "word", "def", "prompt_a", "v1", response="resp")
+        
+        assert load_prompt_result("model", "word", "prompt_a", "v2") == {}
+    
+    
+    def test_save_prompt_result_concurrent_writers(self, tmp_path, monkeypatch):
+        """Test that concurrent writers to one record do not drop each other's fields"""
+        monkeypatch.chdir(tmp_path)
+        prompt_ids = [f"prompt_{i}" for i in range(20)]
+        
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            list(executor.map(
+                lambda prompt_id: save_prompt_result("model", "word", "def", prompt_id, "v1", response=prompt_id),
+                prompt_ids
+            ))
+        
+        data = load_response("model", "word")
+        assert sorted(data["prompts"]) == sorted(prompt_ids)
+    
+    def test_records_share_one_lock_file_per_model(self, tmp_path, monkeypatch):
+        """Test that writing records leaves one lock file in the model directory, not one per record"""
+        monkeypatch.chdir(tmp_path)
+        for word in ("ardilla", "corbata", "bombilla"):
+            save_prompt_result("model", word, "def", "prompt_a", "v1", response="respuesta")
+        
+        hidden = [path.name for path in (tmp_path / "output" / "model").iterdir() if path.name.startswith(".")]
+        assert hidden == [".lock"]
+
+
+class TestRecordPaths:
+    """Tests for id-addressed record paths."""
+    
+    def test_record_path_is_collision_safe(self):
+        """Test that model names are percent-encoded and words are addressed by id"""
+        path = record_path("hf.co/user/model:q4", "año/2")
+        
+        assert path.parent.name == "hf.co%2Fuser%2Fmodel%3Aq4"
+        assert path.name.removesuffix(".json").isdigit()
+        assert record_path("model", "año") != record_path("model", "ano")
+    
+    def test_normalisation_variants_share_a_record(self, tmp_path, monkeypatch):
+        """Test that NFD and capitalised spellings of a word address the same record"""
+        monkeypatch.chdir(tmp_path)
+        
+        save_prompt_result("gemma3:12b", "agüista", "def", "prompt_a", "v1", response="resp")
+        
+        assert load_prompt_result("gemma3:12b", "agüista", "prompt_a", "v1") == {"response": "resp"}
+        assert load_prompt_result("gemma3:12b", "Agüista", "prompt_a", "v1") == {"response": "resp"}
+    
+    def test_legacy_word_files_are_read_and_migrated(self, tmp_path, monkeypatch):
+        """Test that output/{model}/{word}.json records of earlier runs are read and carried over on write"""
+        monkeypatch.chdir(tmp_path)
+        legacy = tmp_path / "output" / "model" / "word.json"
+        legacy.parent.mkdir(parents=True)
+        legacy.write_text(json.dumps({"word": "word", "correct_definition": "def", "model_response_a": "resp"}))
+        
+        assert load_prompt_result("model", "word", "prompt_a") == {"response": "resp"}
+        assert not legacy.exists()
+        assert (tmp_path / record_path("model", "word")).exists()
+        
+        save_prompt_result("model", "word", "def", "prompt_c", "v1", response="new")
+        
+        data = json.loads((tmp_path / record_path("model", "word")).read_text())
+        assert data["model_response_a"] == "resp"
+        assert data["prompts"]["prompt_c"]["v1"] == {"response": "new"}
+
+
+class TestCompressedRecords:
+    """Tests for dictionary-compressed record storage."""
+    
+    def test_compressed_records_read_transparently(self, tmp_path, monkeypatch):
+        """Test that compressed and plain records load alike and stats report the savings"""
+        monkeypatch.chdir(tmp_path)
+        save_prompt_result("model", "ardilla", "Un roedor", "prompt_a", "v1", response="Es un roedor pequeño.")
+        
+        configure_compression(RecordCodec(b"", codec="zlib"))
+        try:
+            save_prompt_result("model", "corbata", "Una prenda", "prompt_a", "v1", response="Una prenda de vestir.")
+        finally:
+            configure_compression(None)
+        
+        assert (tmp_path / record_path("model", "corbata")).read_bytes().startswith(b"LXz1")
+        assert load_prompt_result("model", "corbata", "prompt_a", "v1") == {"response": "Una prenda de vestir."}
+        assert load_prompt_result("model", "ardilla", "prompt_a", "v1") == {"response": "Es un roedor pequeño."}
+        stats = storage_stats(["model"])["model"]
+        assert stats["records"] == 2
+        assert stats["bytes"] < stats["json_bytes"]
+    
+    def test_recompress_records_rewrites_every_file(self, tmp_path, monkeypatch):
+        """Test that recompress_records converts existing records to the configured format"""
+        monkeypatch.chdir(tmp_path)
+        save_response("gemma3:12b", "ardilla", "Un roedor", model_response_a="Es un roedor")
+        
+        configure_compression(RecordCodec(b"", codec="zlib"))
+        try:
+            assert recompress_records(["gemma3:12b"]) == 1
+        finally:
+            configure_compression(None)
+        
+        assert (tmp_path / record_path("gemma3:12b", "ardilla")).read_bytes().startswith(b"LXz1")
+        assert load_response("gemma3:12b", "ardilla")["model_response_a"] == "Es un roedor"
+    
+    def test_record_files_skips_other_output_and_merges_legacy_dir(self, tmp_path, monkeypatch):
+        """Test that only model record dirs are listed, with a legacy dir and its encoded dir under one model"""
+        monkeypatch.chdir(tmp_path)
+        legacy = tmp_path / "output" / "gemma3:12b"
+        legacy.mkdir(parents=True)
+        (legacy / "corbata.json").write_text(json.dumps({"word": "corbata", "model_response_a": "Una prenda"}))
+        save_response("gemma3:12b", "ardilla", "Un roedor", model_response_a="Es un roedor")
+        index = tmp_path / "output" / "index"
+        index.mkdir()
+        (index / "vocabulary-abc.json").write_text("[]")
+        
+        configure_compression(RecordCodec(b"", codec="zlib"))
+        try:
+            assert recompress_records(["gemma3:12b"]) == 2
+        finally:
+            configure_compression(None)
+        
+        assert set(storage_stats(["gemma3:12b"])) == {"gemma3:12b"}
+        assert (index / "vocabulary-abc.json").read_text() == "[]"
+        assert load_response("gemma3:12b", "corbata")["model_response_a"] == "Una prenda"
@@ -0,0 +1,196 @@
+"""Tests for streaming module."""
+
+import threading
+from unittest.mock import patch
+
+import pytest
+
+from cancellation import CancellationToken
+from runner import pending_prompts
+from storage import load_prompt_result, save_prompt_result
+from streaming import CellTask, StageMemory, run_streaming
+
+
+@pytest.fixture
+def registry():
+    """Two-prompt registry"""
+    return {
+        "prompt_a": {"template": "A {word}", "judge": "definition", "version": "va"},
+        "prompt_b": {"template": "B {word}", "judge": "usage", "version": "vb"},
+    }
+
+
+def _vocabulary(size: int) -> list[dict]:
+    return [{"word": f"palabra{index}", "answer": f"definición {index}"} for index in range(size)]
+
+
+class TestCellTask:
+    """Tests for CellTask."""
+    
+    def test_cell_task_has_no_instance_dict(self):
+        """Test that in-flight cells use slots and rebuild their vocabulary entry"""
+        task = CellTask("model", "ardilla", "roedor", "prompt_a")
+        
+        assert not hasattr(task, "__dict__")
+        assert task.entry() == {"word": "ardilla", "answer": "roedor"}
+
+
+class TestRunStreaming:
+    """Tests for run_streaming function."""
+    
+    @patch('runner.judge_response_b', return_value="incorrect")
+    @patch('runner.judge_response', return_value="correct")
+    @patch('runner.prompt_model', return_value="respuesta")
+    def test_run_streaming_fills_every_cell(self, mock_prompt, mock_judge_a, mock_judge_b, tmp_path, monkeypatch, registry):
+        """Test that every model × word × prompt cell is prompted and judged"""
+        monkeypatch.chdir(tmp_path)
+        vocabulary = _vocabulary(10)
+        
+        processed = run_streaming(["m1", "m2"], vocabulary, registry, max_workers=3, queue_size=2)
+        
+        assert processed == 40
+        assert mock_prompt.call_count == 40
+        assert load_prompt_result("m2", "palabra9", "prompt_b", "vb")["judgment"] == "incorrect"
+        assert all(not pending_prompts(model, entry, registry) for model in ("m1", "m2") for entry in vocabulary)
+    
+    @patch('runner.judge_response', return_value="correct")
+    @patch('runner.prompt_model', return_value="respuesta")
+    def test_run_streaming_skips_finished_cells(self, mock_prompt, mock_judge, tmp_path, monkeypatch, registry):
+        """Test that stored cells are not redone and a judge-only cell is not re-prompted"""
+        monkeypatch.chdir(tmp_path)
+        registry = {"prompt_a": registry["prompt_a"]}
+        vocabulary = _vocabulary(3)
+        run_streaming(["model"], vocabulary[:1], registry)
+        save_prompt_result("model", "palabra1", "definición 1", "prompt_a", "va", response="guardada")
+        mock_prompt.reset_mock()
+        
+        assert run_streaming(["model"], vocabulary, registry) == 2
+        
+        mock_prompt.assert_called_once()
+        assert load_prompt_result("model", "palabra1", "prompt_a", "va")["judgment"] == "correct"
+    
+    @patch('runner.judge_response')
+    @patch('runner.prompt_model', return_value="respuesta")
+    def test_run_streaming_single_phase(self, mock_prompt, mock_judge, tmp_path, monkeypatch, registry):
+        """Test that a prompt-only run has no judge stage"""
+        monkeypatch.chdir(tmp_path)
+        
+        assert run_streaming(["model"], _vocabulary(4), registry, phases=("prompt",)) == 8
+        
+        mock_judge.assert_not_called()
+    
+    @patch('runner.judge_response', return_value="correct")
+    @patch('runner.prompt_model', return_value="respuesta")
+    def test_run_streaming_interleaved_order(self, mock_prompt, mock_judge, tmp_path, monkeypatch, registry):
+        """Test that the interleaved schedule gives every model a batch of words before the next batch"""
+        monkeypatch.chdir(tmp_path)
+        registry = {"prompt_a": registry["prompt_a"]}
+        
+        run_streaming(["m1", "m2"], _vocabulary(4), registry, max_workers=1, schedule="interleaved", batch_words=2)
+        
+        calls = [(call.args[1], call.args[0]) for call in mock_prompt.call_args_list]
+        assert calls == [
+            ("m1", "palabra0"), ("m1", "palabra1"), ("m2", "palabra0"), ("m2", "palabra1"),
+            ("m1", "palabra2"), ("m1", "palabra3"), ("m2", "palabra2"), ("m2", "palabra3"),
+        ]
+    
+    @patch('runner.judge_response', return_value="correct")
+    def test_run_streaming_bounds_scan_ahead(self, mock_judge, tmp_path, monkeypatch, registry):
+        """Test that a stalled prompt stage stops the scan once the queue between them is full"""
+        monkeypatch.chdir(tmp_path)
+        registry = {"prompt_a": registry["prompt_a"]}
+        release = threading.Event()
+        scanned = []
+        
+        def blocked_prompt(*args):
+            release.wait(5)
+            return "respuesta"
+        
+        def counted(model, entry, *args):
+            scanned.append(entry["word"])
+            return pending_prompts(model, entry, *args)
+        
+        with patch('runner.prompt_model', side_effect=blocked_prompt), patch('streaming.pending_prompts', side_effect=counted):
+            runner_thread = threading.Thread(target=run_streaming, args=(["model"], _vocabulary(100), registry),
+                                             kwargs={"max_workers": 1, "queue_size": 2})
+            runner_thread.start()
+            threading.Event().wait(0.3)
+            # One cell in the worker, two queued, one waiting to be queued
+            assert len(scanned) <= 4
+            release.set()
+            runner_thread.join(10)
+        
+        assert len(scanned) == 100
+    
+    @patch('runner.prompt_model', side_effect=RuntimeError("model down"))
+    def test_run_streaming_raises_first_error(self, mock_prompt, tmp_path, monkeypatch, registry):
+        """Test that a failing cell stops the pipeline and its error is raised"""
+        monkeypatch.chdir(tmp_path)
+        
+        with pytest.raises(RuntimeError, match="model down"):
+            run_streaming(["model"], _vocabulary(20), registry, max_workers=2, retries=0)
+        
+        assert mock_prompt.call_count < 40
+    
+    @patch('runner.prompt_model', return_value="respuesta")
+    def test_run_streaming_cancelled_starts_nothing(self, mock_prompt, tmp_path, monkeypatch, registry):
+        """Test that a cancelled token drains the stream without evaluating cells"""
+        monkeypatch.chdir(tmp_path)
+        token = CancellationToken()
+        token.cancel()
+        
+        assert run_streaming(["model"], _vocabulary(5), registry, cancel_token=token) == 0
+        mock_prompt.assert_not_called()
+    
+    def test_run_streaming_rejects_unknown_schedule(self, registry):
+        """Test that an unknown schedule raises ValueError"""
+        with pytest.raises(ValueError):
+            run_streaming(["model"], [], registry, schedule="random")
+
+
+class TestStageMemory:
+    """Tests for StageMemory."""
+    
+    def test_stage_memory_attributes_allocations_to_stage(self):
+        """Test that memory held inside a stage function counts toward that stage's peak"""
+        def hold(memory: StageMemory):
+            data = bytearray(1 << 20)
+            memory.sample()
+            return len(data)
+        
+        with StageMemory(interval=60, stages={"hold": hold}) as memory:
+            hold(memory)
+        
+        report = memory.report()
+        assert report["hold"] >= 1 << 20
+        assert report["other"] < 1 << 20
+        assert report["total"] >= report["hold"]
+    
+    def test_stage_memory_attributes_nested_stage_to_innermost(self):
+        """Test that memory held in a stage called from another stage counts toward the inner one"""
+        def inner(memory: StageMemory):
+            data = bytearray(1 << 20)
+            memory.sample()
+            return len(data)
+        
+        def outer(memory: StageMemory):
+            return inner(memory)
+        
+        with StageMemory(interval=60, stages={"outer": outer, "inner": inner}) as memory:
+            outer(memory)
+        
+        report = memory.report()
+        assert report["inner"] >= 1 << 20
+        assert report["outer"] < 1 << 20
+    
+    @patch('runner.judge_response', return_value="correct")
+    @patch('runner.prompt_model', return_value="respuesta")
+    def test_stage_memory_reports_pipeline_stages(self, mock_prompt, mock_judge, tmp_path, monkeypatch, registry):
+        """Test that a traced run reports every stage and an overall peak"""
+        monkeypatch.chdir(tmp_path)
+        
+        with StageMemory(interval=0.01) as memory:
+            run_streaming(["model"], _vocabulary(5), {"prompt_a": registry["prompt_a"]})
+        
+        assert set(memory.report()) == {"scan", "prompt", "judge", "other", "total"}
+        assert memory.report()["total"] > 0
@@ -0,0 +1,21 @@
+"""Tests for token_estimate module."""
+
+from token_estimate import estimate_message_tokens, estimate_tokens
+
+
+class TestEstimateTokens:
+    """Tests for estimate_tokens function."""
+    
+    def test_estimate_tokens_counts_words_and_punctuation(self):
+        """Test that short words, long words and punctuation are counted"""
+        assert estimate_tokens("la ardilla.") == 1 + 2 + 1
+    
+    def test_estimate_tokens_counts_indentation(self):
+        """Test that newlines and indentation cost tokens but single spaces do not"""
+        assert estimate_tokens("\n    la casa") == estimate_tokens("la casa") + 1
+    
+    def test_estimate_message_tokens_adds_overhead(self):
+        """Test that each message adds a fixed overhead"""
+        messages = [{"role": "system", "content": "hola"}, {"role": "user", "content": "hola"}]
+        
+        assert estimate_message_tokens(messages) == 2 * (1 + 4)
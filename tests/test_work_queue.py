@@ -0,0 +1,90 @@
+"""Tests for work_queue module."""
+
+import time
+
+from work_queue import WorkQueue
+
+
+class TestWorkQueue:
+    """Tests for WorkQueue class."""
+    
+    def test_claim_hands_out_each_item_once(self, tmp_path):
+        """Test that two workers never claim the same item"""
+        queue = WorkQueue(str(tmp_path / "queue.sqlite"))
+        queue.enqueue([("m1", "ardilla", "prompt_a"), ("m1", "corbata", "prompt_a")])
+        
+        first = queue.claim("worker-1")
+        second = queue.claim("worker-2")
+        
+        assert first[1:] == ("m1", "ardilla", "prompt_a")
+        assert second[1:] == ("m1", "corbata", "prompt_a")
+        assert queue.claim("worker-3") is None
+    
+    def test_enqueue_ignores_duplicates(self, tmp_path):
+        """Test that queueing the same cell twice keeps a single item"""
+        queue = WorkQueue(str(tmp_path / "queue.sqlite"))
+        
+        assert queue.enqueue([("m1", "ardilla", "prompt_a")]) == 1
+        assert queue.enqueue([("m1", "ardilla", "prompt_a")]) == 0
+        assert queue.counts() == {"pending": 1, "leased": 0, "done": 0, "failed": 0}
+    
+    def test_fail_retries_then_marks_failed(self, tmp_path):
+        """Test that a failing item is handed out again until max_attempts, then failed until re-queued"""
+        queue = WorkQueue(str(tmp_path / "queue.sqlite"))
+        queue.enqueue([("m1", "ardilla", "prompt_a")])
+        
+        assert queue.fail(queue.claim("worker")[0], "worker", max_attempts=2) is False
+        assert queue.fail(queue.claim("worker")[0], "worker", max_attempts=2) is True
+        assert queue.claim("worker") is None
+        assert queue.counts()["failed"] == 1
+        
+        queue.enqueue([("m1", "ardilla", "prompt_a")])
+        assert queue.claim("worker") is not None
+    
+    def test_queue_avoids_wal_journal(self, tmp_path):
+        """Test that the queue uses the rollback journal, which network filesystems support"""
+        queue = WorkQueue(str(tmp_path / "queue.sqlite"))
+        
+        assert queue._connection.execute("PRAGMA journal_mode").fetchone()[0] == "delete"
+    
+    def test_expired_lease_is_reclaimed(self, tmp_path):
+        """Test that an item leased by a dead worker is handed out again"""
+        queue = WorkQueue(str(tmp_path / "queue.sqlite"), lease_seconds=0.01)
+        queue.enqueue([("m1", "ardilla", "prompt_a")])
+        
+        item_id = queue.claim("crashed")[0]
+        time.sleep(0.05)
+        
+        assert queue.claim("rescuer")[0] == item_id
+        assert queue.complete(item_id, "crashed") is False
+        assert queue.complete(item_id, "rescuer") is True
+        assert queue.counts()["done"] == 1
+    
+    def test_release_returns_item_to_queue(self, tmp_path):
+        """Test that a released item can be claimed again"""
+        queue = WorkQueue(str(tmp_path / "queue.sqlite"))
+        queue.enqueue([("m1", "ardilla", "prompt_a")])
+        
+        item_id = queue.claim("worker")[0]
+        queue.release(item_id, "worker")
+        
+        assert queue.claim("worker")[0] == item_id
+    
+    def test_enqueue_reopens_done_items(self, tmp_path):
+        """Test that a finished cell queued again (e.g. after a template change) is pending"""
+        queue = WorkQueue(str(tmp_path / "queue.sqlite"))
+        queue.enqueue([("m1", "ardilla", "prompt_a")])
+        item_id = queue.claim("worker")[0]
+        queue.complete(item_id, "worker")
+        
+        queue.enqueue([("m1", "ardilla", "prompt_a")])
+        
+        assert queue.counts() == {"pending": 1, "leased": 0, "done": 0, "failed": 0}
+    
+    def test_queue_shared_between_connections(self, tmp_path):
+        """Test that separate connections see each other's claims"""
+        path = str(tmp_path / "queue.sqlite")
+        WorkQueue(path).enqueue([("m1", "ardilla", "prompt_a")])
+        
+        assert WorkQueue(path).claim("worker-1") is not None
+        assert WorkQueue(path).claim("worker-2") is None
@@ -0,0 +1,25 @@
+"""Tokenizer-free token estimates for chat requests."""
+
+import re
+
+_TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]")
+_WHITESPACE_PATTERN = re.compile(r"\s+")
+
+# Chat formats add a few tokens per message for role and separators
+MESSAGE_OVERHEAD_TOKENS = 4
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimate BPE tokens for text without a tokenizer dependency
+    
+    Counts one token per punctuation mark, one per four characters of each
+    word and one per whitespace run other than a single space (newlines and
+    indentation).
+    """
+    pieces = sum(max(1, -(-len(piece) // 4)) for piece in _TOKEN_PATTERN.findall(text))
+    return pieces + sum(run != " " for run in _WHITESPACE_PATTERN.findall(text))
+
+
+def estimate_message_tokens(messages: list[dict]) -> int:
+    """Estimate input tokens for a list of chat messages"""
+    return sum(estimate_tokens(message["content"]) + MESSAGE_OVERHEAD_TOKENS for message in messages)
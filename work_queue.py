@@ -0,0 +1,100 @@
+"""Shared SQLite work queue with lease-based claiming for multi-process evaluation."""
+
+import sqlite3
+import time
+
+
+class WorkQueue:
+    """Queue of (model, word, prompt_id) cells that workers claim with time-limited leases
+
+    Any number of processes (or machines sharing the file) may open the same
+    queue. A claimed item whose lease expires before it is completed is handed
+    out again, so a crashed worker never strands work. An item that fails is
+    put back until it has been attempted max_attempts times, then marked
+    failed. The queue uses SQLite's rollback journal rather than WAL, whose
+    shared-memory index does not work on network filesystems (NFS, SMB).
+    """
+    
+    def __init__(self, path: str, lease_seconds: float = 600):
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self._connection = sqlite3.connect(path, timeout=60, isolation_level=None)
+        self._connection.execute("PRAGMA journal_mode=DELETE")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS items ("
+            "id INTEGER PRIMARY KEY, model TEXT NOT NULL, word TEXT NOT NULL, prompt_id TEXT NOT NULL, "
+            "state TEXT NOT NULL DEFAULT 'pending', owner TEXT, lease_expires REAL, attempts INTEGER NOT NULL DEFAULT 0, "
+            "UNIQUE (model, word, prompt_id))"
+        )
+    
+    def enqueue(self, items: list[tuple[str, str, str]]) -> int:
+        """Add (model, word, prompt_id) items, re-opening finished or failed ones; returns how many changed
+
+        Items already pending or leased by another worker are left alone.
+        """
+        self._connection.execute("BEGIN IMMEDIATE")
+        before = self._connection.total_changes
+        self._connection.executemany(
+            "INSERT INTO items (model, word, prompt_id) VALUES (?, ?, ?) "
+            "ON CONFLICT (model, word, prompt_id) DO UPDATE SET state = 'pending', owner = NULL, lease_expires = NULL, "
+            "attempts = 0 WHERE state IN ('done', 'failed')",
+            items
+        )
+        added = self._connection.total_changes - before
+        self._connection.execute("COMMIT")
+        return added
+    
+    def claim(self, worker_id: str) -> tuple[int, str, str, str] | None:
+        """Lease the next pending or expired item to a worker; returns (id, model, word, prompt_id)"""
+        now = time.time()
+        self._connection.execute("BEGIN IMMEDIATE")
+        row = self._connection.execute(
+            "SELECT id, model, word, prompt_id FROM items "
+            "WHERE state = 'pending' OR (state = 'leased' AND lease_expires < ?) "
+            "ORDER BY id LIMIT 1",
+            (now,)
+        ).fetchone()
+        if row is not None:
+            self._connection.execute(
+                "UPDATE items SET state = 'leased', owner = ?, lease_expires = ?, attempts = attempts + 1 WHERE id = ?",
+                (worker_id, now + self.lease_seconds, row[0])
+            )
+        self._connection.execute("COMMIT")
+        return row
+    
+    def complete(self, item_id: int, worker_id: str) -> bool:
+        """Mark an item done if the worker still holds its lease"""
+        cursor = self._connection.execute(
+            "UPDATE items SET state = 'done', lease_expires = NULL WHERE id = ? AND owner = ? AND state = 'leased'",
+            (item_id, worker_id)
+        )
+        return cursor.rowcount == 1
+    
+    def release(self, item_id: int, worker_id: str):
+        """Return a leased item to the queue, e.g. after a failed attempt"""
+        self._connection.execute(
+            "UPDATE items SET state = 'pending', owner = NULL, lease_expires = NULL WHERE id = ? AND owner = ? AND state = 'leased'",
+            (item_id, worker_id)
+        )
+    
+    def fail(self, item_id: int, worker_id: str, max_attempts: int) -> bool:
+        """Return a failed item to the queue, or mark it failed once it was attempted max_attempts times
+
+        Returns whether the item is now marked failed.
+        """
+        self._connection.execute(
+            "UPDATE items SET state = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END, owner = NULL, "
+            "lease_expires = NULL WHERE id = ? AND owner = ? AND state = 'leased'",
+            (max_attempts, item_id, worker_id)
+        )
+        row = self._connection.execute("SELECT state FROM items WHERE id = ?", (item_id,)).fetchone()
+        return row is not None and row[0] == "failed"
+    
+    def counts(self) -> dict[str, int]:
+        """Number of items per state"""
+        rows = self._connection.execute("SELECT state, COUNT(*) FROM items GROUP BY state").fetchall()
+        return {"pending": 0, "leased": 0, "done": 0, "failed": 0, **dict(rows)}
+    
+    def close(self):
+        """Close the underlying database connection"""
+        self._connection.close()